@@ -2,19 +2,20 @@ from django.urls import path
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from channels.auth import AuthMiddlewareStack
-from channels.sessions import SessionMiddlewareStack
 
 from wga.assets_user import consumers
+from wga.assets_admin import consumers as moderator_consumers
 
+# AuthMiddlewareStack includes SessionMiddlewareStack (a second one would load the session twice per handshake).
 application = ProtocolTypeRouter({
     'websocket': AllowedHostsOriginValidator(
         AuthMiddlewareStack(
-            SessionMiddlewareStack(
-                URLRouter([
-                    path('ws/wganalogy_app/user/<str:url_key>/', consumers.GameConsumer),
-                    path('ws/wganalogy_app/nav', consumers.NavBarConsumer)
-                ])
-            )
+            URLRouter([
+                path('ws/wganalogy_app/user/<str:url_key>/', consumers.GameConsumer),
+                path('ws/wganalogy_app/nav', consumers.NavBarConsumer),
+                path('ws/wganalogy_app/moderator/reports', moderator_consumers.ReportConsumer),
+                path('ws/wganalogy_app/moderator/jobs/<int:job_id>', moderator_consumers.JobConsumer)
+            ])
         )
     ),
 })
@@ -33,7 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'wga.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -44,12 +46,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'django_project.urls'
 
+# Templates are read and compiled once per process by the cached loader, except while DEBUG is on (so edits show up
+# without a restart). The instruction modals are also cached as rendered HTML (see CACHES below).
+WGA_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'wga.metrics.DjangoTemplates',
+        'NAME': 'django',  # the alias of the stock backend this one extends
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': WGA_TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', WGA_TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -77,6 +89,40 @@ CHANNEL_LAYERS = {
 }
 
 
+# Caches & Sessions
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# https://docs.djangoproject.com/en/2.2/topics/http/sessions/#configuring-the-session-engine
+# Both caches live on the Redis server Django Channels already uses; sessions get their own Redis database, so
+# flushing the data cache never logs players out. WGA_SESSION_ENGINE picks the players' session backend:
+#   --- db                  :: every request and WebSocket handshake reads the django_session table
+#   --- cached_db           :: reads come from the cache, writes go to both (default; survives a Redis restart)
+#   --- cache               :: the cache only (a Redis restart logs every player out)
+#   --- signed_cookies      :: no server-side storage at all (sessions cannot be revoked before they expire)
+# Expired db / cached_db sessions are deleted by `python manage.py clearsessions` (see README.md).
+# The {% cache %} fragments (the static instruction modals, see user/game/modals.html) are kept in each process's
+# memory rather than in Redis: fetching them over the network would cost about as much as rendering them, and a
+# restart after a deploy drops fragments rendered from old templates. They are not cached while DEBUG is on.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    },
+    'sessions': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://localhost:6379/2',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache' if DEBUG else
+                   'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+    },
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('WGA_SESSION_ENGINE', 'cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
@@ -91,6 +137,36 @@ DATABASES = {
     }
 }
 
+# Set WGA_DATABASE=sqlite to run against a local SQLite file instead (e.g. to compare the benchmark_sessions results of
+# both database backends).
+if os.environ.get('WGA_DATABASE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+
+# Read replica
+# Read-only moderator pages and exports read from the WGA_REPLICA_DATABASE alias whenever it is configured and at most
+# WGA_REPLICA_MAX_LAG seconds behind the primary (see wga/routers.py); writes and game-state reads stay on 'default'.
+# Set WGA_REPLICA_HOST (and optionally WGA_REPLICA_PORT / WGA_REPLICA_NAME, e.g. a second local database) to add it.
+# In tests, the replica mirrors the default database.
+
+DATABASE_ROUTERS = ['wga.routers.ReplicaRouter']
+WGA_REPLICA_DATABASE = 'replica'
+WGA_REPLICA_MAX_LAG = 30
+WGA_REPLICA_LAG_INTERVAL = 10
+
+if os.environ.get('WGA_REPLICA_HOST'):
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        HOST=os.environ['WGA_REPLICA_HOST'],
+        PORT=os.environ.get('WGA_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        NAME=os.environ.get('WGA_REPLICA_NAME', DATABASES['default']['NAME']),
+        TEST={'MIRROR': 'default'}
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -136,9 +212,19 @@ STATIC_DIRs = [
     os.path.join(BASE_DIR, 'static')
 ]
 
+# collectstatic bundles the pages' CSS and JS (see wga/bundles.py), names every file after its content hash and writes
+# gzip and brotli copies of it. WhiteNoiseMiddleware serves them, with a far-future immutable Cache-Control header for
+# hashed files, so a session start does not make every player's browser fetch every asset again.
+STATICFILES_STORAGE = 'wga.bundles.BundledStaticFilesStorage'
+
 
 # Logging
 # https://docs.djangoproject.com/en/2.2/topics/logging/
+# The log files are written by a background thread in batches (see wga/log_handlers.py), so processing a move never
+# waits on the disk (django.games and django.moderator also propagate to django.log). Every committed move is also
+# appended to the JSON-lines move journal, logs/journal.jsonl (see wga/journal.py). Every web worker and management
+# command appends to the same files, so none of them rotates the files: logrotate does (see README.md), and the
+# handlers reopen a file once it has been moved away.
 
 LOGGING = {
     'version': 1,
@@ -147,12 +233,15 @@ LOGGING = {
         'simple': {
             'format': '{asctime:25s} {levelname:10s} {message:s} ({filename:s}:{lineno:d})',
             'style': '{'
+        },
+        'journal': {
+            '()': 'wga.journal.JSONLinesFormatter'
         }
     },
     'handlers': {
         'django-file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'wga.log_handlers.QueuedFileHandler',
             'filename': os.path.join(BASE_DIR, "logs/django.log"),
             'formatter': 'simple'
         },
@@ -163,21 +252,27 @@ LOGGING = {
         },
         'wga-games-info': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'wga.log_handlers.QueuedFileHandler',
             'filename': os.path.join(BASE_DIR, "logs/games_info.log"),
             'formatter': 'simple'
         },
         'wga-games-debug': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
+            'class': 'wga.log_handlers.QueuedFileHandler',
             'filename': os.path.join(BASE_DIR, "logs/games_debug.log"),
             'formatter': 'simple'
         },
         'wga-moderator': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
+            'class': 'wga.log_handlers.QueuedFileHandler',
             'filename': os.path.join(BASE_DIR, "logs/moderator.log"),
             'formatter': 'simple'
+        },
+        'wga-journal': {
+            'level': 'INFO',
+            'class': 'wga.log_handlers.QueuedFileHandler',
+            'filename': os.path.join(BASE_DIR, "logs/journal.jsonl"),
+            'formatter': 'journal'
         }
     },
     'loggers': {
@@ -195,7 +290,50 @@ LOGGING = {
             'handlers': ['wga-moderator'],
             'level': 'DEBUG',
             'propagate': True
+        },
+        'django.journal': {
+            'handlers': ['wga-journal'],
+            'level': 'INFO',
+            'propagate': False
         }
     }
 }
 
+
+# Metrics
+# Per-handler query counts, database time, template rendering time and latency (see wga/metrics.py). The Prometheus
+# text format is served at /wganalogy_app/moderator/metrics to staff users and to requests carrying the token below
+# (e.g. bearer_token in a Prometheus scrape config; requests reach Daphne through nginx, so their address says nothing
+# about where they came from); moderators can see the slowest handlers at /wganalogy_app/moderator/metrics/slowest.
+
+WGA_METRICS = False
+
+WGA_METRICS_TOKEN = os.environ.get('WGA_METRICS_TOKEN')  # "Authorization: Bearer <token>"; unset to disable
+
+
+# Stalled Games
+# The sweep_stalled_games command flags the games whose current player has not moved for WGA_STALLED_MINUTES, alerts
+# the moderators' report queue and, with --message, sends WGA_STALLED_MESSAGE to the idle player. Run it for the length
+# of a session, e.g. `python manage.py sweep_stalled_games --every 30 --message`.
+
+WGA_STALLED_MINUTES = 5
+
+WGA_STALLED_MESSAGE = "It is your turn! Your opponent is waiting for your move."
+
+
+# Move Submissions
+# Every move form carries an id generated by the player's web browser, so a move resent after the WebSocket reconnects
+# is acknowledged as a duplicate instead of being processed twice (see GameConsumer). The ids are kept in the default
+# cache for WGA_MOVE_ID_SECONDS, long enough to cover any reconnect.
+
+WGA_MOVE_ID_SECONDS = 600
+
+
+# Game Slot Cache
+# Each Daphne process keeps the game slots its WebSockets resolved (player, session, game, role and case of a game
+# page's key, see wga/slots.py) in memory: at most WGA_SLOT_CACHE_SIZE of them, each for WGA_SLOT_CACHE_SECONDS.
+# Moderators reassigning game slots drop the cached slots in every process through the channel layer.
+
+WGA_SLOT_CACHE_SIZE = 4096
+
+WGA_SLOT_CACHE_SECONDS = 60
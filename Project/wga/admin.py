@@ -46,6 +46,12 @@ class MessageAdmin(admin.ModelAdmin):
     order = ['text']
 
 
+class DeliveryAdmin(admin.ModelAdmin):
+
+    list_display = ['intermediary', 'message', 'date']
+    order = ['intermediary', 'date']
+
+
 class GroupAdmin(admin.ModelAdmin):
 
     list_display = ['name', 'date', 'case']
@@ -70,6 +76,18 @@ class ReportAdmin(admin.ModelAdmin):
     order = ['resolved']
 
 
+class GameAnalyticsAdmin(admin.ModelAdmin):
+
+    list_display = ['game', 'moves', 'sent_attack', 'accepted_edit', 'accepted_add', 'first_move', 'last_move']
+    order = ['game']
+
+
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = ['name', 'status', 'players', 'games', 'created', 'finished']
+    order = ['created']
+
+
 ########################################################################################################################
 
 
@@ -78,10 +96,13 @@ admin.site.register(models.FactPair, FactPairAdmin)
 admin.site.register(models.ScenarioPair, ScenarioPairAdmin)
 admin.site.register(models.Move, MoveAdmin)
 admin.site.register(models.Message, MessageAdmin)
+admin.site.register(models.Delivery, DeliveryAdmin)
 admin.site.register(models.Group, GroupAdmin)
 admin.site.register(models.Intermediary, IntermediaryAdmin)
 admin.site.register(models.Game, GameAdmin)
 admin.site.register(models.Report, ReportAdmin)
+admin.site.register(models.GameAnalytics, GameAnalyticsAdmin)
+admin.site.register(models.Job, JobAdmin)
 
 
 ########################################################################################################################
@@ -0,0 +1,112 @@
+"""
+    WG-A Admin Django Consumers
+
+    This file contains WebSocket request handlers for the moderator web pages. Rather than having moderators refresh
+    (or poll) their web pages during a live game session, these consumers push changes to the moderators' web browsers
+    as soon as they happen. Each WebSocket Consumer in this file is associated with a URL path as defined in
+    django_project/routing.py.
+
+    DOCUMENTATION
+    https://channels.readthedocs.io/en/latest/
+"""
+
+import json
+
+from channels.generic.websocket import WebsocketConsumer
+from asgiref.sync import async_to_sync
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from wga import models
+
+
+########################################################################################################################
+
+
+"""
+    Report CONSUMER
+
+    Django Channels consumer responsible for alerting moderators about reports. Every time a report is submitted (by an
+    mTurk worker or by the program running into an error) or resolved, Report.announce() sends an event to the
+    moderators' channel group; the consumer then sends the rendered table row to the moderator's report queue. The
+    consumer also alerts the report queue about games whose current player has gone idle (see sweep_stalled_games).
+"""
+
+
+class ReportConsumer(WebsocketConsumer):
+
+    def connect(self):
+        if not self.scope['user'].is_authenticated:
+            self.close()
+            return
+        async_to_sync(self.channel_layer.group_add)(models.Report.MODERATOR_GROUP, self.channel_name)
+        self.accept()
+
+    def report_created(self, event):
+        report = models.Report.objects.select_related('game__group', 'user').filter(id=event['report_id']).first()
+        if report is None:
+            return
+        self.send(text_data=json.dumps({
+            'report': report.id,
+            'group': report.game.group.name if report.game and report.game.group else None,
+            'html-report': render_to_string('wga/admin/report_row.html', {'report': report})
+        }))
+
+    def report_resolved(self, event):
+        self.send(text_data=json.dumps({
+            'resolved': event['report_id']
+        }))
+
+    def game_stalled(self, event):
+        self.send(text_data=json.dumps({
+            'stalled': event['game'],
+            'group': event['group'],
+            'url': reverse('moderator:group', kwargs={'group_name': event['group']}),
+            'text': f"{event['player']} ({event['role']}) has not moved for {event['minutes']} minutes."
+        }))
+
+    def disconnect(self, message):
+        async_to_sync(self.channel_layer.group_discard)(models.Report.MODERATOR_GROUP, self.channel_name)
+        self.close()
+
+
+########################################################################################################################
+
+
+"""
+    Job CONSUMER
+
+    Django Channels consumer responsible for streaming a background job's progress (see the Job model) to the moderator
+    watching its page. On connecting, the consumer sends the job's current status; every report the run_jobs worker
+    makes afterwards is sent on as it arrives, along with the game session's URL once its games are generated.
+"""
+
+
+class JobConsumer(WebsocketConsumer):
+
+    def connect(self):
+        if not self.scope['user'].is_authenticated:
+            self.close()
+            return
+        job = models.Job.objects.filter(id=self.scope['url_route']['kwargs']['job_id']).first()
+        if job is None:
+            self.close()
+            return
+        self.group_name = job.channel_group()
+        async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
+        self.accept()
+        self.job_progress(job.as_dict())
+
+    def job_progress(self, event):
+        data = {key: value for (key, value) in event.items() if key != 'type'}
+        if data['status'] == models.Job.Status.COMPLETED:
+            data['url'] = reverse('moderator:group', kwargs={'group_name': data['name']})
+        self.send(text_data=json.dumps(data))
+
+    def disconnect(self, message):
+        if hasattr(self, 'group_name'):
+            async_to_sync(self.channel_layer.group_discard)(self.group_name, self.channel_name)
+        self.close()
+
+
+########################################################################################################################
@@ -10,13 +10,20 @@
 """
 
 import logging
+import asyncio
+import datetime
 import os
 
 from django import forms
+from django.db import transaction
+from django.db.models import Max, Q, F
+from django.utils import timezone
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+from wga import engine
 from wga import models
+from wga import slots
 
 
 WGA_ADMIN_LOGGER = logging.getLogger('django.moderator')
@@ -27,11 +34,30 @@ CHANNEL_LAYER = get_channel_layer()
 ########################################################################################################################
 
 
+"""
+    Group Send Many HELPER FUNCTION
+
+    Sends the same event to many channel groups in one batch. Rather than waiting on one group_send() round trip per
+    channel group, every send is started at once and awaited together (the Redis channel layer pipelines them).
+"""
+
+
+def group_send_many(names, event):
+    async def send_all():
+        await asyncio.gather(*[CHANNEL_LAYER.group_send(name, event) for name in names])
+    if names:
+        async_to_sync(send_all)()
+
+
+########################################################################################################################
+
+
 """
     Create Group FORM
     
     Django form for creating new Group objects. Here, we do form validations to ensure that game generation works
-    without raising exceptions.
+    without raising exceptions. Saving the form only saves the Group object: the users and games are generated in the
+    background by the run_jobs command (see the Job model), and the form's job attribute is the queued Job object.
     
     VALIDATIONS
         --- name                :: ensure all groups have unique names
@@ -104,7 +130,7 @@ class CreateGroupForm(forms.ModelForm):
         data = self.cleaned_data
         WGA_ADMIN_LOGGER.debug(f"Valid form passed: {data}")
         group = super().save(*args, **kwargs)
-        group.generate_games()
+        self.job = models.Job.queue(group)
         return group
 
 
@@ -171,7 +197,8 @@ class AddGameForm(forms.ModelForm):
     
     Django form for shuffling mTurk workers within a control group. The administrators will use this feature after every
     15 minutes to ensure that mTurk workers are continually collaborating on scenarios (prevent situations where two
-    mTurk workers have resolved the scenario faster than anyone else could).
+    mTurk workers have resolved the scenario faster than anyone else could). Every game slot of the session moves to a
+    new game, so the slots the consumers cached for the session are dropped before the interfaces are updated.
 """
 
 
@@ -192,6 +219,7 @@ class ShuffleGamesForm(forms.ModelForm):
         WGA_ADMIN_LOGGER.debug(f"Valid form passed: {data}")
 
         self.group.shuffle()
+        slots.invalidate(self.group.name)
 
         # TODO: Test to make sure the update goes through
         for intermediary in models.Intermediary.objects.filter(user__group=self.group):
@@ -240,18 +268,130 @@ class SendMessageForm(forms.ModelForm):
         label = "[ANNOUNCEMENT] " if isinstance(self.object, models.Group) else "[MESSAGE] "
         message = models.Message.objects.create(text=label+data['text'])
         self.object.messages.add(message)
+        if isinstance(self.object, models.Group):
+            message.deliver(models.Intermediary.objects.filter(user__group=self.object))
+        else:
+            message.deliver([self.object])
 
         # TODO: Test to make sure the update goes through
         async_to_sync(CHANNEL_LAYER.group_send)(
             self.object.name if isinstance(self.object, models.Group) else self.object.key,
             {
                 'type': 'update.messages',
-                'message': message.text
+                'message': message.text,
+                'date': message.date.isoformat()
             }
         )
         return message
 
 
+"""
+    Bulk Message FORM
+
+    Django form for sending one message to every mTurk worker (game slot) in a group that matches a selector, e.g. all
+    critics whose turn it is and who have not moved in ten minutes. A single Message object is created and attached to
+    every matching Intermediary object through one bulk insert; each recipient's channel group is then notified in one
+    batch.
+
+    SELECTORS
+        --- role                :: advocates, critics, or both
+        --- turn                :: players whose turn it is, players waiting on their opponent, or both
+        --- idle                :: (optional) only players who have not moved in this many minutes
+"""
+
+
+class BulkMessageForm(forms.ModelForm):
+
+    class Role:
+        ANY = 'any'
+        ADVOCATE = 'advocate'
+        CRITIC = 'critic'
+
+    class Turn:
+        ANY = 'any'
+        TURN = 'turn'
+        WAITING = 'waiting'
+
+    role = forms.ChoiceField(label="Which players?", choices=[
+        (Role.ANY, "Advocates and critics"),
+        (Role.ADVOCATE, "Advocates"),
+        (Role.CRITIC, "Critics")
+    ])
+    turn = forms.ChoiceField(label="In which turn state?", choices=[
+        (Turn.ANY, "Any active game"),
+        (Turn.TURN, "It is their turn"),
+        (Turn.WAITING, "Waiting on their opponent")
+    ])
+    idle = forms.IntegerField(required=False, min_value=0, label="Idle for at least (minutes)")
+
+    class Meta:
+        model = models.Message
+        fields = ('text', )
+        labels = {
+            'text': "What message will you send?"
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.group = kwargs.pop('group')
+        super().__init__(*args, **kwargs)
+        self.recipients = []
+
+    def find_recipients(self):
+        data = self.cleaned_data
+        roles = {
+            self.Role.ANY: [models.Intermediary.Role.ADVOCATE, models.Intermediary.Role.CRITIC],
+            self.Role.ADVOCATE: [models.Intermediary.Role.ADVOCATE],
+            self.Role.CRITIC: [models.Intermediary.Role.CRITIC]
+        }[data['role']]
+        cutoff = timezone.now() - datetime.timedelta(minutes=data['idle']) if data.get('idle') else None
+
+        games = models.Game.objects.filter(
+            group=self.group,
+            turn__in=[models.Game.Turn.ADVOCATE, models.Game.Turn.CRITIC],
+            adv_info__isnull=False,
+            crt_info__isnull=False
+        ).select_related('adv_info__user', 'crt_info__user').annotate(
+            adv_moved=Max('move__date', filter=Q(move__user=F('adv_info__user'))),
+            crt_moved=Max('move__date', filter=Q(move__user=F('crt_info__user')))
+        )
+
+        recipients = []
+        for game in games:
+            for (intermediary, turn, moved) in [
+                (game.adv_info, models.Game.Turn.ADVOCATE, game.adv_moved),
+                (game.crt_info, models.Game.Turn.CRITIC, game.crt_moved)
+            ]:
+                if intermediary.role not in roles:
+                    continue
+                if data['turn'] == self.Turn.TURN and game.turn != turn:
+                    continue
+                if data['turn'] == self.Turn.WAITING and game.turn == turn:
+                    continue
+                if cutoff and (moved or intermediary.user.log_in or self.group.start) > cutoff:
+                    continue
+                recipients.append(intermediary)
+        return recipients
+
+    def save(self):
+        data = self.cleaned_data
+        WGA_ADMIN_LOGGER.debug(f"Valid form passed: {data}")
+
+        self.recipients = self.find_recipients()
+        message = models.Message.objects.create(text="[MESSAGE] " + data['text'])
+        models.Intermediary.messages.through.objects.bulk_create([
+            models.Intermediary.messages.through(intermediary_id=intermediary.id, message_id=message.id)
+            for intermediary in self.recipients
+        ])
+        message.deliver(self.recipients)
+        group_send_many([intermediary.key for intermediary in self.recipients], {
+            'type': 'update.messages',
+            'message': message.text,
+            'date': message.date.isoformat()
+        })
+        WGA_ADMIN_LOGGER.info(f"Sent \"{message.text}\" to {len(self.recipients)} players in {self.group.name}")
+        return message
+
+
 ########################################################################################################################
 
 
@@ -283,15 +423,14 @@ class ReportResolveForm(forms.ModelForm):
         self.report.note = data['note']
         self.report.returned = data['returned']
         self.report.resolved = True
-        self.report.save()
-
-        self.report.game.turn = self.report.returned
-        self.report.game.context = models.Game.Context.COMPLETED if self.report.game.turn == models.Game.Turn.COMPLETED else models.Game.Context.IDLE
-        self.report.game.set_context_data([])
-
-        text = f"The moderator has reviewed the complaint: \"{self.report.note}\""
-        self.report.game.add_move(user=self.report.user, code=models.Move.Code.REPORT_REVIEWED, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.report.user.key}] Processed {models.Move.Code.REPORT_REVIEWED}: \"{text}\"")
+        state = self.report.game.get_state()
+        result = engine.resolve(state, self.report.returned, self.report.note)
+        with transaction.atomic():  # a Game.Conflict leaves the report unresolved
+            self.report.save()
+            self.report.game.commit_move(self.report.user, state, result)
+        models.Report.announce(self.report)
+        for step in result.steps:
+            WGA_GAME_LOGGER.info(f"[{getattr(self.report.user, 'key', None)}] Processed {step.code}: \"{step.text}\"")
 
         # TODO: Test to make sure the update goes through
         for intermediary in [self.report.game.adv_info, self.report.game.crt_info]:
@@ -24,9 +24,15 @@ urlpatterns = [
     path('groups/<str:group_name>/add/check', views.CheckAddGameView.as_view(), name='group-add-check'),
     path('groups/<str:group_name>/shuffle', views.ShuffleGamesView.as_view(), name='group-shuffle'),
     path('groups/<str:group_name>/download', views.DownloadView.as_view(), name='group-download'),
+    path('groups/<str:group_name>/summary', views.GroupSummaryView.as_view(), name='group-summary'),
+    path('groups/<str:group_name>/messages/bulk', views.BulkMessageView.as_view(), name='messages-bulk'),
     path('groups/<str:group_name>/messages/<str:url_key>', views.MessageCreateView.as_view(), name='messages'),
     path('groups/<str:group_name>/<str:url_key>', views.IntermediaryUpdateView.as_view(), name='group-edit'),
     path('reports', views.ReportListView.as_view(), name='list-of-reports'),
-    path('reports/<int:report_id>', views.ReportResolveView.as_view(), name='report-resolve')
+    path('reports/<int:report_id>', views.ReportResolveView.as_view(), name='report-resolve'),
+    path('jobs/<int:job_id>', views.JobView.as_view(), name='job'),
+    path('jobs/<int:job_id>/cancel', views.JobCancelView.as_view(), name='job-cancel'),
+    path('metrics', views.MetricsView.as_view(), name='metrics'),
+    path('metrics/slowest', views.SlowestHandlersView.as_view(), name='metrics-slowest')
 
 ]
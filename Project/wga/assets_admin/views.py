@@ -11,19 +11,24 @@
 
 import logging
 import json
+import hmac
+from urllib.parse import urlencode
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import View, CreateView, UpdateView, ListView, DetailView
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q
-from django.template.loader import render_to_string
+from django.http import JsonResponse, HttpResponse, Http404
+from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
 from django_project.settings import TIME_ZONE
 from wga import models
+from wga import metrics
+from wga import routers
+from wga import slots
+from wga.metrics import render_to_string
 from . import forms
 
 
@@ -34,12 +39,37 @@ CHANNEL_LAYER = get_channel_layer()
 ########################################################################################################################
 
 
+"""
+    Replica Read MIXIN
+
+    Sends the database reads of GET requests (including the ones made while rendering the template) to the read
+    replica, if one is configured and up to date (see wga/routers.py). Only for read-only moderator pages and exports:
+    a page that writes, or that must show a change the moderator has just made, stays on the primary database.
+"""
+
+
+class ReplicaReadMixin:
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with routers.use_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()  # template responses are rendered lazily, after dispatch() returns
+            return response
+
+
+########################################################################################################################
+
+
 """
     Index VIEW
     
     Django view that handles HTTP requests for the administrator landing page after logging in via Django's default
     admin login. The web page shows all scenarios registered in the database as well as allows administrators to create
-    new game sessions.
+    new game sessions. A new session's games are generated in the background, so the administrator is sent to the
+    session's Job page.
 """
 
 
@@ -55,16 +85,54 @@ class IndexView(LoginRequiredMixin, CreateView):
         context['scenarios'] = models.ScenarioPair.objects.all()
         return context
 
+    def form_valid(self, form):
+        self.object = form.save()
+        return redirect('moderator:job', job_id=form.job.id)
+
 
 ########################################################################################################################
 
 
 """
-    Group List & Detail VIEWS
+    Job & Job Cancel VIEWS
+
+    Django views that handle HTTP requests for background jobs (see the Job model). The Job VIEW responds with a web
+    page showing the job's progress, which is then kept up to date over a WebSocket (see JobConsumer); it always reads
+    the primary database, so a job that just finished is never shown as running. The Job Cancel VIEW cancels the job
+    and sends the moderator back to the job's page.
+"""
+
+
+class JobView(LoginRequiredMixin, DetailView):
+
+    login_url = '/admin/'
+    template_name = 'wga/admin/job.html'
+    model = models.Job
+    pk_url_kwarg = 'job_id'
+
+
+class JobCancelView(LoginRequiredMixin, View):
+
+    login_url = '/admin/'
+
+    def post(self, request, **kwargs):
+        job = get_object_or_404(models.Job, id=kwargs['job_id'])
+        if job.cancel():
+            WGA_ADMIN_LOGGER.info(f"Cancelled job {job.id} ({job.name})")
+        return redirect('moderator:job', job_id=job.id)
+
+
+########################################################################################################################
+
+
+"""
+    Group List, Detail & Summary VIEWS
     
     Django view that handles HTTP requests for web pages responsible for showing information about game sessions. The
     Group List VIEW responds with a web page listing out all the game sessions found in the database; the Group Detail
-    VIEW responds with a web page listing out all the games encompassed by the game session.
+    VIEW responds with a web page listing out all the games encompassed by the game session. Both show the sessions'
+    GroupSummary counters. The Group Summary VIEW responds with the counters alone, as JSON read from a single row, so
+    the Group Detail page can poll it every second.
 """
 
 
@@ -74,8 +142,15 @@ class GroupListView(LoginRequiredMixin, ListView):
     template_name = 'wga/admin/group_list.html'
     model = models.Group
 
+    def get_queryset(self):
+        groups = list(models.Group.objects.select_related('summary'))
+        for group in groups:
+            if not hasattr(group, 'summary'):
+                group.summary = group.get_summary()
+        return groups
 
-class GroupDetailView(LoginRequiredMixin, DetailView):
+
+class GroupDetailView(LoginRequiredMixin, ReplicaReadMixin, DetailView):
 
     login_url = '/admin/'
     template_name = 'wga/admin/group_detail.html'
@@ -85,6 +160,19 @@ class GroupDetailView(LoginRequiredMixin, DetailView):
         return get_object_or_404(models.Group, name=self.kwargs['group_name'])
 
 
+class GroupSummaryView(LoginRequiredMixin, View):
+
+    login_url = '/admin/'
+
+    def get(self, request, **kwargs):
+        summary = models.GroupSummary.objects.filter(group__name=kwargs['group_name']).first()  # one query
+        if summary is None:
+            summary = get_object_or_404(models.Group, name=kwargs['group_name']).get_summary()
+        response = JsonResponse(summary.as_dict())
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
 ########################################################################################################################
 
 
@@ -92,8 +180,9 @@ class GroupDetailView(LoginRequiredMixin, DetailView):
     Add Game VIEW
     
     Django view that handles HTTP requests for the add game form. Before the administrator can submit the form,
-    JavaScript invokes the Check Add Game view (only through POST requests) to send warnings: has the selected player(s)
-    played the chosen scenario already?
+    JavaScript sends warnings: has the selected player(s) played the chosen scenario already? The web page embeds the
+    group's played-scenario matrix (see Group.get_played()), so these warnings are computed in the web browser. The
+    Check Add Game view (only through POST requests) answers the same question from the same matrix.
 """
 
 
@@ -112,6 +201,7 @@ class AddGameView(LoginRequiredMixin, CreateView):
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
         context['group'] = get_object_or_404(models.Group, name=self.kwargs['group_name'])
+        context['played'] = context['group'].get_played()
         return context
 
 
@@ -124,13 +214,10 @@ class CheckAddGameView(LoginRequiredMixin, View):
         response = {'adv': False, 'crt': False}
 
         s, a, c = request.POST.get('scenario'), request.POST.get('advocate'), request.POST.get('critic')
-        if s and (a or c):
-            if a:
-                query = Q(group=group) & Q(scenario__id=s) & (Q(adv_info__user__id=a) | Q(crt_info__user__id=a))
-                response['adv'] = models.Game.objects.filter(query).exists()
-            if c:
-                query = Q(group=group) & Q(scenario__id=s) & (Q(adv_info__user__id=c) | Q(crt_info__user__id=c))
-                response['crt'] = models.Game.objects.filter(query).exists()
+        if s and s.isdigit() and (a or c):
+            played = group.get_played()
+            response['adv'] = bool(a) and int(s) in played.get(a, [])
+            response['crt'] = bool(c) and int(s) in played.get(c, [])
 
         return JsonResponse(response)
 
@@ -180,12 +267,15 @@ class ShuffleGamesView(LoginRequiredMixin, CreateView):
 """
 
 
-class DownloadView(LoginRequiredMixin, View):
+class DownloadView(LoginRequiredMixin, ReplicaReadMixin, View):
 
     login_url = '/admin/'
 
     def get(self, request, **kwargs):
         group = get_object_or_404(models.Group, name=kwargs['group_name'])
+        inboxes = {}
+        for delivery in models.Delivery.objects.filter(intermediary__user__group=group).select_related('message').order_by('date'):
+            inboxes.setdefault(delivery.intermediary_id, []).append(delivery.message.text)
 
         # HTML Data
         for game in models.Game.objects.filter(group=group):
@@ -223,7 +313,7 @@ class DownloadView(LoginRequiredMixin, View):
                         'approved': game.adv_info.user.approved,
                         'game key': game.adv_info.key,
                         'time': game.adv_info.time,
-                        'messages': [message.text for message in (game.adv_info.messages.all() | group.messages.all()).order_by('date')]
+                        'messages': inboxes.get(game.adv_info.id, [])
                     },
                     'critic': {
                         'name': game.crt_info.user.name,
@@ -232,7 +322,7 @@ class DownloadView(LoginRequiredMixin, View):
                         'approved': game.crt_info.user.approved,
                         'game key': game.crt_info.key,
                         'time': game.crt_info.time,
-                        'messages': [message.text for message in (game.crt_info.messages.all() | group.messages.all()).order_by('date')]
+                        'messages': inboxes.get(game.crt_info.id, [])
                     },
                     'rule': {
                         'name': "IF " + game.rule_antecedent + ", THEN " + game.rule_consequent,
@@ -314,11 +404,45 @@ class MessageCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
+"""
+    Bulk Message VIEW
+
+    Django view that handles HTTP requests for sending one message to every mTurk worker in a game session who matches
+    the moderator's selector (role, turn state, idle time). See the Bulk Message FORM.
+"""
+
+
+class BulkMessageView(LoginRequiredMixin, CreateView):
+
+    login_url = '/admin/'
+    template_name = 'wga/admin/bulk_message.html'
+    form_class = forms.BulkMessageForm
+
+    def get_form_kwargs(self, *args, **kwargs):
+        arguments = super().get_form_kwargs(*args, **kwargs)
+        arguments['group'] = get_object_or_404(models.Group, name=self.kwargs['group_name'])
+        return arguments
+
+    def get_context_data(self, *args, **kwargs):
+        context = super().get_context_data(*args, **kwargs)
+        context['group'] = get_object_or_404(models.Group, name=self.kwargs['group_name'])
+        context['sent'] = self.request.GET.get('sent')
+        return context
+
+    def form_valid(self, form):
+        form.save()
+        url = reverse_lazy('moderator:messages-bulk', kwargs={'group_name': self.kwargs['group_name']})
+        return redirect(f"{url}?sent={len(form.recipients)}")
+
+
 ########################################################################################################################
 
 
 """
     Intermediary Update VIEW
+
+    Django view that handles HTTP requests for reassigning a game slot to another mTurk worker. The slot's cached
+    resolution (see wga/slots.py) is dropped in every process before the players' interfaces are updated.
 """
 
 
@@ -336,6 +460,10 @@ class IntermediaryUpdateView(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         intermediary = form.save()
+        intermediary.user.group.forget_played()
+        for group in {self.previous_user.group, intermediary.user.group}:
+            if group is not None:
+                slots.invalidate(group.name, keys=[intermediary.key])
         for intermediary in self.previous_user.intermediary_set.all() | self.object.user.intermediary_set.all():
             async_to_sync(CHANNEL_LAYER.group_send)(
                 intermediary.key,
@@ -359,16 +487,58 @@ class IntermediaryUpdateView(LoginRequiredMixin, UpdateView):
     Report List & Resolve VIEWS
     
     Django views that handle HTTP requests for web pages responsible for showing information about reports. The Report
-    List VIEW responds with a web page containing all the reports found in the database; the Resolve VIEW responds with
-    a web page containing a form for the administrator to comment on the report.
+    List VIEW responds with a web page containing the report queue (by default, only the unresolved reports; optionally
+    filtered by game session); the Resolve VIEW responds with a web page containing a form for the administrator to
+    comment on the report.
+
+    The report queue is paginated by keyset (newest first) rather than by page number: the "before" parameter holds the
+    smallest report ID shown so far, so each page is a single range scan over the report index no matter how many
+    semesters of reports the database holds. New reports are pushed to the page via the Report CONSUMER.
 """
 
 
-class ReportListView(LoginRequiredMixin, ListView):
+class ReportListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
 
     login_url = '/admin/'
     template_name = 'wga/admin/report_list.html'
     model = models.Report
+    page_size = 50
+
+    class Status:
+        UNRESOLVED = 'unresolved'
+        RESOLVED = 'resolved'
+        ALL = 'all'
+
+    def get_queryset(self):
+        status = self.request.GET.get('status', self.Status.UNRESOLVED)
+        group = self.request.GET.get('group')
+        before = self.request.GET.get('before')
+
+        reports = models.Report.objects.select_related('game__group', 'user').order_by('-id')
+        if status == self.Status.UNRESOLVED:
+            reports = reports.filter(resolved=False)
+        elif status == self.Status.RESOLVED:
+            reports = reports.filter(resolved=True)
+        if group:
+            reports = reports.filter(game__group__name=group)
+        if before and before.isdigit():
+            reports = reports.filter(id__lt=int(before))
+        return list(reports[:self.page_size + 1])  # one extra row tells us whether an older page exists
+
+    def get_context_data(self, *args, **kwargs):
+        reports = self.object_list
+        self.object_list = reports[:self.page_size]
+        context = super().get_context_data(*args, **kwargs)
+        context['groups'] = models.Group.objects.order_by('id').values_list('name', flat=True)
+        context['status'] = self.request.GET.get('status', self.Status.UNRESOLVED)
+        context['group'] = self.request.GET.get('group', '')
+        if len(reports) > self.page_size:
+            context['older'] = urlencode({
+                'status': context['status'],
+                'group': context['group'],
+                'before': self.object_list[-1].id
+            })
+        return context
 
 
 class ReportResolveView(LoginRequiredMixin, UpdateView):
@@ -385,11 +555,68 @@ class ReportResolveView(LoginRequiredMixin, UpdateView):
         arguments = super().get_form_kwargs(*args, **kwargs)
         arguments['report'] = self.object
         return arguments
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except models.Game.Conflict:
+            form.add_error(None, "A player made a move while you were resolving this report. Please review it again.")
+            return self.form_invalid(form)
         
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
-        context['moves'] = list(self.object.game.move_set.all().order_by('date'))
+        (context['history'], context['history_older']) = self.object.game.get_history(limit=None)
         return context
 
 
 ########################################################################################################################
+
+
+"""
+    Metrics & Slowest Handlers VIEWS
+
+    Django views that expose the (opt-in, see WGA_METRICS in settings.py) handler instrumentation in wga/metrics.py. The
+    Metrics VIEW responds with every histogram in the Prometheus text format; it only answers staff users and requests
+    carrying the WGA_METRICS_TOKEN bearer token (so a Prometheus agent can scrape it), and includes the read replica's
+    replication lag when a replica is configured. The Slowest Handlers VIEW responds with a web page listing
+    the handlers of this worker process, slowest first.
+"""
+
+
+class MetricsView(View):
+
+    def get(self, request):
+        if not metrics.enabled() or not self.authorized(request):
+            raise Http404("Metrics Unavailable")
+        exposition = metrics.exposition()
+        alias = routers.replica_alias()
+        if alias:
+            lag = routers.replica_lag(alias)
+            exposition += "# HELP wga_replica_lag_seconds Replication lag of the read replica (-1 if unknown).\n"
+            exposition += "# TYPE wga_replica_lag_seconds gauge\n"
+            exposition += f'wga_replica_lag_seconds{{database="{alias}"}} {lag if lag is not None else -1}\n'
+        return HttpResponse(exposition, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @staticmethod
+    def authorized(request):
+        if request.user.is_authenticated and request.user.is_staff:
+            return True
+        token = settings.WGA_METRICS_TOKEN
+        (scheme, _, credentials) = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if not token or scheme.lower() != 'bearer':
+            return False
+        return hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+class SlowestHandlersView(LoginRequiredMixin, View):
+
+    login_url = '/admin/'
+
+    def get(self, request):
+        return HttpResponse(render_to_string('wga/admin/metrics.html', {
+            'enabled': metrics.enabled(),
+            'handlers': metrics.slowest()
+        }, request=request))
+
+
+########################################################################################################################
@@ -19,15 +19,30 @@ import json
 
 from channels.generic.websocket import WebsocketConsumer
 from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
-from django.template.loader import render_to_string
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
 
 from wga import models
+from wga import metrics
+from wga import slots
+from wga.metrics import render_to_string
 from . import views
 from . import forms
 
 
 WGA_PLAYER_LOGGER = logging.getLogger('django.games')
+CONFLICT_NOTICE = "The game changed while you were making your move. Please review the game and try again."
+DUPLICATE_NOTICE = "This move has already been submitted."
+
+
+class Ack:
+    COMMITTED = 'committed'
+    INVALID = 'invalid'
+    CONFLICT = 'conflict'
+    DUPLICATE = 'duplicate'
 
 
 ########################################################################################################################
@@ -35,42 +50,51 @@ WGA_PLAYER_LOGGER = logging.getLogger('django.games')
 
 """
     Navigation Bar CONSUMER
+
+    The mTurk worker's key is checked once, when the WebSocket connects; navigation updates and disconnecting reuse it.
+    On a game page (a url_key in the route), navigation updates are only sent if the game slot still belongs to the
+    mTurk worker; the consumer then joins the game session's channel group as well, so the cached slot is dropped when
+    a moderator reassigns it (see wga/slots.py).
 """
 
 
 class NavBarConsumer(WebsocketConsumer):
 
     def connect(self):
-        try:
-            user = models.User.objects.get(key=self.scope['session']['user_identifier'])
-        except models.User.MultipleObjectsReturned:
+        user_key = self.scope['session'].get('user_identifier')
+        if not user_key or not models.User.objects.filter(key=user_key).exists():
             self.close()
             return
-        async_to_sync(self.channel_layer.group_add)(user.key, self.channel_name)
+        self.user_key = user_key
+        self.groups_joined = [user_key]
+        url_key = self.scope['url_route']['kwargs'].get('url_key')
+        slot = slots.resolve(url_key) if url_key else None
+        if slot is not None and slot.group_name is not None:
+            self.groups_joined.append(slot.group_name)
+        for group in self.groups_joined:
+            async_to_sync(self.channel_layer.group_add)(group, self.channel_name)
         self.accept()
 
-    def update_navigation(self, event):    
+    @metrics.instrument('NavBarConsumer.update_navigation')
+    def update_navigation(self, event):
         if self.scope['url_route']['kwargs'].get('url_key'):
-            if not models.Intermediary.objects.filter(user__key=self.scope['session']['user_identifier'], key=self.scope['url_route']['kwargs']['url_key']).exists():
-                return
-        elif self.scope['session'].get('user_identifier'):
-            if not models.User.objects.filter(key=self.scope['session']['user_identifier']).exists():
+            slot = slots.resolve(self.scope['url_route']['kwargs']['url_key'])
+            if slot is None or slot.user_key != self.user_key:
                 return
-        else:
+        try:
+            data = views.find_user_data(url_key=self.user_key)
+        except Http404:  # the mTurk worker was deleted since connecting
             return
-
-        data = views.find_user_data(url_key=self.scope['session']['user_identifier'])
         self.send(text_data=json.dumps({
             'html-navigation': render_to_string('wga/user/container/links.html', data)
         }))
 
+    def slots_invalidate(self, event):
+        slots.forget(keys=event['keys'], group_name=event['group'] if event['keys'] is None else None)
+
     def disconnect(self, message):
-        try:
-            user = models.User.objects.get(key=self.scope['session']['user_identifier'])
-        except models.User.MultipleObjectsReturned:
-            self.close()
-            return
-        async_to_sync(self.channel_layer.group_discard)(user.key, self.channel_name)
+        for group in getattr(self, 'groups_joined', ()):
+            async_to_sync(self.channel_layer.group_discard)(group, self.channel_name)
         self.close()
 
 
@@ -83,38 +107,138 @@ class NavBarConsumer(WebsocketConsumer):
     Django Channels consumer responsible for handling data in (both control and non-control) games via WebSockets. The
     four important functionalities of this consumer: (1) Receiving and recording time data, (2) Receiving and processing
     non-control form data, (3) Updating the mTurk worker's interface, and (4) Updating the mTurk worker's navigation
-    bar.
+    bar. The web browser also asks for the messages sent after the newest one it has seen whenever its WebSocket
+    (re)connects, so no message is lost while the mTurk worker is disconnected, and for the moves older than the move
+    history it was sent (see Game.get_history), one window at a time. A move that loses the race against
+    another move made on the same game (see Game.commit_move) is rejected; the mTurk worker is sent the game's current
+    interface and a conflict notice instead.
+
+    Every move form the web browser submits carries an id it generated for that form, and every move is acknowledged
+    ({'ack': id, 'status': committed / invalid / conflict / duplicate}). The id of a move being processed or committed
+    is kept in the cache for WGA_MOVE_ID_SECONDS (shared by every Daphne process, so it survives the WebSocket
+    reconnecting elsewhere); a move resent with the same id (e.g. after a reconnect) is acknowledged as a duplicate
+    without loading the game or running its form again. Invalid and conflicting moves wrote nothing, so their id is
+    released and the form may be resubmitted.
+
+    The game slot's key is resolved once, when the WebSocket connects (see wga/slots.py): the user, session, game and
+    case read from the cached slot authorize interface updates and find the messages and move history without joining
+    the game slot's tables again. The cached slots are dropped when a moderator reassigns the session's game slots.
 """
 
 
 class GameConsumer(WebsocketConsumer):
 
     def connect(self):
-        try:
-            intermediary = models.Intermediary.objects.get(key=self.scope['url_route']['kwargs']['url_key'])
-        except models.Intermediary.MultipleObjectsReturned:
+        slot = slots.resolve(self.scope['url_route']['kwargs']['url_key'])
+        if slot is None or slot.group_name is None:
             self.close()
             return
-        async_to_sync(self.channel_layer.group_add)(intermediary.key, self.channel_name)
-        async_to_sync(self.channel_layer.group_add)(intermediary.user.group.name, self.channel_name)
+        self.groups_joined = (self.scope['url_route']['kwargs']['url_key'], slot.group_name)
+        for group in self.groups_joined:
+            async_to_sync(self.channel_layer.group_add)(group, self.channel_name)
         self.accept()
 
+    @metrics.instrument('GameConsumer.receive')
     def receive(self, text_data):
         text_data = json.loads(text_data)
-        data = views.find_game_data(url_key=self.scope['url_route']['kwargs']['url_key'])
-        if text_data.get('time'):
-            data['intermediary'].time += float(text_data['time'])
-            data['intermediary'].save()
-        else:
-            data['form'] = forms.build_form(text_data, user=data['user'], game=data['game'], is_critic=data['is_critic'])
-            if data['form'].is_valid():
-                data['form'].process()
-                for intermediary in models.Intermediary.objects.filter(Q(user=data['game'].adv_info.user) | Q(user=data['game'].crt_info.user)):
-                    self._update_page(intermediary=intermediary)
+        if 'messages_since' in text_data:
+            self._send_messages(since=parse_datetime(text_data['messages_since'] or ''))
+            return
+        if 'history_before' in text_data:
+            self._send_history(before=text_data['history_before'])
+            return
+        move_id = text_data.pop('move_id', None)
+        if move_id is not None and not self._claim_move(move_id):
+            WGA_PLAYER_LOGGER.info(f"[{self.scope['url_route']['kwargs']['url_key']}] Ignored resent move {move_id!r}")
+            self._ack(move_id, Ack.DUPLICATE)
+            return
+        committed = False
+        try:
+            data = views.find_game_data(url_key=self.scope['url_route']['kwargs']['url_key'], with_messages=False)
+            if text_data.get('time'):
+                data['intermediary'].time += float(text_data['time'])
+                data['intermediary'].save()
             else:
-                self.send(text_data=json.dumps({
-                    'html-interface': render_to_string('wga/user/game/interface.html', data)
-                }))
+                data['form'] = forms.build_form(text_data, user=data['user'], game=data['game'],
+                                                is_critic=data['is_critic'])
+                if data['form'] is None:  # no move can be made in the game's current context (e.g. just moderated)
+                    self._release_move(move_id)
+                    self._resync(CONFLICT_NOTICE)
+                    self._ack(move_id, Ack.CONFLICT)
+                    return
+                if data['form'].is_valid():
+                    try:
+                        data['form'].process()
+                    except models.Game.Conflict as e:
+                        WGA_PLAYER_LOGGER.info(f"[{data['user'].key}] Rejected a move made on an outdated game: {e}")
+                        self._release_move(move_id)
+                        self._resync(CONFLICT_NOTICE)
+                        self._ack(move_id, Ack.CONFLICT)
+                        return
+                    committed = data['form'].is_valid()  # process() turns a move the database rejects into an error
+                if committed:
+                    self._ack(move_id, Ack.COMMITTED)
+                    for intermediary in models.Intermediary.objects.filter(Q(user=data['game'].adv_info.user) | Q(user=data['game'].crt_info.user)):
+                        self._update_page(intermediary=intermediary)
+                else:
+                    self._release_move(move_id)
+                    self.send(text_data=json.dumps({
+                        'html-interface': render_to_string('wga/user/game/interface.html', data)
+                    }))
+                    self._ack(move_id, Ack.INVALID)
+        except Exception:
+            if not committed:
+                self._release_move(move_id)  # nothing was committed, so the client's resend must go through
+            raise
+
+    def _move_key(self, move_id):
+        return f"wga:move:{self.scope['url_route']['kwargs']['url_key']}:{str(move_id)[:64]}"
+
+    def _claim_move(self, move_id):
+        return cache.add(self._move_key(move_id), True, settings.WGA_MOVE_ID_SECONDS)
+
+    def _release_move(self, move_id):
+        if move_id is not None:
+            cache.delete(self._move_key(move_id))
+
+    def _ack(self, move_id, status):
+        if move_id is None:
+            return
+        ack = {'ack': move_id, 'status': status}
+        if status == Ack.DUPLICATE:
+            ack['notice'] = DUPLICATE_NOTICE
+        self.send(text_data=json.dumps(ack))
+
+    def _resync(self, notice):
+        self.update_interface({'type': 'update.interface'})
+        self.send(text_data=json.dumps({
+            'conflict': notice
+        }))
+
+    def _send_messages(self, since):
+        slot = slots.resolve(self.scope['url_route']['kwargs']['url_key'])
+        if slot is None:
+            return
+        for delivery in views.find_messages(slot.intermediary_id, since=since):
+            self.send(text_data=json.dumps({
+                'message': delivery.message.text,
+                'date': delivery.date.isoformat()
+            }))
+
+    def _send_history(self, before):
+        try:
+            before = int(before)
+        except (TypeError, ValueError):
+            return
+        slot = slots.resolve(self.scope['url_route']['kwargs']['url_key'])
+        game = models.Game.objects.filter(id=slot.game_id).first() if slot and slot.game_id else None
+        if game is None:
+            return
+        (history, older) = game.get_history(before=before)
+        self.send(text_data=json.dumps({
+            'history': history,
+            'older': older
+        }))
 
     def _update_page(self, intermediary):
         async_to_sync(self.channel_layer.group_send)(
@@ -130,39 +254,40 @@ class GameConsumer(WebsocketConsumer):
             }
         )
 
+    @metrics.instrument('GameConsumer.update_interface')
     def update_interface(self, event):
-        if not models.Intermediary.objects.filter(user__key=self.scope['session']['user_identifier'], key=self.scope['url_route']['kwargs']['url_key']).exists():
+        slot = slots.resolve(self.scope['url_route']['kwargs']['url_key'])
+        if slot is None or slot.user_key != self.scope['session']['user_identifier']:
             self.send(text_data=json.dumps({
                 'html-interface': "An administrator has made changes here. Please navigate back to the login page."
             }))
             return
 
-        data = views.find_game_data(url_key=self.scope['url_route']['kwargs']['url_key'])
+        data = views.find_game_data(url_key=self.scope['url_route']['kwargs']['url_key'], with_messages=False)
         if not views.is_turn(data):
             data['game'].context = 'Not Turn'  # DO NOT SAVE
         data['form'] = forms.build_form(user=data['user'], game=data['game'], is_critic=data['is_critic'])
-        if data['user'].group.case == models.Group.Case.NON_CONTROL:
+        if slot.case == models.Group.Case.NON_CONTROL:
             self.send(text_data=json.dumps({
                 'html-interface': render_to_string('wga/user/game/interface.html', data)
             }))
-        elif data['user'].group.case == models.Group.Case.CONTROL:
+        elif slot.case == models.Group.Case.CONTROL:
             self.send(text_data=json.dumps({
                 'html-interface': render_to_string('wga/user/chat/interface.html', data)
             }))
 
     def update_messages(self, event):
         self.send(text_data=json.dumps({
-            'message': event['message']
+            'message': event['message'],
+            'date': event.get('date')
         }))
 
+    def slots_invalidate(self, event):
+        slots.forget(keys=event['keys'], group_name=event['group'] if event['keys'] is None else None)
+
     def disconnect(self, message):
-        try:
-            intermediary = models.Intermediary.objects.get(key=self.scope['url_route']['kwargs']['url_key'])
-        except models.Intermediary.MultipleObjectsReturned:
-            self.close()
-            return
-        async_to_sync(self.channel_layer.group_discard)(intermediary.key, self.channel_name)
-        async_to_sync(self.channel_layer.group_discard)(intermediary.user.group.name, self.channel_name)
+        for group in getattr(self, 'groups_joined', ()):  # the groups joined on connecting, even if since reassigned
+            async_to_sync(self.channel_layer.group_discard)(group, self.channel_name)
         self.close()
 
 
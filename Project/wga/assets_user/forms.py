@@ -13,9 +13,9 @@ import logging
 import datetime
 
 from django import forms
-from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
+from wga import engine
 from wga import models
 
 
@@ -142,7 +142,10 @@ def build_form(post_data=None, user=None, game=None, is_critic=None):
 
     else:
         WGA_GAME_LOGGER.error(f"An unrecognized context was passed to build_form: {game.context} with data {post_data}")
-        models.Report.report_error(game=game, text=f"build_form(): invalid context - {game.context}")
+        try:
+            models.Report.report_error(game=game, text=f"build_form(): invalid context - {game.context}")
+        except models.Game.Conflict as e:
+            WGA_GAME_LOGGER.info(f"Did not report an outdated game: {e}")  # its players' interfaces are being updated
         form = None
 
     return form
@@ -153,14 +156,19 @@ def build_form(post_data=None, user=None, game=None, is_critic=None):
 
 """
     (ABSTRACT) Move FORM
-    
-    This is an abstract class that every move form for WG-A must inherit. This class processes the passed keyword
-    arguments that are useful in rendering and processing move forms:
-    
+
+    This is an abstract class that every move form for WG-A must inherit. The rules of the game live in the game engine
+    (see engine.py); move forms only render the move's fields, check them against the engine in clean(), and, in
+    process(), apply the move to the game's state and save the result (see Game.commit_move; a move the database
+    rejects becomes a form error, so is_valid() is False afterwards). This class processes the passed keyword arguments
+    that are useful in rendering and processing move forms:
+
     DATA MEMBERS
         --- user                :: the mTurk worker who will view and make the move
         --- game                :: the game in which the move will be made
         --- is_critic           :: is the mTurk worker playing as the critic (T/F)?
+        --- role                :: the mTurk worker's role, as used by the game engine (engine.Turn)
+        --- state               :: the game's state, as used by the game engine (see Game.get_state)
 """
 
 
@@ -170,11 +178,39 @@ class MoveForm(forms.Form):
         self.user = kwargs.pop('user')
         self.game = kwargs.pop('game')
         self.is_critic = kwargs.pop('is_critic')
+        self.role = engine.Turn.CRITIC if self.is_critic else engine.Turn.ADVOCATE
+        self.state = self.game.get_state()
         super().__init__(*args, **kwargs)
 
-    # (OVERRIDE) Each MoveForm subclass must provide functionality for processing the form (changing game state).
+    # (OVERRIDE) Returns the move (engine.Move) the mTurk worker is making: by default the chosen response, as in the
+    # forms answering an attack or a proposal. A form without a move is rejected by the engine like any illegal move.
+    def get_move(self):
+        return self.cleaned_data.get('response')
+
+    def clean(self):
+        super().clean()
+        if self.errors:
+            return self.cleaned_data
+
+        try:
+            engine.validate(self.state, self.role, self.get_move(), self.cleaned_data)
+        except engine.IllegalMove as e:
+            WGA_GAME_LOGGER.debug(f"Invalid form: {e} {self.cleaned_data}")
+            self.add_error(e.field if e.field in self.fields else None, forms.ValidationError(str(e)))
+
+        return self.cleaned_data
+
     def process(self):
-        pass
+        if self.is_valid():
+            result = engine.apply(self.state, self.role, self.get_move(), self.cleaned_data)
+            try:
+                self.game.commit_move(self.user, self.state, result)
+            except engine.IllegalMove as e:  # rejected by the database rather than the engine (see commit_move)
+                WGA_GAME_LOGGER.warning(f"[{self.user.key}] Move rejected on commit: {e} {self.cleaned_data}")
+                self.add_error(e.field if e.field in self.fields else None, forms.ValidationError(str(e)))
+                return
+            for step in result.steps:
+                WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {step.code}: \"{step.text}\"")
 
 
 # -------------------------------------------------------------------------------------------------------------------- #
@@ -182,14 +218,14 @@ class MoveForm(forms.Form):
 
 """
     (A) Create Rule FORM
-    
+
     The first stage of the game is the Advocate creating a rule for the given argument structure. Their rule must be
     in "IF x, THEN y" form with x being the antecedent and y being the consequent. The Advocate is given this form
     only once; any future edits to the rule must be done via the Update Rule FORM. After submitting this form, the
     process() method must be invoked to update the game state as well as switch game control accordingly ---> Critic
     (Idle).
-     
-    VALIDATIONS
+
+    VALIDATIONS (engine)
         --- antecedent          :: after removing whitespace and "if" (if included), make sure the result is non-empty
         --- consequent          :: after removing whitespace and "then" (if included), make sure the result is non-empty
 """
@@ -200,36 +236,8 @@ class CreateRuleForm(MoveForm):
     antecedent = forms.CharField(max_length=1024)
     consequent = forms.CharField(max_length=1024)
 
-    def clean_antecedent(self):
-        a = self.cleaned_data['antecedent'].strip()
-        if a[:2].lower() == "if":
-            a = a[2:].strip()
-            if not a:
-                WGA_GAME_LOGGER.debug(f"Invalid form: No antecedent after excluding \"if\". {self.cleaned_data}")
-                raise forms.ValidationError("Exclude \"if\" in your responses.")
-        return a
-
-    def clean_consequent(self):
-        c = self.cleaned_data['consequent'].strip()
-        if c[:4].lower() == "then":
-            c = c[4:].strip()
-            if not c:
-                WGA_GAME_LOGGER.debug(f"Invalid form: No consequent after excluding \"then\". {self.cleaned_data}")
-                raise forms.ValidationError("Exclude \"then\" in your responses.")
-        return c
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-
-            self.game.rule_antecedent = form['antecedent']
-            self.game.rule_consequent = form['consequent']
-            self.game.context = models.Game.Context.IDLE
-            self.game.turn = models.Game.Turn.CRITIC
-
-            text = f"Created the rule: IF {form['antecedent']}, THEN {form['consequent']}"
-            self.game.add_move(user=self.user, code=models.Move.Code.CREATE_RULE, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.CREATE_RULE}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.CREATE_RULE
 
 
 # -------------------------------------------------------------------------------------------------------------------- #
@@ -237,18 +245,17 @@ class CreateRuleForm(MoveForm):
 
 """
     (A) Update Rule FORM
-    
+
     The first stage of the game was the Advocate creating a rule for the given argument structure. In the Create Rule
     FORM, they initialized the argument structure's rule. If the Advocate decides to change the rule (for example,
     because there is a weakness or to protect against future attacks), then they can do so by providing the antecedent
     and consequent in this form. After submitting this form, the process() method must be invoked to update the game
     state as well as switch game control accordingly ---> Critic (Idle).
-    
-    VALIDATIONS
+
+    VALIDATIONS (engine)
         --- antecedent          :: after removing whitespace and "if" (if included), make sure the result is non-empty
         --- antecedent          :: make sure the antecedent & consequent do not match the current rule
         --- consequent          :: after removing whitespace and "then" (if included), make sure the result is non-empty
-        --- consequent          :: make sure the antecedent & consequent do not match the current rule
 """
 
 
@@ -257,28 +264,8 @@ class UpdateRuleForm(CreateRuleForm):
     antecedent = forms.CharField(required=False, max_length=1024)
     consequent = forms.CharField(required=False, max_length=1024)
 
-    def clean(self):
-        super().clean()
-        data = self.cleaned_data
-
-        if self.game.rule_antecedent == data['antecedent'] and self.game.rule_consequent == data['consequent']:
-            self.add_error('antecedent', "Rule already exists.")
-            WGA_GAME_LOGGER.debug(f"Invalid form: Rule already exists. {data}")
-
-        return self.cleaned_data
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-
-            self.game.rule_antecedent = form['antecedent']
-            self.game.rule_consequent = form['consequent']
-            self.game.context = models.Game.Context.IDLE
-            self.game.turn = models.Game.Turn.CRITIC
-
-            text = f"Updated the current rule to: IF {form['antecedent']}, THEN {form['consequent']}"
-            self.game.add_move(user=self.user, code=models.Move.Code.UPDATE_RULE, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.UPDATE_RULE}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.UPDATE_RULE
 
 
 # -------------------------------------------------------------------------------------------------------------------- #
@@ -286,7 +273,7 @@ class UpdateRuleForm(CreateRuleForm):
 
 """
     (C) Attack FORM
-    
+
     If the Critic wants to point out a weakness in the current argument structure, the Critic can do so by providing
     which link to attack and the explanation of the weakness. Depending on the link chosen, different instructions are
     presented to the Critic. The Critic must be careful that the weakness explanation only takes into consideration
@@ -306,29 +293,17 @@ class AttackForm(MoveForm):
     ])
     explain_attack = forms.CharField(required=False, label="Why are you attacking this link?", max_length=1024)
 
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-
-            self.game.context = models.Game.Context.ATTACK_RESPONSE
-            self.game.turn = models.Game.Turn.ADVOCATE
-            self.game.set_context_data([
-                form['link'],                                                             # chosen link to attack
-                form['explain_attack']                                                    # explanation of attack
-            ])
-
-            text = f"Attacked link {form['link']} with explanation: {form['explain_attack']}"
-            self.game.add_move(user=self.user, code=models.Move.Code.SENT_ATTACK, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.SENT_ATTACK}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.ATTACK
 
 
 """
     (A) Attack Response FORM
-    
+
     After the Critic submits an attack form, the Advocate must then respond to the attack (accept / reject). The
     Advocate is allowed to read through the Critic's instructions before making a decision. After submitting this form,
     the process() method must be invoked to update the game state as well as switch game control accordingly:
-    
+
         --- accept  ::  ---> Advocate (Idle)
         --- reject  ::  ---> Critic (Idle)
 """
@@ -336,8 +311,8 @@ class AttackForm(MoveForm):
 
 class AttackResponseForm(MoveForm):
 
-    ACCEPT = 'accept'
-    REJECT = 'reject'
+    ACCEPT = engine.Move.ACCEPT
+    REJECT = engine.Move.REJECT
 
     response = forms.ChoiceField(widget=forms.RadioSelect, choices=[
         (ACCEPT, "Accept"),
@@ -345,36 +320,6 @@ class AttackResponseForm(MoveForm):
     ])
     explanation = forms.CharField(required=False, label="Why is the attack invalid?", max_length=1024)
 
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            if form['response'] == self.ACCEPT:
-                self._process_accept()
-            elif form['response'] == self.REJECT:
-                self._process_reject()
-
-    def _process_accept(self):
-        form = self.cleaned_data
-
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.ADVOCATE
-        self.game.set_context_data([])
-
-        text = "Accepted attack as valid"
-        self.game.add_move(user=self.user, code=models.Move.Code.ACCEPTED_ATTACK, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.ACCEPTED_ATTACK}: \"{text}\"")
-
-    def _process_reject(self):
-        form = self.cleaned_data
-
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.CRITIC
-        self.game.set_context_data([])
-
-        text = f"Rejected the attack: {form['explanation']}"
-        self.game.add_move(user=self.user, code=models.Move.Code.REJECTED_ATTACK, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Successfully processed {models.Move.Code.REJECTED_ATTACK}: \"{text}\"")
-
 
 # -------------------------------------------------------------------------------------------------------------------- #
 
@@ -396,39 +341,11 @@ class UpdateFactsForm(MoveForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['edit'] = forms.ChoiceField(required=False, label="Which facts will you modify?", choices=[
-            (fp.id, str(fp)) for fp in self.game.factpair_set.all()
-        ])
-
-    def clean(self):
-        super().clean()
-        data = self.cleaned_data
-
-        source, target = data['source_replace'], data['target_replace']
-        if models.FactPair.objects.filter(game=self.game, source_fact=source, target_fact=target).exists():
-            self.add_error('source_replace', forms.ValidationError("Facts already exist"))
-            WGA_GAME_LOGGER.debug(f"Invalid form: Facts already exist. {data}")
-
-        return self.cleaned_data
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            old = get_object_or_404(models.FactPair, id=form['edit'])
-            new = models.FactPair(source_fact=form['source_replace'], target_fact=form['target_replace'])
-
-            self.game.context = models.Game.Context.PROPOSED_EDIT
-            self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-            self.game.set_context_data([
-                old.source_fact, old.target_fact,                                         # FactPair to be updated
-                new.source_fact, new.target_fact,                                         # FactPair used to replace
-                int(form['edit']),                                                        # id of FactPair to be updated
-                ""                                                                        # explanation of rejection
-            ])
+        self.fields['edit'] = forms.ChoiceField(required=False, label="Which facts will you modify?",
+                                                choices=self.game.get_fact_choices())
 
-            text = f"Proposed modifying facts: [Original] {old} >> [Proposed] {new}"
-            self.game.add_move(user=self.user, code=models.Move.Code.PROPOSED_EDIT, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.PROPOSED_EDIT}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.UPDATE_FACTS
 
 
 """
@@ -438,7 +355,7 @@ class UpdateFactsForm(MoveForm):
     modify). The Player has the option of modifying the proposal, which essentially creates a new proposal (based on the
     old proposal). After submitting this form, the process() method must be invoked to update the game state as well as
     switch game control accordingly:
-    
+
         --- accept  ::  ---> Player (Idle)
         --- reject  ::  ---> Opponent (Idle)
         --- modify  ::  ---> Opponent (Proposed Edit)
@@ -447,9 +364,9 @@ class UpdateFactsForm(MoveForm):
 
 class ProposedEditForm(MoveForm):
 
-    ACCEPT = 'accept'
-    REJECT = 'reject'
-    MODIFY = 'modify'
+    ACCEPT = engine.Move.ACCEPT
+    REJECT = engine.Move.REJECT
+    MODIFY = engine.Move.MODIFY
 
     response = forms.ChoiceField(widget=forms.RadioSelect, choices=[
         (ACCEPT, "Accept"),
@@ -460,69 +377,6 @@ class ProposedEditForm(MoveForm):
     source_replace = forms.CharField(required=False, max_length=1024)
     target_replace = forms.CharField(required=False, max_length=1024)
 
-    def clean(self):
-        super().clean()
-        data = self.cleaned_data
-
-        source, target = data['source_replace'], data['target_replace']
-        if models.FactPair.objects.filter(game=self.game, source_fact=source, target_fact=target).exists():
-            self.add_error('source_replace', forms.ValidationError("Facts already exist"))
-            WGA_GAME_LOGGER.debug(f"Invalid form: Facts already exist. {data}")
-
-        return self.cleaned_data
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            if form['response'] == self.ACCEPT:
-                self._process_accept()
-            elif form['response'] == self.REJECT:
-                self._process_reject()
-            elif form['response'] == self.MODIFY:
-                self._process_modify()
-
-    def _process_accept(self):
-        form = self.cleaned_data
-
-        data = self.game.get_context_data()
-        models.FactPair.objects.filter(id=data[4]).update(source_fact=data[2], target_fact=data[3])
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.CRITIC if self.is_critic else models.Game.Turn.ADVOCATE
-        self.game.set_context_data([])
-
-        text = "Accepted the proposed edit"
-        self.game.add_move(user=self.user, code=models.Move.Code.ACCEPTED_EDIT, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.ACCEPTED_EDIT}: \"{text}\"")
-
-    def _process_reject(self):
-        form = self.cleaned_data
-
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-        self.game.set_context_data([])
-
-        text = f"Rejected proposed edit: {form['explain_reject']}"
-        self.game.add_move(user=self.user, code=models.Move.Code.REJECTED_EDIT, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.REJECTED_EDIT}: \"{text}\"")
-
-    def _process_modify(self):
-        form = self.cleaned_data
-        data = self.game.get_context_data()
-
-        self.game.context = models.Game.Context.PROPOSED_EDIT
-        self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-        alt = models.FactPair(source_fact=form['source_replace'], target_fact=form['target_replace'])
-        self.game.set_context_data([
-            data[0], data[1],                                                             # FactPair to be updated
-            alt.source_fact, alt.target_fact,                                             # FactPair used to replace
-            data[4],                                                                      # id of FactPair to be updated
-            form['explain_reject']                                                        # explanation of rejection
-        ])
-
-        text = f"Proposed alternative: {alt}: {form['explain_reject']}"
-        self.game.add_move(user=self.user, code=models.Move.Code.MODIFIED_EDIT, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.MODIFIED_EDIT}: \"{text}\"")
-
 
 # -------------------------------------------------------------------------------------------------------------------- #
 
@@ -544,32 +398,8 @@ class AddFactsForm(MoveForm):
     target_add = forms.CharField(required=False, max_length=1024)
     explain_add = forms.CharField(required=False, label="Why do you think they are necessary?", max_length=1024)
 
-    def clean(self):
-        super().clean()
-        data = self.cleaned_data
-
-        source, target = data['source_add'], data['target_add']
-        if models.FactPair.objects.filter(game=self.game, source_fact=source, target_fact=target).exists():
-            self.add_error('source_add', forms.ValidationError("Facts already exist"))
-            WGA_GAME_LOGGER.debug(f"Invalid form: Facts already exist. {data}")
-
-        return self.cleaned_data
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            new = models.FactPair(source_fact=form['source_add'], target_fact=form['target_add'])
-
-            self.game.context = models.Game.Context.PROPOSED_ADD
-            self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-            self.game.set_context_data([
-                form['source_add'], form['target_add'],                                   # FactPair to be added
-                form['explain_add']                                                       # explanation of addition
-            ])
-
-            text = f"Proposed adding facts: {new}"
-            self.game.add_move(user=self.user, code=models.Move.Code.PROPOSED_ADD, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.PROPOSED_ADD}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.ADD_FACTS
 
 
 """
@@ -579,7 +409,7 @@ class AddFactsForm(MoveForm):
     modify). The Player has the option of modifying the proposal, which essentially creates a new proposal (based on the
     old proposal). After submitting this form, the process() method must be invoked to update the game state as well as
     switch game control accordingly:
-    
+
         --- accept  ::  ---> Player (Idle)
         --- reject  ::  ---> Opponent (Idle)
         --- modify  ::  ---> Opponent (Proposed Add)
@@ -588,9 +418,9 @@ class AddFactsForm(MoveForm):
 
 class ProposedAddForm(MoveForm):
 
-    ACCEPT = 'accept'
-    REJECT = 'reject'
-    MODIFY = 'modify'
+    ACCEPT = engine.Move.ACCEPT
+    REJECT = engine.Move.REJECT
+    MODIFY = engine.Move.MODIFY
 
     response = forms.ChoiceField(widget=forms.RadioSelect, choices=[
         (ACCEPT, "Accept"),
@@ -601,73 +431,13 @@ class ProposedAddForm(MoveForm):
     source_add = forms.CharField(required=False, max_length=1024)
     target_add = forms.CharField(required=False, max_length=1024)
 
-    def clean(self):
-        super().clean()
-        data = self.cleaned_data
-
-        source, target = data['source_add'], data['target_add']
-        if models.FactPair.objects.filter(game=self.game, source_fact=source, target_fact=target).exists():
-            self.add_error('source_add', forms.ValidationError("Facts already exist"))
-            WGA_GAME_LOGGER.debug(f"Invalid form: Facts already exist. {data}")
-
-        return self.cleaned_data
-
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            if form['response'] == self.ACCEPT:
-                self._process_accept()
-            elif form['response'] == self.REJECT:
-                self._process_reject()
-            elif form['response'] == self.MODIFY:
-                self._process_modify()
-
-    def _process_accept(self):
-        form = self.cleaned_data
-        data = self.game.get_context_data()
-
-        models.FactPair.objects.create(game=self.game, source_fact=data[0], target_fact=data[1])
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.CRITIC if self.is_critic else models.Game.Turn.ADVOCATE
-        self.game.set_context_data([])
-
-        text = "Accepted proposed addition"
-        self.game.add_move(user=self.user, code=models.Move.Code.ACCEPTED_ADD, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.ACCEPTED_ADD}: \"{text}\"")
-
-    def _process_reject(self):
-        form = self.cleaned_data
-
-        self.game.context = models.Game.Context.IDLE
-        self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-        self.game.set_context_data([])
-
-        text = f"Rejected proposed addition: {form['explain_reject']}"
-        self.game.add_move(user=self.user, code=models.Move.Code.REJECTED_ADD, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.REJECTED_ADD}: \"{text}\"")
-
-    def _process_modify(self):
-        form = self.cleaned_data
-
-        self.game.context = 'Proposed Add'
-        self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-        alt = models.FactPair(source_fact=form['source_add'], target_fact=form['target_add'])
-        self.game.set_context_data([
-            form['source_add'], form['target_add'],                                       # FactPair to be added
-            form['explain_reject']                                                        # explanation of addition
-        ])
-
-        text = f"Proposed alternative: {alt}: {form['explain_reject']}"
-        self.game.add_move(user=self.user, code=models.Move.Code.MODIFIED_ADD, text=text)
-        WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.MODIFIED_ADD}: \"{text}\"")
-
 
 # -------------------------------------------------------------------------------------------------------------------- #
 
 
 """
     (B) Pass FORM
-    
+
     The Player can opt to pass their turn if they see that there is more reasonable moves they can make. The Advocate
     may pass at anytime but the Critic may only pass after 8 moves have been made (to ensure that an effort was made in
     refining the argument structure). When two consecutive passes have been made (which means both the Advocate and
@@ -677,24 +447,8 @@ class ProposedAddForm(MoveForm):
 
 class PassForm(MoveForm):
 
-    def process(self):
-        if self.is_valid():
-            self.game.context = models.Game.Context.IDLE
-            self.game.turn = models.Game.Turn.ADVOCATE if self.is_critic else models.Game.Turn.CRITIC
-
-            text = "Passed"
-            self.game.add_move(user=self.user, code=models.Move.Code.PASS, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.PASS}: \"{text}\"")
-
-            self._process_end()
-
-    def _process_end(self):
-        if models.Move.Code.PASS in str(list(self.game.move_set.all().order_by('date'))[-2]):  # End the game
-            self.game.context = models.Game.Context.COMPLETED
-            self.game.turn = models.Game.Turn.COMPLETED
-            text = "Registered two consecutive passes, ending the game"
-            self.game.add_move(user=self.user, code=models.Move.Code.COMPLETED, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.COMPLETED}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.PASS
 
 
 # -------------------------------------------------------------------------------------------------------------------- #
@@ -702,7 +456,7 @@ class PassForm(MoveForm):
 
 """
     (B) Report FORM
-    
+
     If the Player is experiencing a technical or logistic issue (must drop out pre-maturely, for example) or the
     Opponent is behaving contrary to the spirit of the game, the Player can fill out a report form. By doing so, the
     game is suspended until a moderator can review the report. Depending on the moderator's final decisions and
@@ -715,18 +469,8 @@ class ReportForm(MoveForm):
 
     text = forms.CharField(required=False, label="Describe the problem you are reporting", max_length=1024)
 
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-
-            models.Report.objects.create(user=self.user, game=self.game, text=form['text'])
-            self.game.context = models.Game.Context.SUSPENDED
-            self.game.turn = models.Game.Turn.MODERATED
-            self.game.set_context_data([])
-
-            text = f"Submitted a report to the administrators: {form['text']}"
-            self.game.add_move(user=self.user, code=models.Move.Code.REPORT, text=text)
-            WGA_GAME_LOGGER.info(f"[{self.user.key}] Processed {models.Move.Code.REPORT}: \"{text}\"")
+    def get_move(self):
+        return engine.Move.REPORT
 
 
 # -------------------------------------------------------------------------------------------------------------------- #
@@ -734,21 +478,21 @@ class ReportForm(MoveForm):
 
 """
     Critic & Advocate Idle FORMS
-    
+
     The main forms that displays all move options for the Advocate and Critic. These two classes inherits the
-    appropriate forms above depending on their role. Depending on move_choice, the process() method calls the
-    corresponding parent's process() method in order to change game states and turn values.
+    appropriate forms above depending on their role (for their fields). The move is the chosen move_choice; only the
+    moves the game engine allows in the game's state are offered (e.g. passing, for the Critic).
 """
 
 
 class CriticIdleForm(UpdateFactsForm, AddFactsForm, AttackForm, ReportForm, PassForm):
 
     class MoveOptions:
-        ATTACK = 'attack'
-        UPDATE_FACTS = 'update'
-        ADD_FACTS = 'add'
-        REPORT = 'report'
-        PASS = 'pass'
+        ATTACK = engine.Move.ATTACK
+        UPDATE_FACTS = engine.Move.UPDATE_FACTS
+        ADD_FACTS = engine.Move.ADD_FACTS
+        REPORT = engine.Move.REPORT
+        PASS = engine.Move.PASS
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -756,35 +500,26 @@ class CriticIdleForm(UpdateFactsForm, AddFactsForm, AttackForm, ReportForm, Pass
             (self.MoveOptions.ATTACK, "Attack"),
             (self.MoveOptions.UPDATE_FACTS, "Update facts"),
             (self.MoveOptions.ADD_FACTS, "Add facts"),
-            (self.MoveOptions.REPORT, "Contact administrators")
+            (self.MoveOptions.REPORT, "Contact administrators"),
+            (self.MoveOptions.PASS, "Pass")
         ]
-        if self.game.can_pass():
-            CHOICES.append((self.MoveOptions.PASS, "Pass"))
-        self.fields['move_choice'] = forms.ChoiceField(widget=forms.RadioSelect, choices=CHOICES)
+        allowed = engine.options(self.state, self.role)
+        self.fields['move_choice'] = forms.ChoiceField(widget=forms.RadioSelect, choices=[
+            choice for choice in CHOICES if choice[0] in allowed
+        ])
 
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            if form['move_choice'] == self.MoveOptions.UPDATE_FACTS:
-                UpdateFactsForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.ADD_FACTS:
-                AddFactsForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.ATTACK:
-                AttackForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.REPORT:
-                ReportForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.PASS:
-                PassForm.process(self)
+    def get_move(self):
+        return self.cleaned_data['move_choice']
 
 
 class AdvocateIdleForm(UpdateFactsForm, AddFactsForm, UpdateRuleForm, ReportForm, PassForm):
 
     class MoveOptions:
-        UPDATE_RULE = 'update_rule'
-        UPDATE_FACTS = 'update'
-        ADD_FACTS = 'add'
-        REPORT = 'report'
-        PASS = 'pass'
+        UPDATE_RULE = engine.Move.UPDATE_RULE
+        UPDATE_FACTS = engine.Move.UPDATE_FACTS
+        ADD_FACTS = engine.Move.ADD_FACTS
+        REPORT = engine.Move.REPORT
+        PASS = engine.Move.PASS
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -795,21 +530,13 @@ class AdvocateIdleForm(UpdateFactsForm, AddFactsForm, UpdateRuleForm, ReportForm
             (self.MoveOptions.REPORT, "Contact administrators"),
             (self.MoveOptions.PASS, "Pass")
         ]
-        self.fields['move_choice'] = forms.ChoiceField(widget=forms.RadioSelect, choices=CHOICES)
+        allowed = engine.options(self.state, self.role)
+        self.fields['move_choice'] = forms.ChoiceField(widget=forms.RadioSelect, choices=[
+            choice for choice in CHOICES if choice[0] in allowed
+        ])
 
-    def process(self):
-        if self.is_valid():
-            form = self.cleaned_data
-            if form['move_choice'] == self.MoveOptions.UPDATE_FACTS:
-                UpdateFactsForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.ADD_FACTS:
-                AddFactsForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.UPDATE_RULE:
-                UpdateRuleForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.REPORT:
-                ReportForm.process(self)
-            elif form['move_choice'] == self.MoveOptions.PASS:
-                PassForm.process(self)
+    def get_move(self):
+        return self.cleaned_data['move_choice']
 
 
 ########################################################################################################################
@@ -21,6 +21,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q
 
 from wga import models
+from wga import metrics
 from . import forms
 
 
@@ -57,25 +58,44 @@ def find_user_data(url_key):
     
     Takes in an Intermediary identifier key. Returns a dictionary of all relevant information about the Intermediary
     object (specifically, the Intermediary object itself, its associated Game object, its associated User object, and a
-    Boolean value indicating the User's role).
+    Boolean value indicating the User's role), and the latest window of the game's move history (see Game.get_history;
+    older moves are loaded over the WebSocket). The game slot's messages are only included when with_messages is set:
+    interface updates sent over WebSockets keep the messages the web browser already has.
 """
 
 
-def find_game_data(url_key):
+def find_game_data(url_key, with_messages=True):
     intermediary = get_object_or_404(models.Intermediary, key=url_key)
     game = intermediary.criticism if hasattr(intermediary, 'criticism') else intermediary.advocacy
     data = find_user_data(url_key=intermediary.user.key)
+    (history, history_older) = game.get_history()
     data.update({
         'intermediary': intermediary,
         'game': game,
-        'moves': list(game.move_set.all().order_by('date')),
-        'messages': list((intermediary.user.group.messages.all() | intermediary.messages.all()).order_by('date')),
+        'history': history,
+        'history_older': history_older,
+        'messages': find_messages(intermediary) if with_messages else [],
         'user': intermediary.user,
         'is_critic': intermediary.role == models.Intermediary.Role.CRITIC
     })
     return data
 
 
+"""
+    Find Messages HELPER FUNCTION
+
+    Takes in an Intermediary object and (optionally) the date of the newest message the mTurk worker has already seen.
+    Returns the game slot's Delivery objects (oldest first) sent after that date, read from the game slot's inbox index.
+"""
+
+
+def find_messages(intermediary, since=None):
+    deliveries = models.Delivery.objects.filter(intermediary=intermediary).select_related('message').order_by('date')
+    if since:
+        deliveries = deliveries.filter(date__gt=since)
+    return list(deliveries)
+
+
 """
     Is Turn HELPER FUNCTION
     
@@ -222,7 +242,7 @@ class GameView(View):
             if not is_turn(data):
                 data['game'].context = 'Not Turn'  # DO NOT SAVE
             data['form'] = forms.build_form(user=data['user'], game=data['game'], is_critic=data['is_critic'])
-            return render(request, 'wga/user/game.html', data)
+            return HttpResponse(metrics.render_to_string('wga/user/game.html', data, request=request))
         else:
             WGA_PLAYER_LOGGER.warning(f"Request lacks session data.")
             raise Http404("Login Credentials Missing")
@@ -0,0 +1,133 @@
+"""
+    WG-A Static Bundles
+
+    This file contains the static asset bundles and the static files storage building them. Every page used to fetch
+    jQuery and Bootstrap from external CDNs plus five or six of our own files; when a session starts, every player
+    loads the same pages within seconds of each other. Each page type now loads one fingerprinted CSS file and one
+    fingerprinted JS file:
+
+        --- base                :: every player and moderator page (see the container.html templates)
+        --- game                :: the player's game page (see user/game.html)
+
+    jQuery 3.4.1 and Bootstrap 3.4.0 (CSS, JS and Glyphicons fonts) are vendored, unmodified, in static/wga/vendor/.
+    Note that jQuery is one patch release ahead of the 3.4.0 the pages loaded from the CDN (and that post_game.html,
+    which is opened outside the site, still loads): 3.4.1 only fixes jQuery.extend's prototype pollution
+    (CVE-2019-11358), but it is a version change all the same.
+    When collectstatic runs, BundledStaticFilesStorage concatenates each bundle's files into static/wga/bundles/, then
+    WhiteNoise names every file after its content hash, writes gzip and brotli copies next to it, and serves the hashed
+    files with a far-future immutable Cache-Control header (see WhiteNoiseMiddleware in settings.py). When DEBUG is on,
+    the {% bundle %} template tag includes the bundle's files one by one instead, so they can be edited without
+    running collectstatic.
+
+    Page scripts loaded with $.getScript() (interface.js, add_game.js, report_list.js, ...) are not bundled, but they
+    are fingerprinted too, and setup.js lets the browser cache them.
+
+    DOCUMENTATION
+    https://docs.djangoproject.com/en/2.2/ref/contrib/staticfiles/#manifeststaticfilesstorage
+    http://whitenoise.evans.io/en/stable/django.html
+"""
+
+import posixpath
+import re
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+BUNDLES = {
+    'base': {
+        'css': [
+            'wga/vendor/bootstrap/css/bootstrap.min.css',
+            'wga/wga.css'
+        ],
+        'js': [
+            'wga/vendor/jquery/jquery.min.js',
+            'wga/vendor/bootstrap/js/bootstrap.min.js',
+            'wga/reconnecting-websocket.min.js',
+            'wga/jquery.serializeObject.min.js',
+            'wga/setup.js'
+        ]
+    },
+    'game': {
+        'js': [
+            'wga/user/game.js',
+            'wga/user/navigation.js'
+        ]
+    }
+}
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)(?P<url>[^'")]+)\1\s*\)""")
+SOURCE_MAP = re.compile(r'^\s*(/\*|//)[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+
+########################################################################################################################
+
+
+"""
+    Bundle HELPER FUNCTIONS
+
+    --- bundle_path             :: the bundle's file name (relative to STATIC_ROOT)
+    --- join                    :: concatenates the bundle's files
+    --- relocate_css            :: rewrites a stylesheet's relative url()s for the bundle's directory
+"""
+
+
+def bundle_path(name, kind):
+    return f"wga/bundles/{name}.{kind}"
+
+
+def join(kind, sources):
+    # Source map comments would point the browser's developer tools at the wrong file.
+    contents = [SOURCE_MAP.sub('', content).strip() for content in sources.values()]
+    if kind == 'js':
+        return ';\n'.join(contents) + ';\n'  # a file not ending with a semicolon must not run into the next one
+    return '\n'.join(contents) + '\n'
+
+
+def relocate_css(content, source, bundle):
+    def relocate(match):
+        url = match.group('url').strip()
+        if url.startswith(('/', '#', 'data:', 'http:', 'https:')):
+            return match.group(0)
+        (path, suffix) = re.match(r'([^?#]*)(.*)', url).groups()
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        return f"url(\"{posixpath.relpath(path, posixpath.dirname(bundle))}{suffix}\")"
+    return CSS_URL.sub(relocate, content)
+
+
+########################################################################################################################
+
+
+"""
+    Bundled Static Files STORAGE
+
+    STATICFILES_STORAGE in settings.py. Before WhiteNoise fingerprints and compresses the collected files, the bundles
+    are written to STATIC_ROOT and handed to it along with the other files.
+"""
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for (name, kinds) in BUNDLES.items():
+                for (kind, files) in kinds.items():
+                    path = bundle_path(name, kind)
+                    content = join(kind, self._read(files, paths, path))
+                    if self.exists(path):
+                        self.delete(path)
+                    self._save(path, ContentFile(content.encode('utf-8')))
+                    paths[path] = (self, path)
+        yield from super().post_process(paths, dry_run, **options)
+
+    @staticmethod
+    def _read(files, paths, bundle):
+        sources = {}
+        for file in files:
+            if file not in paths:
+                raise ValueError(f"The bundle {bundle} includes {file}, which is not a static file.")
+            (storage, path) = paths[file]
+            with storage.open(path) as source:
+                content = source.read().decode('utf-8')
+            sources[file] = relocate_css(content, file, bundle) if bundle.endswith('.css') else content
+        return sources
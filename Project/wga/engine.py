@@ -0,0 +1,566 @@
+"""
+    WG-A Game Engine
+
+    This file contains the rules of the Warrant Game: Analogy as a state machine over plain Python objects. A game's
+    state (see State) is changed only by moves. Each move is looked up in the transition table by the game's context,
+    the player's role and the move chosen. Its clean function validates and normalizes the move's data, and its
+    transition function changes the state. Nothing in this file touches the database: the move forms (see
+    assets_user/forms.py) build a State from a Game (Game.get_state), apply the player's move, and write the Result back
+    (Game.commit_move). Replays and simulations can apply moves to a State directly:
+
+        state = engine.State()
+        engine.apply(state, engine.Turn.ADVOCATE, engine.Move.CREATE_RULE, {'antecedent': "x", 'consequent': "y"})
+        engine.apply(state, engine.Turn.CRITIC, engine.Move.ATTACK, {'link': "L1", 'explain_attack': "z"})
+
+    Illegal moves (not the player's turn, not a move of the game's context, or invalid data) raise IllegalMove.
+
+    Every applied move also returns its event: the player's role, the move and its cleaned data (the first move of a
+    game also carries a snapshot of the starting state). Events are saved with the move (Move.event), so replay() can
+    rebuild a game's state at any move without reading the moves' texts (see replay.py).
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+
+
+########################################################################################################################
+
+
+"""
+    Game Constants
+
+    --- Context                 :: the game's current state (Game.context)
+    --- Turn                    :: the player whose turn it is (Game.turn); also the role of the player making a move
+    --- Code                    :: the code of a recorded move (Move.code)
+    --- Move                    :: the moves a player may choose (the move forms' move_choice and response values)
+    --- Effect                  :: changes to the game's facts or reports that a move asks the database to make
+"""
+
+
+class Context:
+    NOT_TURN = "Not Turn"
+    CREATE_RULE = "Create Rule"
+    IDLE = "Idle"
+    ATTACK_RESPONSE = "Attack Response"
+    PROPOSED_EDIT = "Proposed Edit"
+    PROPOSED_ADD = "Proposed Add"
+    SUSPENDED = "Suspended"
+    COMPLETED = "Completed"
+    CONVERSATION = "Conversation"
+
+
+class Turn:
+    CRITIC = 0
+    ADVOCATE = 1
+    MODERATED = 2
+    COMPLETED = 3
+    CONVERSATION = 4
+
+
+class Code:
+    CREATE_RULE = "Create Rule"
+    UPDATE_RULE = "Update Rule"
+
+    SENT_ATTACK = "Sent Attack"
+    ACCEPTED_ATTACK = "Accepted Attack"
+    REJECTED_ATTACK = "Rejected Attack"
+
+    PROPOSED_EDIT = "Proposed Edit"
+    ACCEPTED_EDIT = "Accepted Edit"
+    REJECTED_EDIT = "Rejected Edit"
+    MODIFIED_EDIT = "Modified Edit"
+
+    PROPOSED_ADD = "Proposed Add"
+    ACCEPTED_ADD = "Accepted Add"
+    REJECTED_ADD = "Rejected Add"
+    MODIFIED_ADD = "Modified Add"
+
+    REPORT = "Report"
+    REPORT_REVIEWED = "Report Reviewed"
+
+    PASS = "Pass"
+    COMPLETED = "Completed"
+
+
+class Move:
+    CREATE_RULE = 'create_rule'
+    UPDATE_RULE = 'update_rule'
+    ATTACK = 'attack'
+    UPDATE_FACTS = 'update'
+    ADD_FACTS = 'add'
+    REPORT = 'report'
+    PASS = 'pass'
+    ACCEPT = 'accept'
+    REJECT = 'reject'
+    MODIFY = 'modify'
+    RESOLVE = 'resolve'                                                                   # moderators only
+
+
+class Effect:
+    UPDATE_FACT = 'update_fact'                                                           # (fact id, source, target)
+    ADD_FACT = 'add_fact'                                                                 # (source, target)
+    REPORT = 'report'                                                                     # (text,)
+
+
+BLANK_RULE = "__________"
+LINKS = ('L1', 'L2', 'L3', 'L4', 'L5')
+CRITIC_PASS_AFTER = 8  # the Critic may only pass once more than this many moves have been made
+WHITESPACE = re.compile(r'\s+')
+
+
+########################################################################################################################
+
+
+"""
+    Game State CLASS
+
+    Everything the rules need to know about a game.
+
+    DATA MEMBERS
+        --- context             :: the game's context (see Context)
+        --- turn                :: the player whose turn it is (see Turn)
+        --- antecedent          :: the rule's antecedent
+        --- consequent          :: the rule's consequent
+        --- context_data        :: tuple of strings describing the pending attack or proposal (see Game.context_data)
+        --- facts               :: dictionary of the game's fact pairs, {id: (source fact, target fact)}
+        --- moves               :: number of moves made so far
+        --- last_move           :: code of the latest move (None before the first move)
+
+    Step and Result
+
+        --- Step                :: a recorded move: its code and text, and the context and turn it left the game in
+        --- Result              :: the Steps of an applied move (passing may also end the game), its Effects & event
+"""
+
+
+class State:
+
+    __slots__ = ('context', 'turn', 'antecedent', 'consequent', 'context_data', 'facts', 'moves', 'last_move')
+
+    def __init__(self, context=Context.CREATE_RULE, turn=Turn.ADVOCATE, antecedent=BLANK_RULE,
+                 consequent=BLANK_RULE, context_data=(), facts=None, moves=0, last_move=None):
+        self.context = context
+        self.turn = turn
+        self.antecedent = antecedent
+        self.consequent = consequent
+        self.context_data = tuple(context_data)
+        self.facts = dict(facts or {})
+        self.moves = moves
+        self.last_move = last_move
+
+    def copy(self):
+        return State(self.context, self.turn, self.antecedent, self.consequent, self.context_data, self.facts,
+                     self.moves, self.last_move)
+
+    def snapshot(self):
+        return {
+            'context': self.context,
+            'turn': self.turn,
+            'antecedent': self.antecedent,
+            'consequent': self.consequent,
+            'context_data': list(self.context_data),
+            'facts': [[fact_id, source, target] for (fact_id, (source, target)) in sorted(self.facts.items())],
+            'moves': self.moves,
+            'last_move': self.last_move
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        data = dict(snapshot, facts={fact_id: (source, target) for (fact_id, source, target) in snapshot['facts']})
+        return cls(**data)
+
+    def __eq__(self, other):
+        return isinstance(other, State) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self):
+        return f"State(context={self.context!r}, turn={self.turn!r}, moves={self.moves!r})"
+
+
+Step = namedtuple('Step', ['code', 'text', 'context', 'turn'])
+Result = namedtuple('Result', ['steps', 'effects', 'event'])
+
+
+class IllegalMove(Exception):
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.field = field  # the move data's offending field (None if the move itself is illegal)
+
+
+########################################################################################################################
+
+
+"""
+    Engine FUNCTIONS
+
+    --- options                 :: the moves a player may choose in the game's current state
+    --- validate                :: checks a move against the rules; returns its cleaned data (raises IllegalMove)
+    --- apply                   :: validates a move and changes the state accordingly; returns the move's Result
+    --- resolve                 :: a moderator resolving a report returns the game to a player (or ends it)
+    --- replay                  :: applies a saved event (without validating it again); returns the move's Result
+    --- opponent                :: the other player's role
+    --- facts_text              :: a fact pair as displayed to the players (see FactPair.__str__)
+    --- fact_hash               :: a fact pair's content hash; fact pairs differing only in case or whitespace are
+                                   duplicates (see FactPair.content_hash)
+"""
+
+
+def options(state, role):
+    if state.turn != role:
+        return []
+    return [move for move in _OPTIONS.get((state.context, role), ()) if move != Move.PASS or _can_pass(state, role)]
+
+
+def validate(state, role, move, data):
+    if state.turn != role:
+        raise IllegalMove("It is not your turn.")
+    rule = TRANSITIONS.get((state.context, role, move))
+    if rule is None:
+        raise IllegalMove(f"\"{move}\" is not a valid move at this point of the game.", 'move_choice')
+    return rule[0](state, role, data)
+
+
+def apply(state, role, move, data):
+    cleaned = validate(state, role, move, data)
+    event = {'role': role, 'move': move, 'data': cleaned}
+    if not state.moves:
+        event['start'] = state.snapshot()
+    steps, effects = [], []
+    TRANSITIONS[(state.context, role, move)][1](state, role, cleaned, steps, effects)
+    return Result(steps, effects, event)
+
+
+def resolve(state, returned, note):
+    data = {'returned': returned, 'note': note}
+    event = {'role': Turn.MODERATED, 'move': Move.RESOLVE, 'data': data}
+    if not state.moves:
+        event['start'] = state.snapshot()
+    steps = []
+    _resolve(state, Turn.MODERATED, data, steps, [])
+    return Result(steps, [], event)
+
+
+def replay(state, event):
+    if 'start' in event:
+        start = State.from_snapshot(event['start'])
+        for slot in State.__slots__:
+            setattr(state, slot, getattr(start, slot))
+    (role, move) = (event['role'], event['move'])
+    transition = _resolve if move == Move.RESOLVE else TRANSITIONS.get((state.context, role, move), (None, None))[1]
+    if transition is None:
+        raise IllegalMove(f"\"{move}\" cannot be replayed in the {state.context} context (turn {state.turn}).")
+    steps, effects = [], []
+    transition(state, role, event['data'], steps, effects)
+    return Result(steps, effects, event)
+
+
+def opponent(role):
+    return Turn.ADVOCATE if role == Turn.CRITIC else Turn.CRITIC
+
+
+def facts_text(source, target):
+    return f"{source} | {target}"
+
+
+def fact_hash(source, target):
+    normalized = [WHITESPACE.sub(' ', str(fact)).strip().casefold() for fact in (source, target)]
+    return hashlib.sha256('\x1f'.join(normalized).encode('utf-8')).hexdigest()
+
+
+def _step(state, steps, code, text, context, turn, context_data=None):
+    state.context = context
+    state.turn = turn
+    if context_data is not None:
+        state.context_data = tuple(str(s) for s in context_data)
+    state.moves += 1
+    state.last_move = code
+    steps.append(Step(code, text, context, turn))
+
+
+########################################################################################################################
+
+
+"""
+    Clean FUNCTIONS
+
+    Take the game state, the player's role and the move's data (a dictionary, e.g. a form's cleaned_data). Return the
+    data the transition needs, stripped of surrounding whitespace; raise IllegalMove if the move breaks a rule:
+
+        --- rule                :: antecedent & consequent are non-empty after removing "if" / "then"
+        --- update rule         :: antecedent & consequent are not just "if" / "then" (they may be empty) and differ
+                                   from the current rule
+        --- attack              :: the attacked link, if any, is one of L1-L5
+        --- update facts        :: the replaced fact pair exists; the replacement is not an existing fact pair
+        --- add facts           :: the added fact pair is not an existing fact pair
+        --- modify              :: the alternative proposal is not an existing fact pair
+        --- pass                :: the Critic may only pass once more than 8 moves have been made
+"""
+
+
+def _text(data, field):
+    return str(data.get(field) or '').strip()
+
+
+def _strip_word(data, field, word, required=True):
+    value = _text(data, field)
+    if value[:len(word)].lower() == word:
+        value = value[len(word):].strip()
+        if not value:
+            raise IllegalMove(f"Exclude \"{word}\" in your responses.", field)
+    if required and not value:
+        raise IllegalMove("This field is required.", field)
+    return value
+
+
+def _new_facts(state, data, source_field, target_field):
+    pair = (_text(data, source_field), _text(data, target_field))
+    if fact_hash(*pair) in {fact_hash(*facts) for facts in state.facts.values()}:
+        raise IllegalMove("Facts already exist", source_field)
+    return pair
+
+
+def _can_pass(state, role):
+    return role != Turn.CRITIC or state.moves > CRITIC_PASS_AFTER
+
+
+def _clean_rule(state, role, data, required=True):
+    return {
+        'antecedent': _strip_word(data, 'antecedent', "if", required),
+        'consequent': _strip_word(data, 'consequent', "then", required)
+    }
+
+
+def _clean_update_rule(state, role, data):
+    cleaned = _clean_rule(state, role, data, required=False)  # the Update Rule fields are optional
+    if (cleaned['antecedent'], cleaned['consequent']) == (state.antecedent, state.consequent):
+        raise IllegalMove("Rule already exists.", 'antecedent')
+    return cleaned
+
+
+def _clean_attack(state, role, data):
+    link = _text(data, 'link')
+    if link and link not in LINKS:  # the link is optional, like the attack's explanation
+        raise IllegalMove("Choose the link you are attacking.", 'link')
+    return {'link': link, 'explain_attack': _text(data, 'explain_attack')}
+
+
+def _clean_explanation(field):
+    return lambda state, role, data: {'explanation': _text(data, field)}
+
+
+def _clean_update_facts(state, role, data):
+    try:
+        edit = int(data.get('edit'))
+    except (TypeError, ValueError):
+        edit = None
+    if edit not in state.facts:
+        raise IllegalMove("Choose the facts you are modifying.", 'edit')
+    source, target = _new_facts(state, data, 'source_replace', 'target_replace')
+    return {'edit': edit, 'source': source, 'target': target}
+
+
+def _clean_modify_edit(state, role, data):
+    source, target = _new_facts(state, data, 'source_replace', 'target_replace')
+    return {'source': source, 'target': target, 'explanation': _text(data, 'explain_reject')}
+
+
+def _clean_add_facts(state, role, data):
+    source, target = _new_facts(state, data, 'source_add', 'target_add')
+    return {'source': source, 'target': target, 'explanation': _text(data, 'explain_add')}
+
+
+def _clean_modify_add(state, role, data):
+    source, target = _new_facts(state, data, 'source_add', 'target_add')
+    return {'source': source, 'target': target, 'explanation': _text(data, 'explain_reject')}
+
+
+def _clean_report(state, role, data):
+    return {'text': _text(data, 'text')}
+
+
+def _clean_pass(state, role, data):
+    if not _can_pass(state, role):
+        raise IllegalMove(f"The Critic may only pass after {CRITIC_PASS_AFTER} moves.", 'move_choice')
+    return {}
+
+
+def _clean_nothing(state, role, data):
+    return {}
+
+
+########################################################################################################################
+
+
+"""
+    Transition FUNCTIONS
+
+    Take the game state, the player's role, the cleaned data, and the lists collecting the move's Steps and Effects.
+    Change the state (see the move forms in assets_user/forms.py for the rules of each move):
+
+        --- create / update rule            ---> Critic (Idle)
+        --- attack                          ---> Advocate (Attack Response)
+        --- attack response :: accept       ---> Advocate (Idle)
+                            :: reject       ---> Critic (Idle)
+        --- update / add facts              ---> Opponent (Proposed Edit / Proposed Add)
+        --- proposal        :: accept       ---> Player (Idle)
+                            :: reject       ---> Opponent (Idle)
+                            :: modify       ---> Opponent (Proposed Edit / Proposed Add)
+        --- report                          ---> Moderated (Suspended)
+        --- resolve (moderator)             ---> the returned player (Idle), or Completed
+        --- pass                            ---> Opponent (Idle), or Completed after two consecutive passes
+"""
+
+
+def _create_rule(state, role, data, steps, effects):
+    state.antecedent, state.consequent = data['antecedent'], data['consequent']
+    text = f"Created the rule: IF {data['antecedent']}, THEN {data['consequent']}"
+    _step(state, steps, Code.CREATE_RULE, text, Context.IDLE, Turn.CRITIC)
+
+
+def _update_rule(state, role, data, steps, effects):
+    state.antecedent, state.consequent = data['antecedent'], data['consequent']
+    text = f"Updated the current rule to: IF {data['antecedent']}, THEN {data['consequent']}"
+    _step(state, steps, Code.UPDATE_RULE, text, Context.IDLE, Turn.CRITIC)
+
+
+def _attack(state, role, data, steps, effects):
+    text = f"Attacked link {data['link']} with explanation: {data['explain_attack']}"
+    _step(state, steps, Code.SENT_ATTACK, text, Context.ATTACK_RESPONSE, Turn.ADVOCATE, [
+        data['link'],                                                                     # chosen link to attack
+        data['explain_attack']                                                            # explanation of attack
+    ])
+
+
+def _accept_attack(state, role, data, steps, effects):
+    _step(state, steps, Code.ACCEPTED_ATTACK, "Accepted attack as valid", Context.IDLE, Turn.ADVOCATE, [])
+
+
+def _reject_attack(state, role, data, steps, effects):
+    text = f"Rejected the attack: {data['explanation']}"
+    _step(state, steps, Code.REJECTED_ATTACK, text, Context.IDLE, Turn.CRITIC, [])
+
+
+def _update_facts(state, role, data, steps, effects):
+    old = state.facts[data['edit']]
+    new = facts_text(data['source'], data['target'])
+    text = f"Proposed modifying facts: [Original] {facts_text(*old)} >> [Proposed] {new}"
+    _step(state, steps, Code.PROPOSED_EDIT, text, Context.PROPOSED_EDIT, opponent(role), [
+        old[0], old[1],                                                                   # FactPair to be updated
+        data['source'], data['target'],                                                   # FactPair used to replace
+        data['edit'],                                                                     # id of FactPair to be updated
+        ""                                                                                # explanation of rejection
+    ])
+
+
+def _accept_edit(state, role, data, steps, effects):
+    pending = state.context_data
+    state.facts[int(pending[4])] = (pending[2], pending[3])
+    effects.append((Effect.UPDATE_FACT, int(pending[4]), pending[2], pending[3]))
+    _step(state, steps, Code.ACCEPTED_EDIT, "Accepted the proposed edit", Context.IDLE, role, [])
+
+
+def _reject_edit(state, role, data, steps, effects):
+    text = f"Rejected proposed edit: {data['explanation']}"
+    _step(state, steps, Code.REJECTED_EDIT, text, Context.IDLE, opponent(role), [])
+
+
+def _modify_edit(state, role, data, steps, effects):
+    pending = state.context_data
+    text = f"Proposed alternative: {facts_text(data['source'], data['target'])}: {data['explanation']}"
+    _step(state, steps, Code.MODIFIED_EDIT, text, Context.PROPOSED_EDIT, opponent(role), [
+        pending[0], pending[1],                                                           # FactPair to be updated
+        data['source'], data['target'],                                                   # FactPair used to replace
+        pending[4],                                                                       # id of FactPair to be updated
+        data['explanation']                                                               # explanation of rejection
+    ])
+
+
+def _add_facts(state, role, data, steps, effects):
+    text = f"Proposed adding facts: {facts_text(data['source'], data['target'])}"
+    _step(state, steps, Code.PROPOSED_ADD, text, Context.PROPOSED_ADD, opponent(role), [
+        data['source'], data['target'],                                                   # FactPair to be added
+        data['explanation']                                                               # explanation of addition
+    ])
+
+
+def _accept_add(state, role, data, steps, effects):
+    pending = state.context_data
+    fact_id = data.get('fact_id') or max(state.facts, default=0) + 1  # the saved event has the database's id
+    state.facts[fact_id] = (pending[0], pending[1])
+    effects.append((Effect.ADD_FACT, pending[0], pending[1]))
+    _step(state, steps, Code.ACCEPTED_ADD, "Accepted proposed addition", Context.IDLE, role, [])
+
+
+def _reject_add(state, role, data, steps, effects):
+    text = f"Rejected proposed addition: {data['explanation']}"
+    _step(state, steps, Code.REJECTED_ADD, text, Context.IDLE, opponent(role), [])
+
+
+def _modify_add(state, role, data, steps, effects):
+    text = f"Proposed alternative: {facts_text(data['source'], data['target'])}: {data['explanation']}"
+    _step(state, steps, Code.MODIFIED_ADD, text, Context.PROPOSED_ADD, opponent(role), [
+        data['source'], data['target'],                                                   # FactPair to be added
+        data['explanation']                                                               # explanation of addition
+    ])
+
+
+def _report(state, role, data, steps, effects):
+    effects.append((Effect.REPORT, data['text']))
+    text = f"Submitted a report to the administrators: {data['text']}"
+    _step(state, steps, Code.REPORT, text, Context.SUSPENDED, Turn.MODERATED, [])
+
+
+def _resolve(state, role, data, steps, effects):
+    text = f"The moderator has reviewed the complaint: \"{data['note']}\""
+    context = Context.COMPLETED if data['returned'] == Turn.COMPLETED else Context.IDLE
+    _step(state, steps, Code.REPORT_REVIEWED, text, context, data['returned'], [])
+
+
+def _pass(state, role, data, steps, effects):
+    consecutive = state.last_move == Code.PASS
+    _step(state, steps, Code.PASS, "Passed", Context.IDLE, opponent(role))
+    if consecutive:
+        text = "Registered two consecutive passes, ending the game"
+        _step(state, steps, Code.COMPLETED, text, Context.COMPLETED, Turn.COMPLETED)
+
+
+########################################################################################################################
+
+
+"""
+    Transition TABLE
+
+    (context, role of the player making the move, move) ---> (clean function, transition function)
+"""
+
+
+TRANSITIONS = {
+    (Context.CREATE_RULE, Turn.ADVOCATE, Move.CREATE_RULE): (_clean_rule, _create_rule),
+
+    (Context.IDLE, Turn.ADVOCATE, Move.UPDATE_RULE): (_clean_update_rule, _update_rule),
+    (Context.IDLE, Turn.CRITIC, Move.ATTACK): (_clean_attack, _attack),
+
+    (Context.ATTACK_RESPONSE, Turn.ADVOCATE, Move.ACCEPT): (_clean_nothing, _accept_attack),
+    (Context.ATTACK_RESPONSE, Turn.ADVOCATE, Move.REJECT): (_clean_explanation('explanation'), _reject_attack),
+}
+
+for _role in (Turn.ADVOCATE, Turn.CRITIC):
+    TRANSITIONS.update({
+        (Context.IDLE, _role, Move.UPDATE_FACTS): (_clean_update_facts, _update_facts),
+        (Context.IDLE, _role, Move.ADD_FACTS): (_clean_add_facts, _add_facts),
+        (Context.IDLE, _role, Move.REPORT): (_clean_report, _report),
+        (Context.IDLE, _role, Move.PASS): (_clean_pass, _pass),
+
+        (Context.PROPOSED_EDIT, _role, Move.ACCEPT): (_clean_nothing, _accept_edit),
+        (Context.PROPOSED_EDIT, _role, Move.REJECT): (_clean_explanation('explain_reject'), _reject_edit),
+        (Context.PROPOSED_EDIT, _role, Move.MODIFY): (_clean_modify_edit, _modify_edit),
+
+        (Context.PROPOSED_ADD, _role, Move.ACCEPT): (_clean_nothing, _accept_add),
+        (Context.PROPOSED_ADD, _role, Move.REJECT): (_clean_explanation('explain_reject'), _reject_add),
+        (Context.PROPOSED_ADD, _role, Move.MODIFY): (_clean_modify_add, _modify_add),
+    })
+
+_OPTIONS = {}
+for (_context, _role, _move) in TRANSITIONS:
+    _OPTIONS.setdefault((_context, _role), []).append(_move)
@@ -0,0 +1,117 @@
+"""
+    WG-A Move Journal
+
+    This file contains the structured event journal of game moves. Every move committed through Game.add_move() is
+    appended to logs/journal.jsonl as one JSON object per line:
+
+        {"game": 12, "move": 345, "user": 67, "code": "Sent Attack", "before": "Idle", "after": "Attack Response",
+         "ms": 8.41, "date": "2020-06-01T17:04:12.123456+00:00"}
+
+    --- game, move, user        :: ids of the Game, Move and User objects
+    --- code                    :: the move's code (see Move.Code)
+    --- before, after           :: the game's context before and after the move
+    --- ms                      :: server processing time, from loading the game until the move was committed
+    --- date                    :: the move's date (in UTC timezone)
+
+    The journal is written through the 'django.journal' logger (see LOGGING in settings.py), so it is queued off the
+    request path, and every process appends to the same file, which logrotate rotates like the other log files (see
+    README.md). The reader below rebuilds per-game timelines from the journal files alone, without touching the
+    database: it reads whatever rotated files logrotate left next to the journal (numbered, dated and/or compressed),
+    oldest first, so missing or extra files in the chain do not matter.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+
+from django.conf import settings
+
+
+WGA_JOURNAL_LOGGER = logging.getLogger('django.journal')
+JOURNAL_HANDLER = 'wga-journal'
+
+
+########################################################################################################################
+
+
+"""
+    Writer
+
+    --- record_move             :: appends a move to the journal
+    --- JSONLinesFormatter      :: LOGGING formatter serializing the journal records
+"""
+
+
+def record_move(move, before, after, seconds):
+    if not WGA_JOURNAL_LOGGER.isEnabledFor(logging.INFO):
+        return
+    WGA_JOURNAL_LOGGER.info({
+        'game': move.game_id,
+        'move': move.id,
+        'user': move.user_id,
+        'code': move.code,
+        'before': before,
+        'after': after,
+        'ms': round(seconds * 1000, 2),
+        'date': move.date.isoformat()
+    })
+
+
+class JSONLinesFormatter(logging.Formatter):
+
+    def format(self, record):
+        if isinstance(record.msg, dict):
+            return json.dumps(record.msg, separators=(', ', ': '))
+        return json.dumps({'message': record.getMessage()})
+
+
+########################################################################################################################
+
+
+"""
+    Reader
+
+    --- paths                   :: the journal's files (the current one and the rotated ones), oldest first
+    --- read                    :: yields the journal's records (oldest first), optionally only those of some games
+    --- timelines               :: returns each game's records, ordered by date
+"""
+
+
+def paths():
+    # Rotated files are journal.jsonl.1, journal.jsonl.2.gz, journal.jsonl-20200601, ... depending on the logrotate
+    # configuration: they are ordered by their last write, not by name. The current file is always the newest one.
+    filename = settings.LOGGING['handlers'][JOURNAL_HANDLER]['filename']
+    rotated = [path for path in glob.glob(glob.escape(filename) + '[.-]*') if os.path.isfile(path)]
+    rotated.sort(key=lambda path: (os.path.getmtime(path), path))
+    return rotated + ([filename] if os.path.isfile(filename) else [])
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
+
+
+def read(games=None, files=None):
+    # Records start with '{"game": <id>, ', so lines of other games are skipped without being parsed.
+    prefixes = tuple(f'{{"game": {game}, ' for game in games) if games is not None else None
+    for path in (files if files is not None else paths()):
+        with _open(path) as file:
+            for line in file:
+                if prefixes is not None and not line.startswith(prefixes):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a line cut short (e.g. the process was killed while writing)
+
+
+def timelines(games=None, files=None):
+    result = {}
+    for event in read(games, files):
+        result.setdefault(event['game'], []).append(event)
+    for events in result.values():
+        events.sort(key=lambda event: event['date'])
+    return result
@@ -0,0 +1,151 @@
+"""
+    WG-A Log Handlers
+
+    This file contains the queued log handler used by the games and moderator loggers (see LOGGING in settings.py).
+    Processing a move logs from inside the consumer's thread; with a plain FileHandler every record takes the handler's
+    lock and writes (and flushes) to disk before the move is answered. QueuedFileHandler only formats the record and
+    puts it on an in-memory queue. A single background listener thread per process takes the records off the queue in
+    batches and appends each batch to its file with a single write.
+
+    Several processes write to the same files (every Gunicorn / Daphne worker, and the run_jobs and
+    sweep_stalled_games commands), so no process rotates them: logrotate does (see README.md). The files are opened
+    in append mode, and before each batch the handler checks whether the file was moved away (WatchedFileHandler), in
+    which case it reopens the path instead of writing to the rotated file.
+
+    The listener is started on the first record (and again after a fork, so every Gunicorn / Daphne worker gets its
+    own) and drains the queue when the process exits.
+
+    DOCUMENTATION
+    https://docs.python.org/3/library/logging.handlers.html#queuehandler
+    https://docs.python.org/3/howto/logging-cookbook.html#dealing-with-handlers-that-block
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+
+########################################################################################################################
+
+
+"""
+    Log Listener CLASS
+
+    Background thread writing the queued records. Records are (handler, record) pairs, so one listener serves every
+    QueuedFileHandler in the process.
+
+    METHODS
+        --- start               :: starts the listener thread (once per process)
+        --- stop                :: writes every queued record and stops the listener thread
+"""
+
+
+class LogListener:
+
+    BATCH_SIZE = 500
+    _SENTINEL = None
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put(self, handler, record):
+        if self._pid != os.getpid():
+            self.start()
+        self.queue.put((handler, record))
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()  # after a fork, the parent's queue and thread are gone
+            self._thread = threading.Thread(target=self._run, name='wga-log-listener', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self.queue.put(self._SENTINEL)
+            self._thread.join()
+        self._pid = None
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._SENTINEL in batch:
+                running = False
+                batch = [item for item in batch if item is not self._SENTINEL]
+
+            targets = {}
+            for (handler, record) in batch:
+                targets.setdefault(handler, []).append(record)
+            for (handler, records) in targets.items():
+                handler.write_batch(records)
+
+
+LISTENER = LogListener()
+atexit.register(LISTENER.stop)
+
+
+########################################################################################################################
+
+
+"""
+    Queued File HANDLER
+
+    Drop-in replacement for logging.FileHandler in LOGGING (it takes the same arguments). The record is formatted in
+    the calling thread, since its arguments may change once the call returns; everything else happens in the listener
+    thread. A batch is written as one string, so the lines of two processes appending to the same file do not
+    interleave.
+"""
+
+
+class QueuedFileHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, filename, mode='a', encoding=None):
+        super().__init__(LISTENER)
+        self.target = logging.handlers.WatchedFileHandler(filename, mode, encoding, delay=True)
+        self.target.setFormatter(logging.Formatter('%(message)s'))  # records arrive formatted by prepare()
+
+    def enqueue(self, record):
+        LISTENER.put(self, record)
+
+    def write_batch(self, records):
+        target = self.target
+        target.acquire()
+        try:
+            lines = []
+            for record in records:
+                try:
+                    lines.append(target.format(record) + target.terminator)
+                except Exception:
+                    target.handleError(record)
+            try:
+                target.reopenIfNeeded()  # logrotate moved the file away: write to a new file at the same path
+                if target.stream is None:  # first batch (the file is opened lazily)
+                    target.stream = target._open()
+                    target._statstream()
+                target.stream.write(''.join(lines))
+                target.stream.flush()
+            except Exception:
+                target.handleError(records[-1])
+        finally:
+            target.release()
+
+    def close(self):
+        self.target.close()
+        super().close()
+
+
+########################################################################################################################
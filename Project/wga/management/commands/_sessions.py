@@ -0,0 +1,106 @@
+"""
+    Synthetic Game Session HELPER FUNCTIONS
+
+    Shared by the load-test and benchmark commands. These helpers create a throwaway game session (scenarios, CSV file
+    of code names, Group object, and the games Group.generate_games() creates from them) and delete every object the
+    session created afterwards. Since every foreign key in models.py is SET_NULL, the objects are deleted explicitly.
+
+    Like the web application itself, these helpers expect to be run from the Project/ directory (the CSV file of code
+    names is read from wga/game_sessions/).
+"""
+
+import os
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from wga import models
+
+
+########################################################################################################################
+
+
+def create_scenarios(prefix, count, facts=3):
+    scenarios = []
+    for i in range(count):
+        scenario = models.ScenarioPair.objects.create(
+            name=f"{prefix}-{i}"[:64],
+            source_conclusion=f"Source conclusion {i}",
+            target_conclusion=f"Target conclusion {i}"
+        )
+        scenario.facts.set([
+            models.FactPair.objects.create(source_fact=f"Source fact {i}.{j}", target_fact=f"Target fact {i}.{j}")
+            for j in range(facts)
+        ])
+        scenarios.append(scenario)
+    return scenarios
+
+
+def create_session(name, players, games, scenarios, case=models.Group.Case.NON_CONTROL, generate=True):
+    path = f"wga/game_sessions/{name}.csv"
+    with open(path, 'w+') as file:
+        for i in range(players):
+            file.write(f"{name}-{i}\n")
+    group = models.Group(name=name, case=case, start=timezone.now(), num_users=players, num_games=games)
+    group.save()
+    group.scenarios.set(scenarios)
+    try:
+        if generate:
+            group.generate_games()
+    finally:
+        if generate and os.path.isfile(path):
+            os.remove(path)
+    return group
+
+
+def delete_session(group, scenarios=()):
+    models.Move.objects.filter(game__group=group).delete()
+    models.Report.objects.filter(game__group=group).delete()
+    models.FactPair.objects.filter(game__group=group).delete()
+    intermediaries = list(models.Intermediary.objects.filter(user__group=group).values_list('id', flat=True))
+    models.Game.objects.filter(group=group).delete()
+    models.Intermediary.objects.filter(id__in=intermediaries).delete()
+    models.User.objects.filter(group=group).delete()
+    group.messages.all().delete()
+    group.delete()
+    for scenario in scenarios:
+        scenario.facts.all().delete()
+        scenario.delete()
+    path = f"wga/game_sessions/{group.name}.csv"
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+########################################################################################################################
+
+
+"""
+    Next Move HELPER FUNCTION
+
+    Returns (is_critic, form data) for the player whose turn it is, or None once the game is completed: the Advocate
+    creates a rule, the Critic attacks, the Advocate alternately accepts and rejects (updating the rule after
+    accepting), and once the game has *target* moves (at least 9, so passing is allowed) both players pass.
+"""
+
+
+def next_move(game_id, target):
+    game = models.Game.objects.get(id=game_id)
+    count = game.move_set.count()
+    critic = game.turn == models.Game.Turn.CRITIC
+
+    if game.context == models.Game.Context.COMPLETED:
+        return None
+    elif game.context == models.Game.Context.CREATE_RULE:
+        return False, {'antecedent': f"antecedent {count}", 'consequent': f"consequent {count}"}
+    elif game.context == models.Game.Context.ATTACK_RESPONSE:
+        return False, {'response': 'accept' if count % 4 == 2 else 'reject', 'explanation': f"explanation {count}"}
+    elif game.context == models.Game.Context.IDLE and critic:
+        if count >= target:
+            return True, {'move_choice': 'pass'}
+        return True, {'move_choice': 'attack', 'link': f"L{count % 5 + 1}", 'explain_attack': f"attack {count}"}
+    elif game.context == models.Game.Context.IDLE and not critic:
+        if count >= target:
+            return False, {'move_choice': 'pass'}
+        return False, {'move_choice': 'update_rule', 'antecedent': f"antecedent {count}",
+                       'consequent': f"consequent {count}"}
+    raise CommandError(f"Game {game_id} reached an unexpected context: {game.context}")
@@ -0,0 +1,61 @@
+"""
+    Backfill Analytics COMMAND
+
+    Rebuilds the GameAnalytics rows (see models.py) of the given games, of a session's games, or of every game from
+    their moves. The counts come from a single aggregate query grouped by game (attacks per link are counted from the
+    attack moves' texts, so games played before moves recorded events are covered too), and the rows are replaced in
+    one transaction:
+
+        python manage.py backfill_analytics
+        python manage.py backfill_analytics --group 3
+        python manage.py backfill_analytics 12 13
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+
+from wga import models
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Rebuilds the per-game analytics rows from the moves."
+
+    def add_arguments(self, parser):
+        parser.add_argument('games', type=int, nargs='*', help="game ids (default: every game)")
+        parser.add_argument('--group', type=int, help="only the games of this session (Group id)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        moves = models.Move.objects.filter(game__isnull=False)
+        if options['games']:
+            moves = moves.filter(game_id__in=options['games'])
+        if options['group'] is not None:
+            moves = moves.filter(game__group_id=options['group'])
+
+        counts = {field: Count('id', filter=Q(code=code)) for (code, field) in models.GameAnalytics.CODE_FIELDS.items()}
+        counts.update({
+            field: Count('id', filter=Q(code=models.Move.Code.SENT_ATTACK, text__startswith=f"Attacked link {link} "))
+            for (link, field) in models.GameAnalytics.LINK_FIELDS.items()
+        })
+        rows = moves.order_by().values('game_id').annotate(
+            moves=Count('id'), first_move=Min('date'), last_move=Max('date'), **counts
+        )
+        analytics = [models.GameAnalytics(**row) for row in rows]
+
+        with transaction.atomic():
+            stale = models.GameAnalytics.objects.all()
+            if options['games']:
+                stale = stale.filter(game_id__in=options['games'])
+            if options['group'] is not None:
+                stale = stale.filter(game__group_id=options['group'])
+            stale.delete()
+            models.GameAnalytics.objects.bulk_create(analytics, batch_size=1000)
+
+        self.stdout.write(f"Rebuilt the analytics of {len(analytics)} games in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,167 @@
+"""
+    Benchmark Logging COMMAND
+
+    Measures the latency of processing a move (the work GameConsumer.receive does: loading the game, building and
+    validating the move form, and processing it) with the games and moderator loggers set up three ways:
+
+        --- off                 :: the loggers are disabled
+        --- sync                :: plain logging.FileHandler objects (the previous LOGGING configuration)
+        --- queued              :: wga.log_handlers.QueuedFileHandler objects (the current LOGGING configuration)
+
+    Every mode plays the same number of synthetic games (see _sessions.py, after one untimed warm-up game) inside a
+    throwaway test database; log files are written to a temporary directory. Run the command from the Project/
+    directory:
+
+        python manage.py benchmark_logging --games 20 --moves 12
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from wga import log_handlers
+from wga.assets_user import forms
+from wga.assets_user import views
+from . import _sessions
+from .loadtest import percentile
+
+
+MODES = ['off', 'sync', 'queued']
+LOGGERS = {
+    # logger name: log files (and levels) of its handlers in LOGGING
+    'django.games': [('games_info.log', logging.INFO), ('games_debug.log', logging.DEBUG)],
+    'django.moderator': [('moderator.log', logging.DEBUG)],
+}
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Benchmarks move-processing latency with the games and moderator logging off, synchronous, and queued."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=20, help="number of games played per mode")
+        parser.add_argument('--moves', type=int, default=12, help="moves per game before both players pass (>= 9)")
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+        parser.add_argument('--output', help="write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['moves'] < 9:
+            raise CommandError("Players may only pass after 9 moves; use --moves 9 or more.")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                self._run('off', directory, dict(options, games=1))  # warm-up, so the first mode is not penalized
+                results = [self._run(mode, directory, options) for mode in options['modes']]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            f"{'mode':<8} {'moves':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'log KiB':>9}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<8} {row['moves']:>6} {row['mean_ms']:>9.2f} {row['p50_ms']:>8.2f} "
+                f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['log_kb']:>9.0f}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    def _run(self, mode, directory, options):
+        name = f"benchmark-logging-{mode}"
+        scenarios = _sessions.create_scenarios(name, count=2)
+        group = _sessions.create_session(name, options['games'] * 2, 1, scenarios)
+        games = [(game.id, {False: game.adv_info.key, True: game.crt_info.key}) for game in group.game_set.all()]
+
+        files = [os.path.join(directory, f"{mode}-{filename}")
+                 for handlers in LOGGERS.values() for (filename, _) in handlers]
+        latencies = []
+        with logging_mode(mode, directory):
+            try:
+                for (game_id, keys) in games:
+                    latencies.extend(self._play(game_id, keys, options['moves']))
+            finally:
+                _sessions.delete_session(group, scenarios)
+
+        return {
+            'mode': mode,
+            'moves': len(latencies),
+            'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'log_kb': sum(os.path.getsize(path) for path in files if os.path.isfile(path)) / 1024
+        }
+
+    @staticmethod
+    def _play(game_id, keys, target):
+        latencies = []
+        while True:
+            move = _sessions.next_move(game_id, target)
+            if move is None:
+                return latencies
+            is_critic, payload = move
+
+            start = time.perf_counter()
+            data = views.find_game_data(url_key=keys[is_critic], with_messages=False)
+            form = forms.build_form(payload, user=data['user'], game=data['game'], is_critic=data['is_critic'])
+            if not form.is_valid():
+                raise CommandError(f"Game {game_id} rejected {payload}: {form.errors.as_text()}")
+            form.process()
+            latencies.append(time.perf_counter() - start)
+
+
+########################################################################################################################
+
+
+"""
+    Logging Mode CONTEXT MANAGER
+
+    Swaps the handlers of the games and moderator loggers for the ones of the benchmarked mode (writing into the
+    temporary directory) and restores the LOGGING configuration afterwards. Queued records are written out before the
+    handlers are closed, outside of the timed moves.
+"""
+
+
+@contextmanager
+def logging_mode(mode, directory):
+    simple = settings.LOGGING['formatters']['simple']
+    formatter = logging.Formatter(simple['format'], style=simple.get('style', '%'))
+
+    saved = {}
+    for (name, handlers) in LOGGERS.items():
+        logger = logging.getLogger(name)
+        saved[name] = (logger.handlers, logger.propagate, logger.disabled)
+        logger.handlers = []
+        logger.propagate = False
+        logger.disabled = mode == 'off'
+        if mode == 'off':
+            continue
+        for (filename, level) in handlers:
+            path = os.path.join(directory, f"{mode}-{filename}")
+            handler = logging.FileHandler(path) if mode == 'sync' else log_handlers.QueuedFileHandler(path)
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        log_handlers.LISTENER.stop()
+        for (name, (handlers, propagate, disabled)) in saved.items():
+            logger = logging.getLogger(name)
+            for handler in logger.handlers:
+                handler.close()
+            logger.handlers, logger.propagate, logger.disabled = handlers, propagate, disabled
@@ -0,0 +1,118 @@
+"""
+    Benchmark Player Sessions COMMAND
+
+    Measures the latency (and database queries) of a player's login and page loads with each session engine:
+
+        --- login               :: POST of the login form (creates the session)
+        --- game                :: GET of the player's game page (reads the session)
+        --- faq                 :: GET of the FAQ page (reads the session; the lightest page a player loads)
+
+    Every engine logs in the same number of synthetic players (see _sessions.py) inside a throwaway test database. The
+    cache-backed engines use the 'sessions' cache in CACHES (see settings.py). Run the command from the Project/
+    directory:
+
+        python manage.py benchmark_player_sessions --players 50
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from wga import models
+from . import _sessions
+from .loadtest import percentile
+
+
+ENGINES = ['db', 'cached_db', 'cache', 'signed_cookies']
+REQUESTS = ['login', 'game', 'faq']
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Benchmarks player login and page-load latency for each session engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=50, help="number of players logging in per engine")
+        parser.add_argument('--pages', type=int, default=5, help="number of game and FAQ page loads per player")
+        parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+        parser.add_argument('--output', help="write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['players'] < 2 or options['players'] % 2:
+            raise CommandError("Need an even number of players (at least two).")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = [self._run(engine, options) for engine in options['engines']]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{'engine':<15} {'request':<7} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for row in results:
+            for request in REQUESTS:
+                stats = row[request]
+                self.stdout.write(
+                    f"{row['engine']:<15} {request:<7} {stats['count']:>6} {stats['p50_ms']:>8.2f} "
+                    f"{stats['p95_ms']:>8.2f} {stats['queries']:>8.1f}"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    def _run(self, engine, options):
+        name = f"benchmark-sessions-{engine}"
+        scenarios = _sessions.create_scenarios(name, count=2)
+        group = _sessions.create_session(name, options['players'], 1, scenarios)
+        samples = {request: [] for request in REQUESTS}
+
+        try:
+            engine_settings = {
+                'SESSION_ENGINE': f'django.contrib.sessions.backends.{engine}',
+                'ALLOWED_HOSTS': settings.ALLOWED_HOSTS + ['testserver']
+            }
+            with override_settings(**engine_settings):
+                players = models.User.objects.filter(group=group).prefetch_related('intermediary_set')
+                for player in players:
+                    client = Client()  # a new client (and request handler), so the session middleware uses the engine
+                    self._request(samples['login'], client.post, reverse('user:login'), {
+                        'name': player.name,
+                        'key': player.key
+                    })
+                    game = reverse('user:game', kwargs={'url_key': player.intermediary_set.all()[0].key})
+                    for _ in range(options['pages']):
+                        self._request(samples['game'], client.get, game)
+                        self._request(samples['faq'], client.get, reverse('user:faq'))
+        finally:
+            _sessions.delete_session(group, scenarios)
+
+        result = {'engine': engine}
+        for (request, values) in samples.items():
+            latencies = [seconds for (seconds, _) in values]
+            result[request] = {
+                'count': len(values),
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'queries': sum(queries for (_, queries) in values) / len(values) if values else 0.0
+            }
+        return result
+
+    @staticmethod
+    def _request(samples, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = method(path, data) if data is not None else method(path)
+            seconds = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise CommandError(f"{path} answered {response.status_code}")
+        samples.append((seconds, len(queries.captured_queries)))
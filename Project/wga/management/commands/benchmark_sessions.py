@@ -0,0 +1,193 @@
+"""
+    Benchmark Sessions COMMAND
+
+    Repeatable benchmark of the slowest moderator operations: Group.generate_games(), Group.add_game() and
+    Group.shuffle(). For every number of players given, the command creates a synthetic non-control session (see
+    _sessions.py) and records, per operation, the wall time, the number of database queries, the time spent in the
+    database, and the peak memory allocated by Python (tracemalloc). Every operation runs on a fresh session, so the
+    numbers of one operation never depend on another.
+
+    The benchmark runs inside a throwaway test database created from the configured default database, so the
+    development or production data is never touched. Run it once per database backend and compare the results:
+
+        python manage.py benchmark_sessions --players 10 100 1000 10000 --output postgres.json
+        WGA_DATABASE=sqlite python manage.py benchmark_sessions --players 10 100 1000 10000 --output sqlite.json
+        python manage.py benchmark_sessions --players 10 100 --compare postgres.json
+
+    Results are written as JSON (one row per operation and number of players, plus the environment they were measured
+    in). With --compare, every row is printed next to the matching row of an earlier results file. Operations that fail
+    (e.g. shuffle() runs out of chat rooms beyond 49 games) are recorded with their error instead of their timings.
+
+    Run the command from the Project/ directory (the CSV file of code names is written to wga/game_sessions/).
+"""
+
+import json
+import platform
+import time
+import tracemalloc
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from wga import metrics
+from . import _sessions
+
+
+OPERATIONS = ['generate', 'add_game', 'shuffle']
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Benchmarks Group.generate_games(), add_game() and shuffle() at several session sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, nargs='+', default=[10, 100, 1000], help="session sizes")
+        parser.add_argument('--games', type=int, default=2, help="number of games per player")
+        parser.add_argument('--scenarios', type=int, default=None, help="number of scenarios (default: 2 * games)")
+        parser.add_argument('--add-games', type=int, default=10, help="number of add_game() calls to time")
+        parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+        parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc (it slows Python code down)")
+        parser.add_argument('--output', help="write the results to this JSON file")
+        parser.add_argument('--compare', help="compare the results with an earlier JSON results file")
+        parser.add_argument('--label', default='', help="free-form label stored with the results (e.g. a git revision)")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or 2 * options['games']
+        if scenarios < 2 * options['games'] - 1:
+            raise CommandError(
+                "Each pair of players needs a scenario neither has played: use --scenarios >= 2 * games - 1."
+            )
+        if any(players < 2 or players * options['games'] % 2 for players in options['players']):
+            raise CommandError("Need at least two players, and players * games must be even.")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = {
+                'label': options['label'],
+                'date': timezone.now().isoformat(),
+                'environment': self._environment(),
+                'results': [
+                    self._run(operation, players, options['games'], scenarios, options)
+                    for players in options['players'] for operation in options['operations']
+                ]
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        baseline = self._load(options['compare']) if options['compare'] else None
+        self._print(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Wrote {len(results['results'])} results to {options['output']}")
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    def _run(self, operation, players, games, scenarios, options):
+        name = f"benchmark-{operation}-{players}"
+        pairs = _sessions.create_scenarios(name, count=scenarios)
+        group = _sessions.create_session(name, players, games, pairs, generate=operation != 'generate')
+        if operation == 'shuffle':  # shuffle() moves every player on to a scenario the group has not played yet
+            pairs += _sessions.create_scenarios(f"{name}-next", count=1)
+            group.scenarios.add(pairs[-1])
+        result = {'operation': operation, 'players': players, 'games': games, 'scenarios': scenarios, 'error': None}
+
+        if operation == 'generate':
+            run = group.generate_games
+        elif operation == 'add_game':
+            users = list(group.user_set.all()[:2])
+            scenario = pairs[0]
+            result['calls'] = options['add_games']
+
+            def run():
+                for _ in range(options['add_games']):
+                    group.add_game(scenario=scenario, advocate=users[0], critic=users[1])
+        else:
+            run = group.shuffle
+
+        try:
+            result.update(self._measure(run, memory=not options['no_memory']))
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            _sessions.delete_session(group, pairs)
+        return result
+
+    @staticmethod
+    def _measure(run, memory):
+        if memory:
+            tracemalloc.start()
+        try:
+            with override_settings(WGA_METRICS=True), metrics.measure() as sample:
+                start = time.perf_counter()
+                run()
+                seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if memory else None
+        finally:
+            if memory:
+                tracemalloc.stop()
+        return {
+            'seconds': seconds,
+            'queries': sample.queries,
+            'db_seconds': sample.db_time,
+            'peak_memory_kb': peak / 1024 if peak is not None else None
+        }
+
+    @staticmethod
+    def _environment():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SHOW server_version")
+            elif connection.vendor == 'sqlite':
+                cursor.execute("SELECT sqlite_version()")
+            else:
+                cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()[0]
+        return {
+            'database': connection.vendor,
+            'database_version': version,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        }
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        return {(row['operation'], row['players']): row for row in baseline['results']}
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    def _print(self, results, baseline=None):
+        environment = results['environment']
+        self.stdout.write(
+            f"{environment['database']} {environment['database_version']}, Django {environment['django']}"
+        )
+        self.stdout.write(
+            f"{'operation':<10} {'players':>8} {'seconds':>10} {'queries':>9} {'db s':>9} {'peak KiB':>10}"
+        )
+        for row in results['results']:
+            if row['error']:
+                self.stdout.write(f"{row['operation']:<10} {row['players']:>8}   failed: {row['error']}")
+                continue
+            peak = f"{row['peak_memory_kb']:>10.0f}" if row['peak_memory_kb'] is not None else f"{'-':>10}"
+            line = (f"{row['operation']:<10} {row['players']:>8} {row['seconds']:>10.3f} {row['queries']:>9} "
+                    f"{row['db_seconds']:>9.3f} {peak}")
+            before = baseline.get((row['operation'], row['players'])) if baseline else None
+            if before and not before['error']:
+                line += f"   (was {before['seconds']:.3f}s, {before['queries']} queries: x{self._ratio(row, before)})"
+            self.stdout.write(line)
+
+    @staticmethod
+    def _ratio(row, before):
+        return f"{row['seconds'] / before['seconds']:.2f}" if before['seconds'] else "-"
@@ -0,0 +1,166 @@
+"""
+    Benchmark Templates COMMAND
+
+    Measures the time to render the player's game page (wga/user/game.html, sent by GameView) and the game interface
+    (wga/user/game/interface.html, sent by GameConsumer after every move) with three template configurations:
+
+        --- uncached            :: templates are read and compiled on every render (the loaders used while DEBUG is on)
+        --- cached              :: templates are compiled once by the cached loader (the loaders used in production)
+        --- fragments           :: the cached loader, plus the {% cache %} fragments of the instruction modals
+
+    Every configuration plays the same synthetic games (see _sessions.py) inside a throwaway test database and renders
+    both templates for both players before every move. Only the rendering is timed; the game data is loaded
+    beforehand, as the view and consumer do. Run the command from the Project/ directory:
+
+        python manage.py benchmark_templates --games 4 --moves 12
+"""
+
+import copy
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import loader
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from wga.assets_user import forms
+from wga.assets_user import views
+from . import _sessions
+from .loadtest import percentile
+
+
+MODES = ['uncached', 'cached', 'fragments']
+TEMPLATES = {
+    'game': 'wga/user/game.html',
+    'interface': 'wga/user/game/interface.html'
+}
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Benchmarks rendering game.html and interface.html with and without the cached loader and fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=4, help="number of games played per configuration")
+        parser.add_argument('--moves', type=int, default=12, help="moves per game before both players pass (>= 9)")
+        parser.add_argument('--repeat', type=int, default=3, help="renders of each template per player and move")
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+        parser.add_argument('--output', help="write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['moves'] < 9:
+            raise CommandError("Players may only pass after 9 moves; use --moves 9 or more.")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = [self._run(mode, options) for mode in options['modes']]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{'mode':<10} {'template':<10} {'renders':>8} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for row in results:
+            for template in TEMPLATES:
+                stats = row[template]
+                self.stdout.write(
+                    f"{row['mode']:<10} {template:<10} {stats['count']:>8} {stats['p50_ms']:>8.2f} "
+                    f"{stats['p95_ms']:>8.2f} {stats['queries']:>8.1f}"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    def _run(self, mode, options):
+        name = f"benchmark-templates-{mode}"
+        scenarios = _sessions.create_scenarios(name, count=2)
+        group = _sessions.create_session(name, options['games'] * 2, 1, scenarios)
+        games = [(game.id, {False: game.adv_info.key, True: game.crt_info.key}) for game in group.game_set.all()]
+        samples = {template: [] for template in TEMPLATES}
+
+        try:
+            with override_settings(**template_settings(mode)):
+                for (game_id, keys) in games:
+                    self._play(game_id, keys, options, samples)
+        finally:
+            _sessions.delete_session(group, scenarios)
+
+        result = {'mode': mode}
+        for (template, values) in samples.items():
+            latencies = [seconds for (seconds, _) in values]
+            result[template] = {
+                'count': len(values),
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'queries': sum(queries for (_, queries) in values) / len(values) if values else 0.0
+            }
+        return result
+
+    def _play(self, game_id, keys, options, samples):
+        while True:
+            for key in keys.values():
+                self._render(key, options['repeat'], samples)
+
+            move = _sessions.next_move(game_id, options['moves'])
+            if move is None:
+                return
+            is_critic, payload = move
+            data = views.find_game_data(url_key=keys[is_critic], with_messages=False)
+            form = forms.build_form(payload, user=data['user'], game=data['game'], is_critic=data['is_critic'])
+            if not form.is_valid():
+                raise CommandError(f"Game {game_id} rejected {payload}: {form.errors.as_text()}")
+            form.process()
+
+    @staticmethod
+    def _render(key, repeat, samples):
+        # Loaded the way GameView (game.html) and GameConsumer.update_interface (interface.html) load them.
+        for (template, with_messages) in (('game', True), ('interface', False)):
+            data = views.find_game_data(url_key=key, with_messages=with_messages)
+            if not views.is_turn(data):
+                data['game'].context = 'Not Turn'  # DO NOT SAVE
+            data['form'] = forms.build_form(user=data['user'], game=data['game'], is_critic=data['is_critic'])
+
+            request = None
+            if template == 'game':
+                request = RequestFactory().get(reverse('user:game', kwargs={'url_key': key}))
+                request.session = {'user_identifier': data['user'].key, 'ready': True}
+
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    loader.render_to_string(TEMPLATES[template], data, request=request)
+                    seconds = time.perf_counter() - start
+                samples[template].append((seconds, len(queries.captured_queries)))
+
+
+########################################################################################################################
+
+
+"""
+    Template Settings HELPER FUNCTION
+
+    Returns the TEMPLATES and CACHES settings of the benchmarked configuration. Overriding them resets the template
+    engines and cache connections, so every configuration starts with empty caches.
+"""
+
+
+def template_settings(mode):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0].pop('APP_DIRS', None)
+    templates[0]['OPTIONS']['loaders'] = settings.WGA_TEMPLATE_LOADERS if mode == 'uncached' else [
+        ('django.template.loaders.cached.Loader', settings.WGA_TEMPLATE_LOADERS)
+    ]
+
+    backend = 'locmem.LocMemCache' if mode == 'fragments' else 'dummy.DummyCache'
+    caches = dict(settings.CACHES, template_fragments={
+        'BACKEND': f'django.core.cache.backends.{backend}',
+        'LOCATION': f'benchmark-{mode}'
+    })
+    return {'TEMPLATES': templates, 'CACHES': caches}
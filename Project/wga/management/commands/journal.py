@@ -0,0 +1,40 @@
+"""
+    Journal COMMAND
+
+    Prints the timelines of the given games from the move journal (see wga/journal.py) without touching the database:
+
+        python manage.py journal 12 13
+        python manage.py journal 12 --json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from wga import journal
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Prints per-game move timelines read from the JSON-lines move journal."
+
+    def add_arguments(self, parser):
+        parser.add_argument('games', type=int, nargs='*', help="game ids (default: every game in the journal)")
+        parser.add_argument('--file', action='append', dest='files', help="journal file(s) to read instead")
+        parser.add_argument('--json', action='store_true', help="print the timelines as JSON")
+
+    def handle(self, *args, **options):
+        timelines = journal.timelines(games=options['games'] or None, files=options['files'])
+        if options['json']:
+            self.stdout.write(json.dumps(timelines, indent=2))
+            return
+        for (game, events) in sorted(timelines.items()):
+            self.stdout.write(f"Game {game} ({len(events)} moves)")
+            for event in events:
+                self.stdout.write(
+                    f"    {event['date']}  user {str(event['user']):<6} {event['code']:<16} "
+                    f"{event['before']} -> {event['after']}  ({event['ms']:.1f}ms)"
+                )
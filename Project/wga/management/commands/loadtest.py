@@ -0,0 +1,215 @@
+"""
+    Load Test COMMAND
+
+    Headless load generator for the player-facing WebSocket consumers. The command creates a synthetic non-control
+    Group (see _sessions.py), opens a GameConsumer socket for every game slot and a NavBarConsumer socket for every
+    player (using Channels' WebsocketCommunicator and the in-memory channel layer), and lets simulated players play full
+    games through the real move forms: the Advocate creates a rule, the Critic attacks, the Advocate alternately accepts
+    and rejects, and once the game has --moves moves both players pass. Every game runs concurrently.
+
+    The report covers throughput (moves per second), move-to-update latency (from sending a move until both players'
+    interfaces are re-rendered) at the 50th, 95th, and 99th percentiles, and the number of database queries per move
+    (recorded by wga/metrics.py for GameConsumer.receive, GameConsumer.update_interface and
+    NavBarConsumer.update_navigation).
+
+    The synthetic session is written to the configured database and deleted afterwards (unless --keep is given). Run
+    the command from the Project/ directory:
+
+        python manage.py loadtest --players 50 --games 2 --moves 12
+
+    DOCUMENTATION
+    https://channels.readthedocs.io/en/2.x/topics/testing.html
+"""
+
+import asyncio
+import json
+import time
+
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from wga import models
+from wga import metrics
+from wga.assets_user import consumers
+from . import _sessions
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+HANDLERS = ['GameConsumer.receive', 'GameConsumer.update_interface', 'NavBarConsumer.update_navigation']
+
+
+########################################################################################################################
+
+
+"""
+    Percentile HELPER FUNCTION
+
+    Nearest-rank percentile of a list of values (0.0 if the list is empty).
+"""
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))]
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Plays synthetic games over the WebSocket consumers and reports throughput, latency, and queries per move."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=20, help="number of simulated players")
+        parser.add_argument('--games', type=int, default=1, help="number of games each player plays at once")
+        parser.add_argument('--moves', type=int, default=12, help="moves per game before both players pass (>= 9)")
+        parser.add_argument('--timeout', type=float, default=30.0, help="seconds to wait for an interface update")
+        parser.add_argument('--keep', action='store_true', help="keep the synthetic session in the database")
+        parser.add_argument('--json', action='store_true', help="print the report as JSON")
+
+    def handle(self, *args, **options):
+        if options['players'] < 2 or options['games'] < 1 or options['players'] * options['games'] % 2:
+            raise CommandError("Need at least two players, and players * games must be even.")
+        if options['moves'] < 9:
+            raise CommandError("Players may only pass after 9 moves; use --moves 9 or more.")
+
+        name = f"loadtest-{timezone.now():%Y%m%d%H%M%S}"
+        with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, WGA_METRICS=True):
+            metrics.reset()
+            scenarios = _sessions.create_scenarios(name, count=2 * options['games'])
+            group = _sessions.create_session(name, options['players'], options['games'], scenarios)
+            try:
+                report = asyncio.run(self._run(group, options))
+            finally:
+                if not options['keep']:
+                    _sessions.delete_session(group, scenarios)
+            report['queries'] = self._queries(report['moves'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    async def _run(self, group, options):
+        games = await database_sync_to_async(self._find_games)(group)
+        players = {player for (_, slots) in games for (player, _) in slots}
+
+        navigation = {player: await self._connect('/ws/wganalogy_app/nav', consumers.NavBarConsumer, player)
+                      for player in players}
+        sockets = {game_id: [(player, await self._connect(f'/ws/wganalogy_app/user/{key}/', consumers.GameConsumer,
+                                                          player, key)) for (player, key) in slots]
+                   for (game_id, slots) in games}
+
+        latencies = []
+        start = time.perf_counter()
+        try:
+            moves = await asyncio.gather(*[
+                self._play(game_id, slots, navigation, latencies, options) for (game_id, slots) in sockets.items()
+            ])
+        finally:
+            elapsed = time.perf_counter() - start
+            for communicator in [c for slots in sockets.values() for (_, c) in slots] + list(navigation.values()):
+                await communicator.disconnect()
+
+        return {
+            'players': len(players),
+            'games': len(games),
+            'sockets': len(players) + len(games) * 2,
+            'moves': sum(moves),
+            'seconds': elapsed,
+            'throughput': sum(moves) / elapsed if elapsed else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50) * 1000,
+                'p95': percentile(latencies, 0.95) * 1000,
+                'p99': percentile(latencies, 0.99) * 1000,
+                'max': max(latencies, default=0.0) * 1000
+            }
+        }
+
+    @staticmethod
+    def _find_games(group):
+        games = models.Game.objects.filter(group=group).select_related('adv_info__user', 'crt_info__user')
+        return [
+            (game.id, [(game.adv_info.user.key, game.adv_info.key), (game.crt_info.user.key, game.crt_info.key)])
+            for game in games
+        ]
+
+    @staticmethod
+    async def _connect(path, consumer, player, url_key=None):
+        communicator = WebsocketCommunicator(consumer, path)
+        communicator.scope['session'] = {'user_identifier': player}
+        communicator.scope['url_route'] = {'args': (), 'kwargs': {'url_key': url_key} if url_key else {}}
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise CommandError(f"Could not connect to {path}")
+        return communicator
+
+    async def _play(self, game_id, slots, navigation, latencies, options):
+        (advocate, adv_socket), (critic, crt_socket) = slots
+        moves = 0
+        for _ in range(options['moves'] * 3):  # every move advances the game; this only guards against a stuck game
+            move = await database_sync_to_async(_sessions.next_move)(game_id, options['moves'])
+            if move is None:
+                return moves
+            is_critic, payload = move
+            (actor, opponent) = (crt_socket, adv_socket) if is_critic else (adv_socket, crt_socket)
+
+            for communicator in (actor, opponent, navigation[advocate], navigation[critic]):
+                await self._drain(communicator)
+            start = time.perf_counter()
+            await actor.send_json_to(dict(payload, move_id=f"{game_id}-{moves}"))  # as the web browser does
+            for communicator in (actor, opponent):
+                await self._wait_for_interface(communicator, game_id, payload, options['timeout'])
+            latencies.append(time.perf_counter() - start)
+            moves += 1
+        raise CommandError(f"Game {game_id} did not finish after {options['moves'] * 3} moves")
+
+    @staticmethod
+    async def _drain(communicator):
+        while not await communicator.receive_nothing(timeout=0, interval=0):
+            await communicator.receive_from()
+
+    @staticmethod
+    async def _wait_for_interface(communicator, game_id, payload, timeout):
+        while True:
+            try:
+                response = await communicator.receive_json_from(timeout=timeout)
+            except asyncio.TimeoutError:
+                raise CommandError(f"Game {game_id} timed out waiting for an update after {payload}")
+            if 'html-interface' in response:
+                return
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    @staticmethod
+    def _queries(moves):
+        report = {'handlers': {}}
+        total = 0
+        for handler in HANDLERS:
+            histogram = metrics.histograms(handler)['queries']
+            report['handlers'][handler] = {'calls': histogram.count, 'mean': histogram.mean(), 'max': histogram.max}
+            total += histogram.sum
+        report['per_move'] = total / moves if moves else 0.0
+        return report
+
+    def _print(self, report):
+        self.stdout.write(f"Players: {report['players']}  Games: {report['games']}  Sockets: {report['sockets']}")
+        self.stdout.write(f"Moves: {report['moves']} in {report['seconds']:.2f}s ({report['throughput']:.1f} moves/s)")
+        latency = report['latency_ms']
+        self.stdout.write(
+            f"Move-to-update latency: p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  "
+            f"p99 {latency['p99']:.1f}ms  max {latency['max']:.1f}ms"
+        )
+        self.stdout.write(f"DB queries per move: {report['queries']['per_move']:.1f}")
+        for (handler, row) in report['queries']['handlers'].items():
+            self.stdout.write(
+                f"    {handler}: {row['calls']} calls, {row['mean']:.1f} queries mean, {row['max']:.0f} max"
+            )
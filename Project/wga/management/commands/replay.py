@@ -0,0 +1,79 @@
+"""
+    Replay COMMAND
+
+    Rebuilds games from their moves' events (see wga/replay.py) and prints their states, optionally after a given move,
+    checking them against the games' saved states, and timing the replay:
+
+        python manage.py replay 12 13
+        python manage.py replay 12 --move 4 --json
+        python manage.py replay --group 3 --verify
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wga import models
+from wga import replay
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Rebuilds game states from the moves' recorded events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('games', type=int, nargs='*', help="game ids")
+        parser.add_argument('--group', type=int, help="replay every game of this session (Group id)")
+        parser.add_argument('--move', type=int, help="print the states after this move (default: after the last one)")
+        parser.add_argument('--json', action='store_true', help="print the states as JSON")
+        parser.add_argument('--verify', action='store_true', help="compare the final states with the saved games")
+
+    def handle(self, *args, **options):
+        games = models.Game.objects.order_by('id')
+        if options['group'] is not None:
+            games = games.filter(group_id=options['group'])
+        elif options['games']:
+            games = games.filter(id__in=options['games'])
+        else:
+            raise CommandError("Give some game ids or a --group.")
+        games = list(games)
+        if options['move'] is not None and options['verify']:
+            raise CommandError("--verify compares the final states; it cannot be used with --move.")
+
+        start = time.perf_counter()
+        try:
+            if options['move'] is None:
+                states = replay.replay_games([game.id for game in games])
+            else:
+                states = {game.id: replay.state_at(game, options['move']) for game in games}
+        except replay.ReplayError as exception:
+            raise CommandError(str(exception))
+        seconds = time.perf_counter() - start
+
+        if options['json']:
+            self.stdout.write(json.dumps({game_id: state.snapshot() if state else None
+                                          for (game_id, state) in states.items()}, indent=2))
+        else:
+            for (game_id, state) in states.items():
+                self.stdout.write(f"Game {game_id}: {state.snapshot() if state else 'no moves'}")
+
+        failures = 0
+        if options['verify']:
+            for game in games:
+                if states[game.id] is None:
+                    continue
+                for (slot, saved, replayed) in replay.audit(game, states[game.id]):
+                    failures += 1
+                    self.stderr.write(f"Game {game.id}: {slot} is {saved!r} but replays as {replayed!r}")
+
+        moves = sum(state.moves for state in states.values() if state)
+        self.stderr.write(
+            f"Replayed {len(states)} games ({moves} moves) in {seconds * 1000:.1f}ms: "
+            f"{len(states) / seconds if seconds else 0:.0f} games/s, {moves / seconds if seconds else 0:.0f} moves/s"
+        )
+        if failures:
+            raise CommandError(f"{failures} differences between the replayed and saved games.")
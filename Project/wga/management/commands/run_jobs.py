@@ -0,0 +1,42 @@
+"""
+    Run Jobs COMMAND
+
+    Runs the background jobs queued by the moderator pages (see the Job model): today, generating the users and games
+    of a newly created game session. The worker claims the oldest queued job, runs it while its progress streams to the
+    moderators watching it, and looks for the next one; with nothing queued, it checks again every --every seconds.
+    Several workers may run at once (each job is claimed by exactly one of them). Run the command from the Project/
+    directory, for as long as the web application is up, or with --once to run the queued jobs and exit:
+
+        python manage.py run_jobs
+        python manage.py run_jobs --once
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from wga import models
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Runs the queued background jobs (e.g. generating new game sessions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=1, help="seconds between two checks of an empty queue")
+        parser.add_argument('--once', action='store_true', help="run the queued jobs, then exit")
+
+    def handle(self, *args, **options):
+        while True:
+            job = models.Job.claim()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['every'])
+                continue
+            start = time.perf_counter()
+            job.run()
+            self.stdout.write(f"{job} ({job.players} players, {job.games} games) in {time.perf_counter() - start:.2f}s")
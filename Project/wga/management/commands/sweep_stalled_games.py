@@ -0,0 +1,129 @@
+"""
+    Sweep Stalled Games COMMAND
+
+    Flags the games whose current player has not made a move for a while. A sweep reads the stalled games with one query
+    over the (turn, last_move_at) index (see Game.last_move_at), marks them (Game.stalled_at, cleared by the next move,
+    so each idle turn is flagged once), and alerts the moderators' report queue about the games it marked: a game that
+    got a move after it was read, or that a concurrent sweep marked first, is left alone. With --message, the idle
+    players are also sent WGA_STALLED_MESSAGE, as one Message delivered to all of them. A sweep takes the same handful
+    of queries however many games the sessions have. Run the command from the Project/ directory, once or every few
+    seconds:
+
+        python manage.py sweep_stalled_games
+        python manage.py sweep_stalled_games --minutes 3 --every 30 --message
+"""
+
+import asyncio
+import datetime
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from wga import models
+
+
+########################################################################################################################
+
+
+class Command(BaseCommand):
+
+    help = "Flags games whose current player is idle, alerts the moderators and optionally messages the player."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=float, default=settings.WGA_STALLED_MINUTES,
+                            help="idle time before a game is flagged")
+        parser.add_argument('--message', action='store_true', help="send WGA_STALLED_MESSAGE to the idle players")
+        parser.add_argument('--every', type=float, help="sweep again every this many seconds (until interrupted)")
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            stalled = sweep(datetime.timedelta(minutes=options['minutes']), options['message'])
+            self.stdout.write(
+                f"{timezone.now():%H:%M:%S} flagged {len(stalled)} stalled games "
+                f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+
+########################################################################################################################
+
+
+"""
+    Sweep HELPER FUNCTIONS
+
+    --- stalled                 :: filter of the games whose current player has been idle since before the cutoff
+    --- sweep                   :: flags the games stalled for longer than the given time; returns the idle players'
+                                   Intermediary objects
+    --- flag                    :: marks the given games stalled unless they changed since they were read; returns the
+                                   games it marked
+"""
+
+
+def stalled(cutoff):
+    return Q(
+        turn__in=[models.Game.Turn.ADVOCATE, models.Game.Turn.CRITIC],
+        last_move_at__lt=cutoff,
+        stalled_at__isnull=True
+    )
+
+
+def sweep(idle, message=False):
+    now = timezone.now()
+    cutoff = now - idle
+    games = list(models.Game.objects.filter(
+        stalled(cutoff),
+        group__start__lt=cutoff,
+        group__case=models.Group.Case.NON_CONTROL,
+        adv_info__isnull=False,
+        crt_info__isnull=False
+    ).select_related('group', 'adv_info__user', 'crt_info__user'))
+    games = flag(games, cutoff, now)
+    if not games:
+        return []
+
+    idle_players = [game.adv_info if game.turn == models.Game.Turn.ADVOCATE else game.crt_info for game in games]
+    events = [(models.Report.MODERATOR_GROUP, {
+        'type': 'game.stalled',
+        'game': game.id,
+        'group': game.group.name,
+        'player': player.user.name,
+        'role': "Advocate" if game.turn == models.Game.Turn.ADVOCATE else "Critic",
+        'minutes': int((now - max(game.last_move_at, game.group.start)).total_seconds() // 60)
+    }) for (game, player) in zip(games, idle_players)]
+
+    if message:
+        text = models.Message.objects.create(text="[MESSAGE] " + settings.WGA_STALLED_MESSAGE)
+        models.Intermediary.messages.through.objects.bulk_create([
+            models.Intermediary.messages.through(intermediary_id=player.id, message_id=text.id)
+            for player in idle_players
+        ])
+        text.deliver(idle_players)
+        events.extend((player.key, {
+            'type': 'update.messages',
+            'message': text.text,
+            'date': text.date.isoformat()
+        }) for player in idle_players)
+
+    channel_layer = get_channel_layer()
+
+    async def send_all():
+        await asyncio.gather(*[channel_layer.group_send(name, event) for (name, event) in events])
+    async_to_sync(send_all)()
+    return idle_players
+
+
+def flag(games, cutoff, now):
+    if not games:
+        return []
+    ids = [game.id for game in games]
+    models.Game.objects.filter(stalled(cutoff), id__in=ids).update(stalled_at=now)
+    flagged = set(models.Game.objects.filter(id__in=ids, stalled_at=now).values_list('id', flat=True))
+    return [game for game in games if game.id in flagged]
@@ -0,0 +1,321 @@
+"""
+    WG-A Metrics
+
+    This file contains the (opt-in) instrumentation for HTTP views and Django Channels consumer handlers. For every
+    handler call, we record the number of database queries, the time spent in the database, the time spent rendering
+    templates, and the total latency. The measurements are kept in in-process histograms (one set per Gunicorn / Daphne
+    worker) which are exposed in the Prometheus text format on a local-only endpoint, as well as on a moderator web page
+    listing the slowest handlers.
+
+    Set WGA_METRICS = True in settings.py to turn the instrumentation on; when it is off, every hook below returns
+    immediately.
+
+    DOCUMENTATION
+    https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/
+    https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+import threading
+import time
+import functools
+from contextlib import contextmanager, ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template import loader
+from django.template.backends import django as django_backend
+
+
+########################################################################################################################
+
+
+"""
+    Enabled HELPER FUNCTION
+
+    Returns a Boolean value indicating whether the instrumentation is turned on (see WGA_METRICS in settings.py).
+"""
+
+
+def enabled():
+    return getattr(settings, 'WGA_METRICS', False)
+
+
+########################################################################################################################
+
+
+"""
+    Histogram CLASS
+
+    Cumulative histogram in the Prometheus sense: each bucket counts the observations less than or equal to its upper
+    bound. Observations may come from several threads at once (Daphne runs synchronous consumers in a thread pool).
+
+    METHODS
+        --- observe             :: records one observation
+        --- quantile            :: estimates a quantile (the upper bound of the bucket the quantile falls into)
+        --- mean                :: average of all observations
+"""
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for (i, bound) in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        for (bound, count) in zip(self.buckets, self.counts):
+            if count >= q * self.count:
+                return min(bound, self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+########################################################################################################################
+
+
+"""
+    Registry
+
+    One set of histograms per handler. Handlers are named after the view class (e.g. "GameView") or the consumer method
+    (e.g. "GameConsumer.receive").
+"""
+
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+METRICS = [
+    # (name, sample attribute, buckets, help text)
+    ('wga_handler_latency_seconds', 'latency', SECONDS, "Total time spent in the handler."),
+    ('wga_handler_db_seconds', 'db_time', SECONDS, "Time spent executing database queries."),
+    ('wga_handler_render_seconds', 'render_time', SECONDS, "Time spent rendering templates."),
+    ('wga_handler_queries', 'queries', QUERIES, "Number of database queries executed."),
+]
+
+REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_CURRENT = threading.local()
+
+
+def histograms(handler):
+    with _REGISTRY_LOCK:
+        if handler not in REGISTRY:
+            REGISTRY[handler] = {attribute: Histogram(buckets) for (_, attribute, buckets, _) in METRICS}
+        return REGISTRY[handler]
+
+
+def reset():
+    with _REGISTRY_LOCK:
+        REGISTRY.clear()
+
+
+########################################################################################################################
+
+
+"""
+    Sample CLASS & measure CONTEXT MANAGER
+
+    measure() counts and times every query executed on any database connection (within the current thread) and keeps
+    the Sample as the thread's current sample, so the template rendering hooks below can add their rendering time.
+    When the block exits, the Sample is recorded under the handler's name (which may be filled in inside the block, as
+    the HTTP middleware only learns the view's name after URL resolution).
+"""
+
+
+class Sample:
+
+    def __init__(self, handler=None):
+        self.handler = handler
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.latency = 0.0
+        self.rendering = False
+
+    def _wrap_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def measure(handler=None):
+    if not enabled():
+        yield None
+        return
+
+    sample = Sample(handler)
+    previous = getattr(_CURRENT, 'sample', None)
+    _CURRENT.sample = sample
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample._wrap_query))
+            yield sample
+    finally:
+        sample.latency = time.perf_counter() - start
+        _CURRENT.sample = previous
+        if sample.handler:
+            record(sample)
+
+
+def record(sample):
+    for (attribute, histogram) in histograms(sample.handler).items():
+        histogram.observe(getattr(sample, attribute))
+
+
+########################################################################################################################
+
+
+"""
+    Instrumentation HOOKS
+
+    --- instrument              :: decorator for consumer handlers, e.g. @metrics.instrument('GameConsumer.receive')
+    --- rendering               :: context manager adding the time spent in the block to the current sample's
+                                   rendering time (a template rendered while another one renders is not counted twice)
+    --- render_to_string        :: drop-in replacement for django.template.loader.render_to_string that is timed
+    --- DjangoTemplates         :: TEMPLATES backend (see settings.py) timing every template it renders, including the
+                                   TemplateResponse objects returned by views and the render() shortcut
+    --- MetricsMiddleware       :: records every HTTP request under its view's name
+"""
+
+
+def instrument(handler):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with measure(handler):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def rendering():
+    sample = getattr(_CURRENT, 'sample', None)
+    if sample is None or sample.rendering:
+        yield
+        return
+    sample.rendering = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.render_time += time.perf_counter() - start
+        sample.rendering = False
+
+
+def render_to_string(template_name, context=None, request=None):
+    with rendering():
+        return loader.render_to_string(template_name, context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedTemplate(django_backend.Template):
+
+    def __init__(self, template):
+        super().__init__(template.template, template.backend)
+
+    def render(self, context=None, request=None):
+        with rendering():
+            return super().render(context, request)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not enabled():
+            return self.get_response(request)
+        with measure() as sample:
+            response = self.get_response(request)
+            match = request.resolver_match
+            if match:
+                view_class = getattr(match.func, 'view_class', None)
+                sample.handler = view_class.__name__ if view_class else match.view_name
+        return response
+
+
+########################################################################################################################
+
+
+"""
+    Exposition HELPER FUNCTIONS
+
+    --- exposition              :: returns every histogram in the Prometheus text format (version 0.0.4)
+    --- slowest                 :: returns a summary row for each handler, slowest (95th percentile latency) first
+"""
+
+
+def exposition():
+    with _REGISTRY_LOCK:
+        registry = {handler: dict(metrics) for (handler, metrics) in REGISTRY.items()}
+
+    lines = []
+    for (name, attribute, _, description) in METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for (handler, metrics) in sorted(registry.items()):
+            histogram = metrics[attribute]
+            label = handler.replace('\\', '\\\\').replace('"', '\\"')
+            for (bound, count) in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{handler="{label}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{handler="{label}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{handler="{label}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{handler="{label}"}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def slowest():
+    with _REGISTRY_LOCK:
+        registry = {handler: dict(metrics) for (handler, metrics) in REGISTRY.items()}
+
+    rows = [
+        {
+            'handler': handler,
+            'count': metrics['latency'].count,
+            'latency_mean': metrics['latency'].mean() * 1000,
+            'latency_p95': metrics['latency'].quantile(0.95) * 1000,
+            'latency_max': metrics['latency'].max * 1000,
+            'queries_mean': metrics['queries'].mean(),
+            'queries_max': metrics['queries'].max,
+            'db_mean': metrics['db_time'].mean() * 1000,
+            'render_mean': metrics['render_time'].mean() * 1000,
+        }
+        for (handler, metrics) in registry.items()
+    ]
+    return sorted(rows, key=lambda row: (row['latency_p95'], row['latency_mean']), reverse=True)
+
+
+########################################################################################################################
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(condition=models.Q(resolved=False), fields=['-id'], name='wga_report_unresolved_idx'),
+        ),
+    ]
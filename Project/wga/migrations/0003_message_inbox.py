@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_inboxes(apps, schema_editor):
+    Delivery = apps.get_model('wga', 'Delivery')
+    Intermediary = apps.get_model('wga', 'Intermediary')
+    deliveries = []
+    for intermediary in Intermediary.objects.select_related('user__group'):
+        messages = list(intermediary.messages.all())
+        if intermediary.user and intermediary.user.group:
+            messages.extend(intermediary.user.group.messages.all())
+        deliveries.extend(
+            Delivery(intermediary=intermediary, message=message, date=message.date) for message in messages
+        )
+    Delivery.objects.bulk_create(deliveries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0002_report_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Delivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('intermediary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='wga.Intermediary')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wga.Message')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['intermediary', 'date'], name='wga_delivery_inbox_idx'),
+        ),
+        migrations.RunPython(fill_inboxes, migrations.RunPython.noop),
+    ]
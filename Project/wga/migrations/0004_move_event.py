@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0003_message_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='move',
+            name='event',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
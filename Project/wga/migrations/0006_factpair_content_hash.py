@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:53
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+
+def fact_hash(source, target):  # engine.fact_hash when this migration was written
+    normalized = [re.sub(r'\s+', ' ', str(fact)).strip().casefold() for fact in (source, target)]
+    return hashlib.sha256('\x1f'.join(normalized).encode('utf-8')).hexdigest()
+
+
+def fill_hashes(apps, schema_editor):
+    FactPair = apps.get_model('wga', 'FactPair')
+    seen = set()
+    facts = []
+    for fact in FactPair.objects.order_by('id').iterator():
+        content_hash = fact_hash(fact.source_fact, fact.target_fact)
+        if fact.game_id is None or (fact.game_id, content_hash) not in seen:  # later duplicates keep a null hash
+            seen.add((fact.game_id, content_hash))
+            fact.content_hash = content_hash
+            facts.append(fact)
+    FactPair.objects.bulk_update(facts, ['content_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0005_game_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factpair',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='factpair',
+            constraint=models.UniqueConstraint(fields=('game', 'content_hash'), name='wga_factpair_unique_content'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0006_factpair_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameAnalytics',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analytics', serialize=False, to='wga.Game')),
+                ('moves', models.PositiveIntegerField(default=0)),
+                ('create_rule', models.PositiveIntegerField(default=0)),
+                ('update_rule', models.PositiveIntegerField(default=0)),
+                ('sent_attack', models.PositiveIntegerField(default=0)),
+                ('accepted_attack', models.PositiveIntegerField(default=0)),
+                ('rejected_attack', models.PositiveIntegerField(default=0)),
+                ('proposed_edit', models.PositiveIntegerField(default=0)),
+                ('accepted_edit', models.PositiveIntegerField(default=0)),
+                ('rejected_edit', models.PositiveIntegerField(default=0)),
+                ('modified_edit', models.PositiveIntegerField(default=0)),
+                ('proposed_add', models.PositiveIntegerField(default=0)),
+                ('accepted_add', models.PositiveIntegerField(default=0)),
+                ('rejected_add', models.PositiveIntegerField(default=0)),
+                ('modified_add', models.PositiveIntegerField(default=0)),
+                ('report', models.PositiveIntegerField(default=0)),
+                ('report_reviewed', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('attacks_l1', models.PositiveIntegerField(default=0)),
+                ('attacks_l2', models.PositiveIntegerField(default=0)),
+                ('attacks_l3', models.PositiveIntegerField(default=0)),
+                ('attacks_l4', models.PositiveIntegerField(default=0)),
+                ('attacks_l5', models.PositiveIntegerField(default=0)),
+                ('first_move', models.DateTimeField(null=True)),
+                ('last_move', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:59
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+TURN_FIELDS = {1: 'advocate_turn', 0: 'critic_turn', 2: 'moderated', 3: 'completed', 4: 'conversation'}
+
+
+def fill_summaries(apps, schema_editor):
+    Group = apps.get_model('wga', 'Group')
+    Game = apps.get_model('wga', 'Game')
+    User = apps.get_model('wga', 'User')
+    Report = apps.get_model('wga', 'Report')
+    GroupSummary = apps.get_model('wga', 'GroupSummary')
+    summaries = []
+    for group_id in Group.objects.values_list('id', flat=True):
+        counters = Game.objects.filter(group_id=group_id).aggregate(**{
+            field: Count('id', filter=Q(turn=turn)) for (turn, field) in TURN_FIELDS.items()
+        })
+        counters.update(User.objects.filter(group_id=group_id).aggregate(
+            users_assigned=Count('id', filter=Q(assigned=True)),
+            users_approved=Count('id', filter=Q(approved=True))
+        ))
+        counters['open_reports'] = Report.objects.filter(game__group_id=group_id, resolved=False).count()
+        summaries.append(GroupSummary(group_id=group_id, **counters))
+    GroupSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0007_game_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupSummary',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='wga.Group')),
+                ('advocate_turn', models.IntegerField(default=0)),
+                ('critic_turn', models.IntegerField(default=0)),
+                ('moderated', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('conversation', models.IntegerField(default=0)),
+                ('users_assigned', models.IntegerField(default=0)),
+                ('users_approved', models.IntegerField(default=0)),
+                ('open_reports', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
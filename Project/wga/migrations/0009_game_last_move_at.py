@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-19 03:00
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_last_moves(apps, schema_editor):
+    Game = apps.get_model('wga', 'Game')
+    Move = apps.get_model('wga', 'Move')
+    latest = Move.objects.filter(game=OuterRef('pk')).order_by().values('game').annotate(date=Max('date')).values('date')
+    Game.objects.filter(id__in=Move.objects.values('game_id')).update(last_move_at=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wga', '0008_group_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='last_move_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='stalled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_last_moves, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['turn', 'last_move_at'], name='wga_game_turn_idle_idx'),
+        ),
+    ]
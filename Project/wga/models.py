@@ -15,10 +15,19 @@ import random
 import datetime
 import string
 import csv
+import json
+import time
+import functools
 
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction, IntegrityError
+from django.db.models import BooleanField, Case, Count, F, Q, Value, When
 from django.utils import timezone
+from django.core.cache import cache
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync
+
+from wga import engine
+from wga import journal
 
 
 WGA_ADMIN_LOGGER = logging.getLogger('django.moderator')
@@ -60,6 +69,7 @@ def create_key():
 
     METHODS
         --- get_status          :: returns a dictionary with the total number of active, moderated, and completed games
+        --- save                :: also counts logging in and passing the instructions in the session's GroupSummary
 """
 
 
@@ -72,6 +82,23 @@ class User(models.Model):
     assigned = models.BooleanField(default=False)
     approved = models.BooleanField(default=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._counted = (user.__dict__.get('group_id'), user.__dict__.get('assigned'), user.__dict__.get('approved'))
+        return user
+
+    def save(self, *args, **kwargs):
+        (group_id, assigned, approved) = getattr(self, '_counted', (None, False, False))
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if (group_id, assigned, approved) != (self.group_id, self.assigned, self.approved):
+                GroupSummary.count(
+                    (group_id, {'users_assigned': assigned, 'users_approved': approved}),
+                    (self.group_id, {'users_assigned': self.assigned, 'users_approved': self.approved})
+                )
+        self._counted = (self.group_id, self.assigned, self.approved)
+
     def __str__(self):
         return self.name
 
@@ -89,6 +116,9 @@ class User(models.Model):
         --- game                :: the associated Game object (leave blank / null when creating ScenarioPairs)
         --- source_fact         :: text for the source fact
         --- target_fact         :: text for the target fact
+        --- content_hash        :: hash of both facts, ignoring case and whitespace (see engine.fact_hash); a game
+                                   cannot have two FactPairs with the same hash (null for duplicates made before the
+                                   hash was introduced, which keep it null when they are saved again)
 """
 
 
@@ -97,6 +127,17 @@ class FactPair(models.Model):
     game = models.ForeignKey('wga.Game', blank=True, null=True, on_delete=models.SET_NULL)
     source_fact = models.CharField(max_length=1024)
     target_fact = models.CharField(max_length=1024)
+    content_hash = models.CharField(blank=True, null=True, max_length=64, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'content_hash'], name='wga_factpair_unique_content')
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is None or self.content_hash is not None:
+            self.content_hash = engine.fact_hash(self.source_fact, self.target_fact)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.source_fact} | {self.target_fact}"
@@ -144,40 +185,26 @@ class ScenarioPair(models.Model):
         --- date                :: date and time in which the move was made (in UTC timezone)
         --- code                :: label for the move (what kind of move was made?)
         --- text                :: text description of the move
+        --- event               :: JSON event the game engine replays to rebuild the game (see engine.py, replay.py)
+
+    METHODS
+        --- get_event           :: the move's event (None for moves recorded without one, e.g. ending the game)
 """
 
 
 class Move(models.Model):
 
-    class Code:
-        CREATE_RULE = "Create Rule"
-        UPDATE_RULE = "Update Rule"
-
-        SENT_ATTACK = "Sent Attack"
-        ACCEPTED_ATTACK = "Accepted Attack"
-        REJECTED_ATTACK = "Rejected Attack"
-
-        PROPOSED_EDIT = "Proposed Edit"
-        ACCEPTED_EDIT = "Accepted Edit"
-        REJECTED_EDIT = "Rejected Edit"
-        MODIFIED_EDIT = "Modified Edit"
-
-        PROPOSED_ADD = "Proposed Add"
-        ACCEPTED_ADD = "Accepted Add"
-        REJECTED_ADD = "Rejected Add"
-        MODIFIED_ADD = "Modified Add"
-
-        REPORT = "Report"
-        REPORT_REVIEWED = "Report Reviewed"
-
-        PASS = "Pass"
-        COMPLETED = "Completed"
+    Code = engine.Code
 
     user = models.ForeignKey('wga.User', null=True, on_delete=models.SET_NULL)
     game = models.ForeignKey('wga.Game', null=True, on_delete=models.SET_NULL)
     date = models.DateTimeField(default=timezone.now)
     code = models.CharField(max_length=64)
     text = models.CharField(max_length=1024)
+    event = models.TextField(blank=True, default='')
+
+    def get_event(self):
+        return json.loads(self.event) if self.event else None
 
     def __str__(self):
         return f"Advocate {self.text}" if self.game.adv_info.user == self.user else f"Critic {self.text}"
@@ -197,6 +224,9 @@ class Move(models.Model):
     FIELDS
         --- text                :: text description of the message
         --- date                :: date and time in which the message / announcement was made
+
+    METHODS
+        --- deliver             :: puts the message in each given Intermediary object's inbox (see Delivery MODEL)
 """
 
 
@@ -205,6 +235,12 @@ class Message(models.Model):
     date = models.DateTimeField(default=timezone.now)
     text = models.CharField(max_length=1024)
 
+    def deliver(self, intermediaries):
+        Delivery.objects.bulk_create([
+            Delivery(intermediary_id=intermediary.id, message_id=self.id, date=self.date)
+            for intermediary in intermediaries
+        ])
+
     def __str__(self):
         return self.text
 
@@ -212,6 +248,39 @@ class Message(models.Model):
 ########################################################################################################################
 
 
+"""
+    Delivery MODEL
+
+    Django model representing a message in a game slot's inbox. Individualized messages get one Delivery object;
+    session-wide announcements get one Delivery object for every game slot in the game session. Reading a player's
+    messages is then a single range scan over the (intermediary, date) index instead of a union of the group's and the
+    game slot's messages. The Group.messages and Intermediary.messages fields still record who each message was sent to.
+
+    FIELDS
+        --- intermediary        :: the game slot whose inbox holds the message
+        --- message             :: the associated Message object
+        --- date                :: date and time in which the message was sent (copied from the Message object)
+"""
+
+
+class Delivery(models.Model):
+
+    intermediary = models.ForeignKey('wga.Intermediary', on_delete=models.CASCADE, related_name='deliveries')
+    message = models.ForeignKey('wga.Message', on_delete=models.CASCADE)
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['intermediary', 'date'], name='wga_delivery_inbox_idx')
+        ]
+
+    def __str__(self):
+        return self.message.text
+
+
+########################################################################################################################
+
+
 """
     Group MODEL
     
@@ -230,9 +299,16 @@ class Message(models.Model):
         --- messages            :: (non-control) the associated Message objects
 
     METHODS
-        --- generate_games      :: once all fields are filled, generate User, Intermediary, and Game objects
+        --- generate_games      :: once all fields are filled, generate User, Intermediary, and Game objects (reporting
+                                   the numbers of players and games created so far to the optional progress callback)
+        --- discard             :: deletes the session along with its users, game slots, games and facts (e.g. after its
+                                   generation was cancelled)
         --- add_game            :: when mTurk workers finish all their games, the administrators can create new games
         --- add_announcement    :: (non-control) adds a session-wide announcement
+        --- get_played          :: (cached) maps each User object's ID to the IDs of the scenarios they have played
+        --- forget_played       :: invalidates the cached get_played() matrix (call whenever game slots change)
+        --- get_summary         :: the session's GroupSummary counters (recounted, but not saved, if they do not exist
+                                   yet)
 """
 
 
@@ -271,13 +347,15 @@ class Group(models.Model):
     # Django Channels (WebSockets)
     messages = models.ManyToManyField('wga.Message')
 
-    def generate_games(self):
+    def generate_games(self, progress=None):
+        progress = progress or (lambda players=None, games=None: None)
         if self.case == self.Case.NON_CONTROL:
-            self._non_control()
+            self._non_control(progress)
         elif self.case == self.Case.CONTROL:
-            self._control()
+            self._control(progress)
+        self.forget_played()
 
-    def _non_control(self):
+    def _non_control(self, progress):
         self.save()
 
         # Step 0: Load CSV file from mTurk (containing mTurk workers' code names)
@@ -287,7 +365,10 @@ class Group(models.Model):
         WGA_ADMIN_LOGGER.debug(f"Step 0 Completed: Loaded code names from {self.name}.csv")
 
         # Step 1: Generate *num_users* number of User objects
-        players = [User.objects.create(name=code_names[i][0], group=self) for i in range(self.num_users)]
+        players = []
+        for i in range(self.num_users):
+            players.append(User.objects.create(name=code_names[i][0], group=self))
+            progress(players=len(players))
         WGA_ADMIN_LOGGER.debug("Step 1 Completed: Generated User objects")
 
         # Step 2: Generate a random set of game pairs
@@ -306,10 +387,10 @@ class Group(models.Model):
                     break
             else:
                 break
-        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated game pairs - {list(zip(adv, crt))}")
+        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated {len(adv)} game pairs")
 
         # Step 3: Generate games based on game pairs from Step 2
-        for (i, j) in zip(adv, crt):
+        for (n, (i, j)) in enumerate(zip(adv, crt), start=1):
             # Step 3a: Find a scenario that Players i and j have not played before
             scenarios = list(self.scenarios.all())
             scenario = random.choice(scenarios)
@@ -327,6 +408,7 @@ class Group(models.Model):
                 crt_info=Intermediary.objects.create(user=players[j], role=Intermediary.Role.CRITIC)
             )
             game.set_initial_facts()
+            progress(games=n)
             WGA_ADMIN_LOGGER.debug(f"Generated: {game}")
         WGA_ADMIN_LOGGER.debug(f"Step 3 Completed: Generated games")
 
@@ -350,12 +432,15 @@ class Group(models.Model):
             crt_info=Intermediary.objects.create(user=critic, role=Intermediary.Role.CRITIC)
         )
         game.set_initial_facts()
+        for announcement in self.messages.all():  # new game slots still see the announcements made before them
+            announcement.deliver([game.adv_info, game.crt_info])
         self.num_games += 1
         self.save()
+        self.forget_played()
         WGA_ADMIN_LOGGER.debug(f"Added {game} to {self.name}")
         return game
 
-    def _control(self):
+    def _control(self, progress):
         self.save()
 
         # Step 0: Load CSV file from mTurk (containing mTurk workers' code names)
@@ -365,7 +450,10 @@ class Group(models.Model):
         WGA_ADMIN_LOGGER.debug(f"Step 0 Completed: Loaded code names from {self.name}.csv")
 
         # Step 1: Generate *num_users* number of User objects
-        players = [User.objects.create(name=code_names[i][0], group=self) for i in range(self.num_users)]
+        players = []
+        for i in range(self.num_users):
+            players.append(User.objects.create(name=code_names[i][0], group=self))
+            progress(players=len(players))
         WGA_ADMIN_LOGGER.debug("Step 1 Completed: Generated User objects")
 
         # Step 2: Generate a random set of game pairs
@@ -384,7 +472,7 @@ class Group(models.Model):
                     break
             else:
                 break
-        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated game pairs - {list(zip(adv, crt))}")
+        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated {len(adv)} game pairs")
 
         # Step 3: Generate games based on game pairs from Step 2
         chats = self.CHAT_ROOMS.copy()
@@ -392,7 +480,7 @@ class Group(models.Model):
         scenarios = list(self.scenarios.all())
         random.shuffle(scenarios)
         scenario = scenarios.pop(0)
-        for (i, j) in zip(adv, crt):
+        for (n, (i, j)) in enumerate(zip(adv, crt), start=1):
             """
             # Step 3a: Find a scenario that Players i and j have not played before
             scenarios = list(self.scenarios.all())
@@ -418,6 +506,7 @@ class Group(models.Model):
                 turn=Game.Turn.CONVERSATION
             )
             game.set_initial_facts()
+            progress(games=n)
             WGA_ADMIN_LOGGER.debug(f"Generated: {game}")
         WGA_ADMIN_LOGGER.debug(f"Step 3 Completed: Generated games")
 
@@ -467,7 +556,7 @@ class Group(models.Model):
             else:
                 break
         """
-        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated game pairs - {list(zip(adv, crt))}")
+        WGA_ADMIN_LOGGER.debug(f"Step 2 Completed: Generated {len(adv)} game pairs")
 
         # Step 3: Generate new games
         chats = self.CHAT_ROOMS.copy()
@@ -488,6 +577,39 @@ class Group(models.Model):
             game.set_initial_facts()
             WGA_ADMIN_LOGGER.debug(f"Generated: {game}")
         WGA_ADMIN_LOGGER.debug(f"Step 3 Completed: Generated games")
+        self.forget_played()
+
+    def get_played(self):
+        played = cache.get(self._played_key())
+        if played is None:
+            scenarios = {}
+            games = Game.objects.filter(group=self).values_list('scenario_id', 'adv_info__user_id', 'crt_info__user_id')
+            for (scenario, advocate, critic) in games:
+                for user in (advocate, critic):
+                    if scenario is not None and user is not None:
+                        scenarios.setdefault(user, set()).add(scenario)
+            played = {str(user): sorted(ids) for (user, ids) in scenarios.items()}  # str keys: the matrix becomes JSON
+            cache.set(self._played_key(), played, None)
+        return played
+
+    def discard(self):
+        intermediaries = list(Intermediary.objects.filter(user__group=self).values_list('id', flat=True))
+        FactPair.objects.filter(game__group=self).delete()
+        Game.objects.filter(group=self).delete()
+        Intermediary.objects.filter(id__in=intermediaries).delete()
+        User.objects.filter(group=self).delete()
+        self.forget_played()
+        self.delete()
+
+    def forget_played(self):
+        cache.delete(self._played_key())
+
+    def _played_key(self):
+        return f"wga:group:{self.id}:played"
+
+    def get_summary(self):
+        summary = GroupSummary.objects.filter(group=self).first()
+        return summary if summary is not None else GroupSummary.recount(self.id)
 
     def __str__(self):
         return self.name
@@ -496,6 +618,106 @@ class Group(models.Model):
 ########################################################################################################################
 
 
+"""
+    Group Summary MODEL
+
+    Django model holding the counters moderators use to judge a game session's health. The counters are kept up to date
+    in the same transaction as the change they count: a game's turn changing (Game.save), an mTurk worker logging in or
+    watching the instructions (User.save), and a report being opened or resolved (Report.save). Deleting games, users or
+    reports is not counted; rebuild() recounts a session from scratch. A session's row is created by the first counted
+    change; until then, Group.get_summary() counts it on demand.
+
+    FIELDS
+        --- group               :: the associated Group object
+        --- advocate_turn       :: number of games on the Advocate's turn
+        --- critic_turn         :: number of games on the Critic's turn
+        --- moderated           :: number of games waiting for a moderator
+        --- completed           :: number of completed games
+        --- conversation        :: (control) number of chat room games
+        --- users_assigned      :: number of mTurk workers who logged in
+        --- users_approved      :: number of mTurk workers who passed the instructions
+        --- open_reports        :: number of unresolved reports
+
+    METHODS
+        --- count               :: counts a change of a game, user or report, given as (group id, {counter: value})
+                                   before and after the change
+        --- adjust              :: adds the given amounts to a session's counters
+        --- rebuild             :: recounts a session's counters and saves them
+        --- recount             :: counts a session's counters with aggregate queries (without saving them)
+        --- as_dict             :: the counters (see the Group Summary VIEW)
+"""
+
+
+class GroupSummary(models.Model):
+
+    TURN_FIELDS = {
+        engine.Turn.ADVOCATE: 'advocate_turn',
+        engine.Turn.CRITIC: 'critic_turn',
+        engine.Turn.MODERATED: 'moderated',
+        engine.Turn.COMPLETED: 'completed',
+        engine.Turn.CONVERSATION: 'conversation'
+    }
+    COUNTERS = list(TURN_FIELDS.values()) + ['users_assigned', 'users_approved', 'open_reports']
+
+    group = models.OneToOneField('wga.Group', primary_key=True, on_delete=models.CASCADE, related_name='summary')
+    advocate_turn = models.IntegerField(default=0)
+    critic_turn = models.IntegerField(default=0)
+    moderated = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    conversation = models.IntegerField(default=0)
+    users_assigned = models.IntegerField(default=0)
+    users_approved = models.IntegerField(default=0)
+    open_reports = models.IntegerField(default=0)
+
+    @staticmethod
+    def count(before, after):
+        deltas = {}
+        for (sign, (group_id, counts)) in ((-1, before), (1, after)):
+            for (field, value) in counts.items():
+                if group_id is not None and field is not None and value:
+                    deltas.setdefault(group_id, {})
+                    deltas[group_id][field] = deltas[group_id].get(field, 0) + sign * int(value)
+        for (group_id, changes) in deltas.items():
+            GroupSummary.adjust(group_id, changes)
+
+    @staticmethod
+    def adjust(group_id, deltas):
+        deltas = {field: delta for (field, delta) in deltas.items() if delta}
+        if not deltas:
+            return
+        if not GroupSummary.objects.filter(group_id=group_id).update(**{
+            field: F(field) + delta for (field, delta) in deltas.items()
+        }):
+            GroupSummary.rebuild(group_id)  # the counted change is already written, so the recount includes it
+
+    @staticmethod
+    def rebuild(group_id):
+        summary = GroupSummary.recount(group_id)
+        GroupSummary.objects.update_or_create(group_id=group_id, defaults=summary.as_dict())
+        return summary
+
+    @staticmethod
+    def recount(group_id):
+        counters = Game.objects.filter(group_id=group_id).aggregate(**{
+            field: Count('id', filter=Q(turn=turn)) for (turn, field) in GroupSummary.TURN_FIELDS.items()
+        })
+        counters.update(User.objects.filter(group_id=group_id).aggregate(
+            users_assigned=Count('id', filter=Q(assigned=True)),
+            users_approved=Count('id', filter=Q(approved=True))
+        ))
+        counters['open_reports'] = Report.objects.filter(game__group_id=group_id, resolved=False).count()
+        return GroupSummary(group_id=group_id, **counters)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.COUNTERS}
+
+    def __str__(self):
+        return f"Summary of group {self.group_id}"
+
+
+########################################################################################################################
+
+
 """
     Intermediary MODEL
 
@@ -562,35 +784,49 @@ class Intermediary(models.Model):
         --- context             :: (non-control) the WG-A game's current state
         --- context_data        :: (non-control) relevant data from the WG-A game's previous state
         --- turn                :: (non-control) determines the current player
+        --- version             :: (non-control) number of moves committed through commit_move (see claim_version)
+        --- last_move_at        :: date of the latest move (or of the game's creation), kept by add_move
+        --- stalled_at          :: date the current player was flagged as idle (see the sweep_stalled_games command);
+                                   cleared by the next move
         
     METHODS
+        --- save                :: also counts the game's turn in the session's GroupSummary
         --- set_initial_facts   :: copies the facts from the ScenarioPair object and adds them to the Game object
         --- set_context_data    :: set relevant data to be used in the next game state
         --- get_context_data    :: set relevant data from the previous game state
-        --- add_move            :: basic adder function
+        --- add_move            :: basic adder function (also appends the move to the move journal once the transaction
+                                   commits, see journal.py); returns the new Move object
         --- can_pass            :: if 8 total moves have been made, the Critic is allowed to pass their turn
+        --- get_history         :: the latest moves (before the given move id), oldest first, labelled with the role of
+                                   the player who made them; also returns whether there are older moves
+        --- get_facts           :: the game's facts, as {'id', 'source_fact', 'target_fact'} dictionaries
+        --- get_fact_choices    :: the (id, text) choices of the facts, as offered by the update facts form
+        --- get_state           :: (non-control) the game's state, as used by the game engine (see engine.py)
+        --- claim_version       :: (non-control) increments the version, unless another move was committed since the
+                                   game was loaded (raises Game.Conflict)
+        --- commit_move         :: (non-control) saves a move applied by the game engine (its effects, state, moves,
+                                   event and analytics); raises Game.Conflict (and saves nothing) if the game changed
+                                   in the meantime, or engine.IllegalMove if its facts collide with stored ones
+
+    Two moves may be submitted for the same game at once (both players, a player and a moderator resolving a report, or
+    a form resubmitted by a reconnecting WebSocket). Each was validated against the game as it was loaded, so the
+    version check makes sure only the first one is committed: the UPDATE ... WHERE version = N row lock is held only
+    until the move's rows are written, never while rendering. save() never writes the version, so saving an outdated
+    copy of a game cannot roll it back.
+
+    The facts are read once per game version: get_facts() keeps them (and their form choices) on the Game object until
+    its version changes, so the engine state, the move form and the argument table built for one event share a single
+    query, and a move committed through the same object reads the updated facts.
+
+    INDEXES
+        --- turn_idle           :: (turn, last_move_at) index backing the stalled-game sweep
 """
 
 
 class Game(models.Model):
 
-    class Context:
-        NOT_TURN = "Not Turn"
-        CREATE_RULE = "Create Rule"
-        IDLE = "Idle"
-        ATTACK_RESPONSE = "Attack Response"
-        PROPOSED_EDIT = "Proposed Edit"
-        PROPOSED_ADD = "Proposed Add"
-        SUSPENDED = "Suspended"
-        COMPLETED = "Completed"
-        CONVERSATION = "Conversation"
-
-    class Turn:
-        CRITIC = 0
-        ADVOCATE = 1
-        MODERATED = 2
-        COMPLETED = 3
-        CONVERSATION = 4
+    Context = engine.Context
+    Turn = engine.Turn
 
     TURN_CHOICES = [
         (Turn.CRITIC, "Critic"),
@@ -605,16 +841,56 @@ class Game(models.Model):
     chat = models.CharField(blank=True, null=True, max_length=20)
     adv_info = models.OneToOneField('wga.Intermediary', null=True, on_delete=models.SET_NULL, related_name='advocacy')
     crt_info = models.OneToOneField('wga.Intermediary', null=True, on_delete=models.SET_NULL, related_name='criticism')
-    rule_antecedent = models.CharField(default="__________", max_length=1024)
-    rule_consequent = models.CharField(default="__________", max_length=1024)
+    rule_antecedent = models.CharField(default=engine.BLANK_RULE, max_length=1024)
+    rule_consequent = models.CharField(default=engine.BLANK_RULE, max_length=1024)
     context = models.CharField(default=Context.CREATE_RULE, max_length=64)
     context_data = models.CharField(blank=True, max_length=1024)  # DO NOT ACCESS DIRECTLY
     turn = models.IntegerField(default=Turn.ADVOCATE, choices=TURN_CHOICES)
+    version = models.PositiveIntegerField(default=0)
+    last_move_at = models.DateTimeField(default=timezone.now)
+    stalled_at = models.DateTimeField(blank=True, null=True)
+
+    HISTORY_WINDOW = 20  # moves shown in the move history; older moves are loaded on request (see GameConsumer)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['turn', 'last_move_at'], name='wga_game_turn_idle_idx')
+        ]
+
+    class Conflict(Exception):
+        pass
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        game = super().from_db(db, field_names, values)
+        game._loaded = time.perf_counter()  # the journal's processing time starts when the game is loaded
+        game._saved_context = game.__dict__.get('context')
+        game._counted = (game.__dict__.get('group_id'), game.__dict__.get('turn'))
+        return game
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'version']
+        (group_id, turn) = getattr(self, '_counted', (None, None))
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if (group_id, turn) != (self.group_id, self.turn):
+                GroupSummary.count(
+                    (group_id, {GroupSummary.TURN_FIELDS.get(turn): 1}),
+                    (self.group_id, {GroupSummary.TURN_FIELDS.get(self.turn): 1})
+                )
+        self._counted = (self.group_id, self.turn)
 
     def set_initial_facts(self):
         self.save()
+        hashes = set()
         for fact in self.scenario.facts.all():
-            FactPair.objects.create(game=self, source_fact=fact.source_fact, target_fact=fact.target_fact)
+            content_hash = engine.fact_hash(fact.source_fact, fact.target_fact)
+            if content_hash not in hashes:  # the scenario may repeat a fact
+                hashes.add(content_hash)
+                FactPair.objects.create(game=self, source_fact=fact.source_fact, target_fact=fact.target_fact)
+        self._facts = None
         self.save()
 
     def set_context_data(self, data):
@@ -625,13 +901,97 @@ class Game(models.Model):
     def get_context_data(self):
         return str(self.context_data).split('%_#_%')
 
-    def add_move(self, user, code, text):
+    def add_move(self, user, code, text, event=None):
+        before = getattr(self, '_saved_context', None)
         self.save()
-        Move.objects.create(user=user, game=self, code=code, text=text)
+        move = Move.objects.create(user=user, game=self, code=code, text=text, event=json.dumps(event) if event else '')
+        self.last_move_at = move.date
+        self.stalled_at = None
         self.save()
+        self._saved_context = self.context
+        seconds = time.perf_counter() - self._loaded if hasattr(self, '_loaded') else 0.0
+        # A move rolled back with the rest of commit_move() must not reach the journal.
+        transaction.on_commit(functools.partial(journal.record_move, move, before, self.context, seconds))
+        return move
 
     def can_pass(self):
-        return self.move_set.all().count() > 8
+        return self.move_set.all().count() > engine.CRITIC_PASS_AFTER
+
+    def get_history(self, before=None, limit=HISTORY_WINDOW):
+        moves = self.move_set.annotate(by_advocate=Case(
+            When(user=F('game__adv_info__user'), then=Value(True)), default=Value(False), output_field=BooleanField()
+        )).order_by('-id')
+        if before is not None:
+            moves = moves.filter(id__lt=before)
+        rows = list(moves.values('id', 'text', 'by_advocate')[:limit + 1 if limit else None])
+        older = bool(limit) and len(rows) > limit
+        history = [{
+            'id': row['id'],
+            'role': "Advocate" if row['by_advocate'] else "Critic",
+            'text': row['text']
+        } for row in reversed(rows[:limit] if limit else rows)]
+        return (history, older)
+
+    def get_facts(self):
+        if getattr(self, '_facts', None) is None or self._facts[0] != self.version:
+            facts = list(self.factpair_set.order_by('id').values('id', 'source_fact', 'target_fact'))
+            choices = [(fact['id'], engine.facts_text(fact['source_fact'], fact['target_fact'])) for fact in facts]
+            self._facts = (self.version, facts, choices)
+        return self._facts[1]
+
+    def get_fact_choices(self):
+        self.get_facts()
+        return self._facts[2]
+
+    def get_state(self):
+        moves = self.move_set.all()
+        return engine.State(
+            context=self.context,
+            turn=self.turn,
+            antecedent=self.rule_antecedent,
+            consequent=self.rule_consequent,
+            context_data=self.get_context_data() if self.context_data else (),
+            facts={fact['id']: (fact['source_fact'], fact['target_fact']) for fact in self.get_facts()},
+            moves=moves.count(),
+            last_move=moves.order_by('-id').values_list('code', flat=True).first()
+        )
+
+    def claim_version(self):
+        if not Game.objects.filter(id=self.id, version=self.version).update(version=F('version') + 1):
+            raise Game.Conflict(f"Game {self.id} has changed since version {self.version}.")
+        self.version += 1
+
+    def commit_move(self, user, state, result):
+        reports = []
+        with transaction.atomic():
+            self.claim_version()
+            try:
+                for effect in result.effects:
+                    if effect[0] == engine.Effect.UPDATE_FACT:
+                        facts = FactPair.objects.filter(id=effect[1], game=self)
+                        content_hash = engine.fact_hash(effect[2], effect[3])
+                        facts.update(source_fact=effect[2], target_fact=effect[3], content_hash=content_hash)
+                    elif effect[0] == engine.Effect.ADD_FACT:
+                        fact = FactPair.objects.create(game=self, source_fact=effect[1], target_fact=effect[2])
+                        result.event['data']['fact_id'] = fact.id  # replays give the added facts their real id
+                    elif effect[0] == engine.Effect.REPORT:
+                        reports.append(Report.objects.create(user=user, game=self, text=effect[1]))
+            except IntegrityError as e:  # the facts collide with stored ones (wga_factpair_unique_content)
+                raise engine.IllegalMove("Facts already exist") from e
+
+            self.rule_antecedent = state.antecedent
+            self.rule_consequent = state.consequent
+            self.context_data = '%_#_%'.join(state.context_data)
+            moves = []
+            for (i, step) in enumerate(result.steps):
+                self.context = step.context
+                self.turn = step.turn
+                moves.append(self.add_move(user=user, code=step.code, text=step.text,
+                                           event=result.event if i == 0 else None))
+            GameAnalytics.record(self, moves, link=result.event['data'].get('link'))
+
+        for report in reports:
+            Report.announce(report)
 
     def __str__(self):
         return f"Game between {self.adv_info.user.name} and {self.crt_info.user.name} on \"{self.scenario.name}\""
@@ -658,8 +1018,15 @@ class Game(models.Model):
         --- resolved            :: is the report resolved (T/F)?
 
     METHODS
+        --- save                :: also counts unresolved reports in the game session's GroupSummary
         --- report_error        :: method to send reports when the program runs into errors
         --- report_user         :: method to send reports when mTurk workers submit reports
+        --- moderate            :: hands the game over to the moderators and files the report, through the game's
+                                   version check (raises Game.Conflict, and saves nothing, if the game has changed)
+        --- announce            :: pushes a new or resolved report to every connected moderator's report queue
+
+    INDEXES
+        --- unresolved          :: partial index (unresolved reports only) backing the moderators' report queue
 """
 
 
@@ -679,22 +1046,323 @@ class Report(models.Model):
     returned = models.IntegerField(null=True, choices=RETURN_CHOICES)
     resolved = models.BooleanField(default=False)
 
+    # Django Channels (WebSockets)
+    MODERATOR_GROUP = 'moderator-reports'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-id'], name='wga_report_unresolved_idx', condition=Q(resolved=False))
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        report = super().from_db(db, field_names, values)
+        report._counted = (report.__dict__.get('game_id'), not report.__dict__.get('resolved'))
+        return report
+
+    def save(self, *args, **kwargs):
+        (game_id, was_open) = getattr(self, '_counted', (None, False))
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if (game_id, was_open) != (self.game_id, not self.resolved):
+                groups = dict(Game.objects.filter(id__in=[game_id, self.game_id]).values_list('id', 'group_id'))
+                GroupSummary.count(
+                    (groups.get(game_id), {'open_reports': was_open}),
+                    (groups.get(self.game_id), {'open_reports': not self.resolved})
+                )
+        self._counted = (self.game_id, not self.resolved)
+
     @staticmethod
     def report_error(game, text):
-        game.save()
-        game.turn = Game.Turn.MODERATED
-        game.save()
-        Report.objects.create(game=game, text="Error Reported: " + text)
+        return Report.moderate(game, "Error Reported: " + text)
 
     @staticmethod
     def report_user(game, text):
-        game.save()
-        game.turn = Game.Turn.MODERATED
-        game.save()
-        Report.objects.create(game=game, text="User Reported: " + text)
+        return Report.moderate(game, "User Reported: " + text)
+
+    @staticmethod
+    def moderate(game, text):
+        with transaction.atomic():  # a Game.Conflict leaves the game as it is and files no report
+            game.claim_version()
+            game.turn = Game.Turn.MODERATED
+            game.save()
+            report = Report.objects.create(game=game, text=text)
+        return Report.announce(report)
+
+    @staticmethod
+    def announce(report):
+        async_to_sync(get_channel_layer().group_send)(
+            Report.MODERATOR_GROUP,
+            {
+                'type': 'report.created' if not report.resolved else 'report.resolved',
+                'report_id': report.id
+            }
+        )
+        return report
 
     def __str__(self):
         return f"{self.user} {self.text}"
 
 
 ########################################################################################################################
+
+
+"""
+    Game Analytics MODEL
+
+    Django model holding one row of research analytics per WG-A game, kept up to date as moves are committed (see
+    Game.commit_move), so questions such as "how often is each link attacked?" or "how many proposed edits are
+    accepted?" are answered without exporting and parsing the moves' texts. The backfill_analytics command rebuilds the
+    rows from the moves with aggregate queries.
+
+    FIELDS
+        --- game                :: the associated Game object
+        --- moves               :: total number of moves
+        --- (one per Move.Code) :: number of moves with that code (see CODE_FIELDS)
+        --- attacks_l1 ... l5   :: number of attacks on each link
+        --- first_move          :: date of the game's first move (in UTC timezone)
+        --- last_move           :: date of the game's latest move (in UTC timezone)
+
+    METHODS
+        --- record              :: adds a committed move's steps to its game's row
+        --- mean_seconds        :: average time between two moves
+"""
+
+
+class GameAnalytics(models.Model):
+
+    CODE_FIELDS = {
+        Move.Code.CREATE_RULE: 'create_rule',
+        Move.Code.UPDATE_RULE: 'update_rule',
+        Move.Code.SENT_ATTACK: 'sent_attack',
+        Move.Code.ACCEPTED_ATTACK: 'accepted_attack',
+        Move.Code.REJECTED_ATTACK: 'rejected_attack',
+        Move.Code.PROPOSED_EDIT: 'proposed_edit',
+        Move.Code.ACCEPTED_EDIT: 'accepted_edit',
+        Move.Code.REJECTED_EDIT: 'rejected_edit',
+        Move.Code.MODIFIED_EDIT: 'modified_edit',
+        Move.Code.PROPOSED_ADD: 'proposed_add',
+        Move.Code.ACCEPTED_ADD: 'accepted_add',
+        Move.Code.REJECTED_ADD: 'rejected_add',
+        Move.Code.MODIFIED_ADD: 'modified_add',
+        Move.Code.REPORT: 'report',
+        Move.Code.REPORT_REVIEWED: 'report_reviewed',
+        Move.Code.PASS: 'passed',
+        Move.Code.COMPLETED: 'completed'
+    }
+    LINK_FIELDS = {link: f"attacks_{link.lower()}" for link in engine.LINKS}
+
+    game = models.OneToOneField('wga.Game', primary_key=True, on_delete=models.CASCADE, related_name='analytics')
+    moves = models.PositiveIntegerField(default=0)
+    create_rule = models.PositiveIntegerField(default=0)
+    update_rule = models.PositiveIntegerField(default=0)
+    sent_attack = models.PositiveIntegerField(default=0)
+    accepted_attack = models.PositiveIntegerField(default=0)
+    rejected_attack = models.PositiveIntegerField(default=0)
+    proposed_edit = models.PositiveIntegerField(default=0)
+    accepted_edit = models.PositiveIntegerField(default=0)
+    rejected_edit = models.PositiveIntegerField(default=0)
+    modified_edit = models.PositiveIntegerField(default=0)
+    proposed_add = models.PositiveIntegerField(default=0)
+    accepted_add = models.PositiveIntegerField(default=0)
+    rejected_add = models.PositiveIntegerField(default=0)
+    modified_add = models.PositiveIntegerField(default=0)
+    report = models.PositiveIntegerField(default=0)
+    report_reviewed = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    attacks_l1 = models.PositiveIntegerField(default=0)
+    attacks_l2 = models.PositiveIntegerField(default=0)
+    attacks_l3 = models.PositiveIntegerField(default=0)
+    attacks_l4 = models.PositiveIntegerField(default=0)
+    attacks_l5 = models.PositiveIntegerField(default=0)
+    first_move = models.DateTimeField(null=True)
+    last_move = models.DateTimeField(null=True)
+
+    @staticmethod
+    def record(game, moves, link=None):
+        counts = {'moves': len(moves)}
+        for move in moves:
+            counts[GameAnalytics.CODE_FIELDS[move.code]] = counts.get(GameAnalytics.CODE_FIELDS[move.code], 0) + 1
+        if link in GameAnalytics.LINK_FIELDS:
+            counts[GameAnalytics.LINK_FIELDS[link]] = 1
+        updated = GameAnalytics.objects.filter(game=game).update(
+            last_move=moves[-1].date, **{field: F(field) + count for (field, count) in counts.items()}
+        )
+        if not updated:  # the game's first move (commit_move holds the game's row lock, see Game.claim_version)
+            GameAnalytics.objects.create(game=game, first_move=moves[0].date, last_move=moves[-1].date, **counts)
+
+    def mean_seconds(self):
+        if self.moves < 2:
+            return None
+        return (self.last_move - self.first_move).total_seconds() / (self.moves - 1)
+
+    def __str__(self):
+        return f"Analytics of game {self.game_id}"
+
+
+########################################################################################################################
+
+
+"""
+    Job MODEL
+
+    Django model representing a background job: generating a game session's users and games (see
+    Group.generate_games) takes too long to run inside the moderator's request, so CreateGroupForm queues a Job and the
+    run_jobs command runs it. The job's progress is saved on its row and pushed to the moderators watching it (see
+    JobConsumer in assets_admin/consumers.py); a moderator may cancel the job, in which case the worker stops at its
+    next progress report and discards the partly generated session.
+
+    FIELDS
+        --- group               :: the associated Group object (null once a cancelled or failed session is discarded)
+        --- name                :: the name of the game session
+        --- status              :: queued, running, completed, cancelled or failed
+        --- cancelled           :: has a moderator asked for the job to be cancelled (T/F)?
+        --- players             :: number of User objects created so far
+        --- players_total       :: number of User objects to create
+        --- games               :: number of Game objects created so far
+        --- games_total         :: number of Game objects to create
+        --- error               :: the exception that made the job fail
+        --- created             :: date and time in which the job was queued (in UTC timezone)
+        --- started             :: date and time in which a worker picked the job up
+        --- finished            :: date and time in which the job completed, was cancelled or failed
+
+    METHODS
+        --- queue               :: queues the generation of a newly created game session
+        --- claim               :: (run_jobs) marks the oldest queued job as running and returns it (None if there is
+                                   none); two workers never claim the same job
+        --- run                 :: (run_jobs) generates the session, reporting progress
+        --- progress            :: saves and announces the numbers of players and games created (at most every
+                                   PROGRESS_SECONDS, and once every player is created); raises Job.Cancelled once
+                                   the job was cancelled
+        --- cancel              :: cancels a queued job at once, or asks the worker to stop a running job
+        --- announce            :: sends the job's status to the moderators watching it
+"""
+
+
+class Job(models.Model):
+
+    class Status:
+        QUEUED = 'Queued'
+        RUNNING = 'Running'
+        COMPLETED = 'Completed'
+        CANCELLED = 'Cancelled'
+        FAILED = 'Failed'
+
+    STATUS_CHOICES = [
+        (Status.QUEUED, "Queued"),
+        (Status.RUNNING, "Running"),
+        (Status.COMPLETED, "Completed"),
+        (Status.CANCELLED, "Cancelled"),
+        (Status.FAILED, "Failed")
+    ]
+
+    PROGRESS_SECONDS = 0.5
+
+    class Cancelled(Exception):
+        pass
+
+    group = models.ForeignKey('wga.Group', null=True, on_delete=models.SET_NULL, related_name='jobs')
+    name = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=Status.QUEUED)
+    cancelled = models.BooleanField(default=False)
+    players = models.PositiveIntegerField(default=0)
+    players_total = models.PositiveIntegerField(default=0)
+    games = models.PositiveIntegerField(default=0)
+    games_total = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    @staticmethod
+    def queue(group):
+        return Job.objects.create(
+            group=group,
+            name=group.name,
+            players_total=group.num_users,
+            games_total=group.num_users * group.num_games // 2
+        )
+
+    @staticmethod
+    def claim():
+        while True:
+            job = Job.objects.filter(status=Job.Status.QUEUED, cancelled=False).order_by('id').first()
+            if job is None:
+                return None
+            now = timezone.now()
+            if Job.objects.filter(id=job.id, status=Job.Status.QUEUED, cancelled=False).update(
+                status=Job.Status.RUNNING, started=now
+            ):
+                (job.status, job.started) = (Job.Status.RUNNING, now)
+                return job
+
+    def run(self):
+        self.announce()
+        try:
+            self.group.generate_games(progress=self.progress)
+            self.status = Job.Status.COMPLETED
+        except Job.Cancelled:
+            self.group.discard()
+            self.status = Job.Status.CANCELLED
+            WGA_ADMIN_LOGGER.info(f"Job {self.id}: cancelled the generation of {self.name}")
+        except Exception as exception:
+            WGA_ADMIN_LOGGER.exception(f"Job {self.id}: failed to generate {self.name}")
+            self.group.discard()
+            (self.status, self.error) = (Job.Status.FAILED, f"{type(exception).__name__}: {exception}")
+        self.finished = timezone.now()
+        Job.objects.filter(id=self.id).update(
+            status=self.status, players=self.players, games=self.games, error=self.error, finished=self.finished
+        )
+        self.announce()
+
+    def progress(self, players=None, games=None):
+        self.players = self.players if players is None else players
+        self.games = self.games if games is None else games
+        now = time.monotonic()
+        if now - getattr(self, '_reported', 0) < Job.PROGRESS_SECONDS and players != self.players_total:
+            return
+        self._reported = now
+        if not Job.objects.filter(id=self.id, cancelled=False).update(players=self.players, games=self.games):
+            raise Job.Cancelled(f"Job {self.id} was cancelled.")
+        self.announce()
+
+    def cancel(self):
+        now = timezone.now()
+        if Job.objects.filter(id=self.id, status=Job.Status.QUEUED).update(
+            status=Job.Status.CANCELLED, cancelled=True, finished=now
+        ):
+            if self.group is not None:  # no worker has touched the session yet
+                self.group.discard()
+            (self.status, self.cancelled, self.finished) = (Job.Status.CANCELLED, True, now)
+        elif Job.objects.filter(id=self.id, status=Job.Status.RUNNING).update(cancelled=True):
+            self.cancelled = True
+        else:
+            return False
+        self.announce()
+        return True
+
+    def channel_group(self):
+        return f"moderator-job-{self.id}"
+
+    def as_dict(self):
+        return {
+            'job': self.id,
+            'name': self.name,
+            'status': self.status,
+            'cancelled': self.cancelled,
+            'players': self.players,
+            'players_total': self.players_total,
+            'games': self.games,
+            'games_total': self.games_total,
+            'error': self.error
+        }
+
+    def announce(self):
+        async_to_sync(get_channel_layer().group_send)(self.channel_group(), dict(self.as_dict(), type='job.progress'))
+
+    def __str__(self):
+        return f"{self.status} job {self.id}: {self.name}"
+
+
+########################################################################################################################
@@ -0,0 +1,107 @@
+"""
+    WG-A Game Replay
+
+    This file rebuilds games from their moves' events (Move.event, see engine.py) instead of reading the games' current
+    rows: the first event of a game carries a snapshot of its starting state, and every following event is applied to it
+    with engine.replay(). A move recorded without an event must be a step derived from the previous move's event (two
+    consecutive passes also end the game); any other move was saved before events were recorded, and its game cannot be
+    replayed (ReplayError).
+
+    --- timeline                :: yields (move id, move code, state after the move) for every move of a game
+    --- state_at                :: the game's state after its n-th move (or after its last move)
+    --- replay_games            :: the final states of many games, read with a single query
+    --- replay_session          :: the final states of every game of a session (Group)
+    --- audit                   :: compares a replayed state with the game's saved state
+
+    Moves are read as (game, id, code, event) tuples, without loading the Move objects or their texts:
+
+        state = replay.state_at(game, 4)
+        states = replay.replay_session(group)
+"""
+
+import json
+
+from wga import engine
+from wga import models
+
+
+MOVE_FIELDS = ('game_id', 'id', 'code', 'event')
+
+
+class ReplayError(Exception):
+    pass
+
+
+########################################################################################################################
+
+
+"""
+    Replay FUNCTIONS
+"""
+
+
+def timeline(game):
+    rows = models.Move.objects.filter(game=game).order_by('date', 'id').values_list(*MOVE_FIELDS)
+    yield from _replay(game.id, rows.iterator())
+
+
+def state_at(game, move=None):
+    state = None
+    for (n, (_, _, after)) in enumerate(timeline(game), start=1):
+        state = after
+        if n == move:
+            return state
+    if move is not None:
+        raise ReplayError(f"Game {game.id} has fewer than {move} moves.")
+    return state or engine.State()
+
+
+def replay_games(game_ids):
+    rows = models.Move.objects.filter(game_id__in=game_ids).order_by('game_id', 'date', 'id').values_list(*MOVE_FIELDS)
+    states = {game_id: None for game_id in game_ids}
+    (current, game_rows) = (None, [])
+    for row in rows.iterator():
+        if row[0] != current and game_rows:
+            states[current] = _final(current, game_rows)
+            game_rows = []
+        current = row[0]
+        game_rows.append(row)
+    if game_rows:
+        states[current] = _final(current, game_rows)
+    return states
+
+
+def replay_session(group):
+    return replay_games(list(group.game_set.values_list('id', flat=True)))
+
+
+def audit(game, state):
+    expected = game.get_state()
+    return [(slot, getattr(expected, slot), getattr(state, slot))
+            for slot in engine.State.__slots__ if getattr(expected, slot) != getattr(state, slot)]
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+
+
+def _final(game_id, rows):
+    state = None
+    for (_, _, state) in _replay(game_id, rows, copy=False):
+        pass
+    return state
+
+
+def _replay(game_id, rows, copy=True):
+    state = engine.State()
+    derived = []  # the codes of the steps of the last event still expected as moves
+    for (_, move_id, code, event) in rows:
+        if event:
+            try:
+                steps = engine.replay(state, json.loads(event)).steps
+            except (engine.IllegalMove, KeyError, ValueError) as exception:
+                raise ReplayError(f"Game {game_id}: move {move_id} cannot be replayed ({exception}).")
+            derived = [step.code for step in steps]
+        if not derived or derived[0] != code:
+            raise ReplayError(f"Game {game_id}: move {move_id} ({code}) was not recorded with an event.")
+        derived.pop(0)
+        yield (move_id, code, state.copy() if copy else state)
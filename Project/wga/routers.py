@@ -0,0 +1,130 @@
+"""
+    WG-A Database Router
+
+    This file contains the database router sending read-only moderator and export traffic to a read replica, so heavy
+    reads (group pages, report queue, session downloads) do not compete with players' moves for the primary database.
+    Reads are only sent to the replica inside a use_replica() block (see ReplicaReadMixin in assets_admin/views.py);
+    every write, and every other read (including all game-state reads), goes to the primary ('default') database.
+
+    The replica is used only if WGA_REPLICA_DATABASE names a database alias in DATABASES and the replica is at most
+    WGA_REPLICA_MAX_LAG seconds behind the primary. Replication lag is measured at most once every
+    WGA_REPLICA_LAG_INTERVAL seconds per process, by one thread at a time: the other threads keep using the previous
+    measurement meanwhile, so a slow replica never holds up routing. If it cannot be measured, reads fall back to the
+    primary.
+
+    DOCUMENTATION
+    https://docs.djangoproject.com/en/2.2/topics/db/multi-db/
+    https://www.postgresql.org/docs/current/functions-admin.html#FUNCTIONS-RECOVERY-CONTROL
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+
+
+WGA_ADMIN_LOGGER = logging.getLogger('django.moderator')
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_STATE = threading.local()
+_LAG = {'checked': None, 'seconds': None}
+_LAG_LOCK = threading.Lock()
+
+
+########################################################################################################################
+
+
+"""
+    Replica HELPER FUNCTIONS
+
+    --- use_replica             :: context manager sending the current thread's reads to the replica
+    --- replica_alias           :: the replica's database alias (None if no replica is configured)
+    --- replication_lag         :: measures how many seconds the replica is behind (None if it cannot be measured)
+    --- replica_lag             :: the latest measurement (measured again every WGA_REPLICA_LAG_INTERVAL seconds)
+"""
+
+
+@contextmanager
+def use_replica():
+    previous = getattr(_STATE, 'replica', False)
+    _STATE.replica = True
+    try:
+        yield
+    finally:
+        _STATE.replica = previous
+
+
+def replica_alias():
+    alias = getattr(settings, 'WGA_REPLICA_DATABASE', None)
+    return alias if alias and alias != 'default' and alias in settings.DATABASES else None
+
+
+def replication_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql' or _same_database(connection, connections['default']):
+        return 0.0  # a test mirror or a local database standing in for the replica: nothing to replicate
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0] or 0.0)
+    except DatabaseError as e:
+        WGA_ADMIN_LOGGER.warning(f"Could not measure the replication lag of \"{alias}\": {e}")
+        return None
+
+
+def _same_database(connection, other):
+    keys = ('ENGINE', 'NAME', 'HOST', 'PORT')
+    return all(connection.settings_dict.get(key) == other.settings_dict.get(key) for key in keys)
+
+
+def replica_lag(alias):
+    now = time.monotonic()
+    with _LAG_LOCK:
+        if _LAG['checked'] is not None and now - _LAG['checked'] < getattr(settings, 'WGA_REPLICA_LAG_INTERVAL', 10):
+            return _LAG['seconds']
+        _LAG['checked'] = now  # this thread measures; the others return the previous measurement meanwhile
+    seconds = replication_lag(alias)  # outside the lock: it is a round trip to the replica
+    with _LAG_LOCK:
+        _LAG['seconds'] = seconds
+    return seconds
+
+
+########################################################################################################################
+
+
+"""
+    Replica ROUTER
+
+    Listed in DATABASE_ROUTERS (settings.py). The replica is never migrated: it receives the schema from the primary.
+"""
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if getattr(_STATE, 'replica', False):
+            alias = replica_alias()
+            if alias:
+                lag = replica_lag(alias)
+                if lag is not None and lag <= getattr(settings, 'WGA_REPLICA_MAX_LAG', 30):
+                    return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == replica_alias() else None
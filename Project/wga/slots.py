@@ -0,0 +1,88 @@
+"""
+    WG-A Game Slot Cache
+
+    This file contains the in-process cache resolving a game slot's key (Intermediary.key, the url_key of the players'
+    game pages and WebSockets) to what the consumers need to know about the slot, so GameConsumer does not join
+    Intermediary, User, Group and Game on every event: the slot is resolved with one query when its WebSocket connects,
+    and read from memory afterwards.
+
+    --- Slot                    :: (intermediary id, user key, group name, game id, role, case) of a game slot
+    --- resolve                 :: the game slot of a key (None if there is no such slot), cached
+    --- forget                  :: drops the cached slots of some keys (or of a whole game session) in this process
+    --- invalidate              :: drops them in every process: the event is sent to the session's channel group, which
+                                   every GameConsumer of the session has joined, as has every NavBarConsumer of its game
+                                   pages (see GameConsumer.slots_invalidate and NavBarConsumer.slots_invalidate)
+
+    Each Daphne process keeps at most WGA_SLOT_CACHE_SIZE slots, least recently used first out, for at most
+    WGA_SLOT_CACHE_SECONDS. Reassigning a game slot (IntermediaryUpdateView) or shuffling a session's games
+    (ShuffleGamesForm) must call invalidate() before telling the players' interfaces to update; changes made elsewhere
+    (e.g. in the Django admin) are picked up once the entries expire.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from wga import models
+
+
+Slot = namedtuple('Slot', ['intermediary_id', 'user_key', 'group_name', 'game_id', 'role', 'case'])
+
+_SLOTS = OrderedDict()  # key -> (expiry, Slot), least recently used first
+_LOCK = threading.Lock()
+
+
+########################################################################################################################
+
+
+"""
+    Slot Cache FUNCTIONS
+"""
+
+
+def resolve(key):
+    now = time.monotonic()
+    with _LOCK:
+        entry = _SLOTS.get(key)
+        if entry is not None and entry[0] > now:
+            _SLOTS.move_to_end(key)
+            return entry[1]
+
+    row = models.Intermediary.objects.filter(key=key).values_list(
+        'id', 'user__key', 'user__group__name', 'advocacy__id', 'criticism__id', 'role', 'user__group__case'
+    ).first()
+    if row is None:
+        return None
+    (intermediary_id, user_key, group_name, advocacy, criticism, role, case) = row
+    slot = Slot(intermediary_id, user_key, group_name, advocacy or criticism, role, case)
+
+    with _LOCK:
+        _SLOTS[key] = (now + settings.WGA_SLOT_CACHE_SECONDS, slot)
+        _SLOTS.move_to_end(key)
+        while len(_SLOTS) > settings.WGA_SLOT_CACHE_SIZE:
+            _SLOTS.popitem(last=False)
+    return slot
+
+
+def forget(keys=None, group_name=None):
+    with _LOCK:
+        if keys is not None:
+            for key in keys:
+                _SLOTS.pop(key, None)
+        if group_name is not None:
+            for key in [key for (key, (_, slot)) in _SLOTS.items() if slot.group_name == group_name]:
+                del _SLOTS[key]
+
+
+def invalidate(group_name, keys=None):
+    forget(keys=keys, group_name=None if keys is not None else group_name)
+    if group_name:
+        async_to_sync(get_channel_layer().group_send)(group_name, {
+            'type': 'slots.invalidate',
+            'group': group_name,
+            'keys': list(keys) if keys is not None else None
+        })
@@ -4,13 +4,22 @@ $(document).ready(function() {
     // SEND WARNINGS                                                                                                  //
     //----------------------------------------------------------------------------------------------------------------//
 
+    // maps each player's ID to the IDs of the scenarios they have played (see Group.get_played)
+    var played = JSON.parse($("#played-scenarios").text());
+
+    function HasPlayed(user, scenario) {
+        return Boolean(user && scenario && played.hasOwnProperty(user) && played[user].indexOf(Number(scenario)) !== -1);
+    }
+
     function SendWarnings() {
-        $.post("./check", $("#admin-form").serialize(), function(data) {
-            if (data['adv'] && data['crt']) $("#warnings").html("<div class=\"alert alert-warning\"> Both Advocate and Critic have already played the scenario.</div>");
-            else if (data['adv'])           $("#warnings").html("<div class=\"alert alert-warning\"> Advocate has already played the scenario.</div>");
-            else if (data['crt'])           $("#warnings").html("<div class=\"alert alert-warning\"> Critic has already played the scenario.</div>");
-            else                            $("#warnings").html("");
-        });
+        var data = {
+            'adv': HasPlayed($("#id_advocate").val(), $("#id_scenario").val()),
+            'crt': HasPlayed($("#id_critic").val(), $("#id_scenario").val())
+        };
+        if (data['adv'] && data['crt']) $("#warnings").html("<div class=\"alert alert-warning\"> Both Advocate and Critic have already played the scenario.</div>");
+        else if (data['adv'])           $("#warnings").html("<div class=\"alert alert-warning\"> Advocate has already played the scenario.</div>");
+        else if (data['crt'])           $("#warnings").html("<div class=\"alert alert-warning\"> Critic has already played the scenario.</div>");
+        else                            $("#warnings").html("");
     }
 
     $("#id_scenario").change(SendWarnings);
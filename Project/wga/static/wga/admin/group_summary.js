@@ -0,0 +1,16 @@
+$(document).ready(function() {
+
+    //----------------------------------------------------------------------------------------------------------------//
+    // SESSION SUMMARY                                                                                                //
+    //----------------------------------------------------------------------------------------------------------------//
+
+    var summary = $("#group-summary");
+
+    function UpdateSummary() {
+        $.getJSON(summary.attr('data-url'), function(data) {
+            $.each(data, function(counter, value) { summary.find("[data-counter='" + counter + "']").text(value); });
+        });
+    }
+    setInterval(UpdateSummary, 1000);
+
+});
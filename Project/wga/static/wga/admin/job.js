@@ -0,0 +1,34 @@
+$(document).ready(function() {
+
+    //----------------------------------------------------------------------------------------------------------------//
+    // WEB SOCKETS                                                                                                    //
+    //----------------------------------------------------------------------------------------------------------------//
+
+    var job = $("#job").attr('data-job');
+    var socket = new ReconnectingWebSocket('ws://' + window.location.host + '/ws' + '/wganalogy_app/moderator/jobs/' + job);
+
+    socket.onmessage = function(e) {
+        var data = JSON.parse(e.data);
+        if (data.hasOwnProperty('status'))                  UpdateJob(data);
+    };
+
+    function UpdateJob(data) {
+        var running = data['status'] === 'Queued' || data['status'] === 'Running';
+        $("#job-status").text(data['status'] + (running && data['cancelled'] ? " (cancelling)" : ""));
+        $("#job-players").text(data['players']);
+        $("#job-games").text(data['games']);
+        $("#job-players-bar").css('width', Percent(data['players'], data['players_total']));
+        $("#job-games-bar").css('width', Percent(data['games'], data['games_total']));
+        $("#job-error").text(data['error']);
+        if (!running || data['cancelled']) $("#job-cancel").hide();
+        if (data.hasOwnProperty('url')) {
+            $("#job-link").attr('href', data['url']);
+            $("#job-done").show();
+        }
+    }
+
+    function Percent(count, total) {
+        return (total ? Math.round(100 * count / total) : 0) + "%";
+    }
+
+});
@@ -0,0 +1,35 @@
+$(document).ready(function() {
+
+    //----------------------------------------------------------------------------------------------------------------//
+    // WEB SOCKETS                                                                                                    //
+    //----------------------------------------------------------------------------------------------------------------//
+
+    var socket = new ReconnectingWebSocket('ws://' + window.location.host + '/ws' + '/wganalogy_app/moderator/reports');
+
+    socket.onmessage = function(e) {
+        var data = JSON.parse(e.data);
+        if (data.hasOwnProperty('html-report'))             AddReport(data);
+        else if (data.hasOwnProperty('resolved'))           ResolveReport(data);
+        else if (data.hasOwnProperty('stalled'))            AlertStalled(data);
+    };
+
+    function AddReport(data) {
+        var queue = $("#report-queue");
+        if (queue.attr('data-status') === 'resolved') return;
+        if (queue.attr('data-group') && queue.attr('data-group') !== data['group']) return;
+        if ($("#report-" + data['report']).length === 0) $("#report-queue tbody").prepend(data['html-report']);
+        $("#report-alerts").html("<div class=\"alert alert-warning\"> New report #" + data['report'] + " submitted.</div>");
+    }
+
+    function AlertStalled(data) {
+        var queue = $("#report-queue");
+        if (queue.attr('data-group') && queue.attr('data-group') !== data['group']) return;
+        var alert = $("<div class=\"alert alert-info\"></div>").text("Game #" + data['stalled'] + " in " + data['group'] + ": " + data['text'] + " ");
+        $("#report-alerts").append(alert.append($("<a></a>").attr('href', data['url']).text("View games")));
+    }
+
+    function ResolveReport(data) {
+        if ($("#report-queue").attr('data-status') === 'unresolved') $("#report-" + data['resolved']).remove();
+    }
+
+});
@@ -0,0 +1,3 @@
+// Static files are fingerprinted (see wga/bundles.py), so $.getScript() may use the browser's cache instead of adding
+// a cache-busting query string to every page script it loads.
+$.ajaxSetup({cache: true});
@@ -6,27 +6,63 @@ $(document).ready(function() {
 
     var socket = new ReconnectingWebSocket('ws://' + window.location.host + '/ws' + window.location.pathname);
 
+    socket.onopen = function(e) {
+        // ask only for the messages sent after the newest one already shown
+        socket.send(JSON.stringify({'messages_since': $("#message-list .message").last().attr('data-date') || null}));
+    };
+
     socket.onmessage = function(e) {
         var data = JSON.parse(e.data);
         if (data.hasOwnProperty('html-interface'))          UpdateInterface(data);
         else if (data.hasOwnProperty('message'))            UpdateMessages(data);
+        else if (data.hasOwnProperty('conflict'))           ShowConflict(data);
+        else if (data.hasOwnProperty('history'))            PrependHistory(data);
+        else if (data.hasOwnProperty('ack'))                Acknowledge(data);
     };
 
     function AddSubmitListener() {
+        // every submission of this form (e.g. again after a reconnect) carries the same id, so it is processed once
+        var moveId = Date.now().toString(36) + Math.random().toString(36).slice(2);
         $("#move-form").submit(function(e) {
             e.preventDefault();
-            socket.send(JSON.stringify($("#move-form").serializeObject()));
+            var move = $("#move-form").serializeObject();
+            move['move_id'] = moveId;
+            socket.send(JSON.stringify(move));
         });
     }
     AddSubmitListener();
 
+    // the move history only holds the latest moves; older ones are asked for one window at a time
+    $(document).on('click', "#load-older-moves", function(e) {
+        e.preventDefault();
+        socket.send(JSON.stringify({'history_before': $(this).attr('data-before')}));
+    });
+
     function UpdateInterface(data) {
+        var messages = $("#message-list").html();  // interface updates do not resend messages
         $("#game-interface").html(data['html-interface']);
+        $("#message-list").html(messages);
         AddSubmitListener();
     }
 
     function UpdateMessages(data) {
-        $("#message-list").append("<li class=\"message\">" + data['message'] + "</li>");
+        if (data['date'] && $("#message-list .message[data-date='" + data['date'] + "']").length) return;
+        $("#message-list").append($("<li class=\"message\"></li>").attr('data-date', data['date']).text(data['message']));
+    }
+
+    function PrependHistory(data) {
+        var items = $.map(data['history'], function(move) { return $("<li></li>").text(move['role'] + " " + move['text']); });
+        $("#move-history-list").prepend(items);
+        if (data['older'] && data['history'].length) $("#load-older-moves").attr('data-before', data['history'][0]['id']);
+        else $("#load-older-moves").remove();
+    }
+
+    function ShowConflict(data) {
+        $("#game-interface").prepend($("<div class=\"alert alert-warning\"></div>").text(data['conflict']));
+    }
+
+    function Acknowledge(data) {
+        if (data['status'] === 'duplicate') $("#game-interface").prepend($("<div class=\"alert alert-info\"></div>").text(data['notice']));
     }
 
     function RecordTime() { var d = new Date(); return d.getTime(); }
@@ -0,0 +1,27 @@
+"""
+    WG-A Bundle Template Tags
+
+    {% bundle 'base' 'css' %} renders the <link> (or <script>) tag of a static bundle (see wga/bundles.py). When DEBUG
+    is on, it renders one tag per file of the bundle instead, since the bundles are only built by collectstatic.
+"""
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from wga.bundles import BUNDLES, bundle_path
+
+
+register = template.Library()
+
+TAGS = {
+    'css': '<link rel="stylesheet" type="text/css" href="{}">',
+    'js': '<script src="{}"></script>'
+}
+
+
+@register.simple_tag
+def bundle(name, kind):
+    files = BUNDLES[name][kind] if settings.DEBUG else [bundle_path(name, kind)]
+    return format_html_join('\n    ', TAGS[kind], ((static(file),) for file in files))
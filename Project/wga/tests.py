@@ -0,0 +1,1254 @@
+"""
+    WG-A Tests
+
+    This file contains the tests of the WG-A application. Run them from the Project directory with:
+
+        python manage.py test wga
+
+    Each section below covers one part of the application; the consumer tests run the Django Channels consumers in
+    process through channels.testing.WebsocketCommunicator.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import posixpath
+import re
+import tempfile
+import threading
+import uuid
+from types import SimpleNamespace
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command, CommandError
+from django.db import connection, DatabaseError
+from django.forms.models import model_to_dict
+from django.template import Context, Template, engines, loader
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from django_project import routing
+from wga import bundles
+from wga import engine
+from wga import journal
+from wga import log_handlers
+from wga import metrics
+from wga import models
+from wga import replay
+from wga import routers
+from wga import slots
+from wga.assets_admin import consumers as moderator_consumers
+from wga.assets_admin import forms as moderator_forms
+from wga.assets_admin import views as moderator_views
+from wga.assets_user import consumers
+from wga.assets_user import forms as player_forms
+from wga.assets_user import views as player_views
+from wga.management.commands import _sessions
+from wga.management.commands import benchmark_player_sessions
+from wga.management.commands import benchmark_sessions
+from wga.management.commands import benchmark_templates
+from wga.management.commands import sweep_stalled_games
+
+
+
+########################################################################################################################
+
+
+"""
+    Metrics TESTS
+"""
+
+
+@override_settings(WGA_METRICS=True, WGA_METRICS_TOKEN='s3cret')
+class MetricsViewTests(TestCase):
+
+    def test_anonymous_requests_are_refused(self):
+        # Behind nginx every request comes from 127.0.0.1, so the address must not grant access.
+        response = self.client.get(reverse('moderator:metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    def test_wrong_token_is_refused(self):
+        response = self.client.get(reverse('moderator:metrics'), HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_is_accepted(self):
+        response = self.client.get(reverse('moderator:metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE wga_handler_latency_seconds histogram', response.content.decode())
+
+    def test_staff_is_accepted(self):
+        self.client.force_login(AuthUser.objects.create_user('moderator', is_staff=True))
+        self.assertEqual(self.client.get(reverse('moderator:metrics')).status_code, 200)
+
+    @override_settings(WGA_METRICS_TOKEN=None)
+    def test_no_token_configured(self):
+        response = self.client.get(reverse('moderator:metrics'), HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(WGA_METRICS=True, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class RenderTimeTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.client.force_login(AuthUser.objects.create_user('moderator', is_staff=True))
+
+    def test_template_response_is_timed(self):
+        self.assertEqual(self.client.get(reverse('moderator:list-of-groups')).status_code, 200)
+        self.assertGreater(metrics.REGISTRY['GroupListView']['render_time'].sum, 0)
+
+    def test_response_rendered_in_the_view_is_timed(self):
+        # ReplicaReadMixin renders the response inside dispatch(), before the middleware sees it.
+        self.assertEqual(self.client.get(reverse('moderator:list-of-reports')).status_code, 200)
+        self.assertGreater(metrics.REGISTRY['ReportListView']['render_time'].sum, 0)
+
+    def test_consumer_handler_queries_are_counted(self):
+        @metrics.instrument('Tests.handler')
+        def handler():
+            return (models.Group.objects.count(), models.Game.objects.count())
+
+        handler()
+        histograms = metrics.REGISTRY['Tests.handler']
+        self.assertEqual((histograms['queries'].count, histograms['queries'].sum), (1, 2))
+        self.assertIn('wga_handler_queries_sum{handler="Tests.handler"} 2', metrics.exposition())
+
+    def test_nested_rendering_is_counted_once(self):
+        with metrics.measure('nested') as sample:
+            with metrics.rendering():
+                metrics.render_to_string('wga/user/container/links.html', {})
+                inner = sample.render_time
+        self.assertEqual(inner, 0)
+        self.assertLessEqual(sample.render_time, sample.latency)
+
+
+########################################################################################################################
+
+
+"""
+    Game Session HELPERS
+
+    SessionTestCase creates a game session of two players and one game (see management/commands/_sessions.py) for each
+    test. It is a TransactionTestCase since the synchronous consumers run in another thread, whose database connection
+    does not see the objects of an uncommitted test transaction. Pages are rendered with the plain static files storage,
+    as the tests do not run collectstatic. play() makes the given number of moves through the players' move forms.
+"""
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SessionTestCase(TransactionTestCase):
+
+    def setUp(self):
+        async_to_sync(get_channel_layer().flush)()  # drops the channels a previous test left in the session's groups
+        self.scenarios = _sessions.create_scenarios('tests', 2)
+        self.group = _sessions.create_session('tests', 2, 1, self.scenarios)
+        self.game = self.group.game_set.get()
+
+    def tearDown(self):
+        slots.forget(group_name=self.group.name)
+        _sessions.delete_session(self.group, self.scenarios)
+
+    def reload(self):
+        return models.Game.objects.get(id=self.game.id)
+
+    def play(self, moves):
+        keys = {False: self.game.adv_info.key, True: self.game.crt_info.key}
+        for _ in range(moves):
+            (is_critic, payload) = _sessions.next_move(self.game.id, target=moves)
+            data = player_views.find_game_data(url_key=keys[is_critic], with_messages=False)
+            form = player_forms.build_form(payload, user=data['user'], game=data['game'], is_critic=is_critic)
+            self.assertTrue(form.is_valid(), form.errors)
+            form.process()
+
+
+async def connect(intermediary):
+    communicator = WebsocketCommunicator(consumers.GameConsumer, f'/ws/wganalogy_app/user/{intermediary.key}/')
+    communicator.scope['session'] = {'user_identifier': intermediary.user.key}
+    communicator.scope['url_route'] = {'args': (), 'kwargs': {'url_key': intermediary.key}}
+    (connected, _) = await communicator.connect()
+    assert connected
+    return communicator
+
+
+async def acks(communicator):
+    result = []
+    while not await communicator.receive_nothing(timeout=0.2):
+        message = await communicator.receive_json_from()
+        if 'ack' in message:
+            result.append(message['status'])
+    return result
+
+
+########################################################################################################################
+
+
+"""
+    Add Game TESTS
+"""
+
+
+class PlayedScenariosTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        (self.advocate, self.critic) = (self.game.adv_info.user, self.game.crt_info.user)
+        self.other = next(scenario for scenario in self.scenarios if scenario.id != self.game.scenario_id)
+
+    def test_matrix_maps_each_player_to_their_scenarios(self):
+        played = self.group.get_played()
+        self.assertEqual(played, {str(self.advocate.id): [self.game.scenario_id],
+                                  str(self.critic.id): [self.game.scenario_id]})
+
+    def test_new_game_refreshes_the_matrix(self):
+        self.group.get_played()
+        self.group.add_game(self.other, self.critic, self.advocate)
+        group = models.Group.objects.get(id=self.group.id)
+        with self.assertNumQueries(1):
+            played = group.get_played()
+        self.assertEqual(played[str(self.advocate.id)], sorted([self.game.scenario_id, self.other.id]))
+        with self.assertNumQueries(0):
+            self.group.get_played()
+
+    def test_check_view_answers_from_the_matrix(self):
+        self.client.force_login(AuthUser.objects.create_user('moderator', is_staff=True))
+        url = reverse('moderator:group-add-check', kwargs={'group_name': self.group.name})
+        response = self.client.post(url, {'scenario': self.game.scenario_id, 'advocate': self.advocate.id,
+                                          'critic': self.critic.id})
+        self.assertEqual(response.json(), {'adv': True, 'crt': True})
+        response = self.client.post(url, {'scenario': self.other.id, 'advocate': self.advocate.id})
+        self.assertEqual(response.json(), {'adv': False, 'crt': False})
+
+
+########################################################################################################################
+
+
+"""
+    Player Session TESTS
+"""
+
+
+class PlayerSessionTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.player = self.game.adv_info.user
+        response = self.client.post(reverse('user:login'), {'name': self.player.name, 'key': self.player.key})
+        self.assertEqual(self.client.session['user_identifier'], self.player.key, response)
+
+    def test_pages_read_the_session_from_the_cache(self):
+        for url in [reverse('user:faq'), reverse('user:game', kwargs={'url_key': self.game.adv_info.key})]:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertFalse([query for query in queries if 'django_session' in query['sql']], url)
+
+    def test_websocket_handshake_reads_the_session(self):
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}".encode()
+
+        async def main():
+            communicator = WebsocketCommunicator(routing.application, '/ws/wganalogy_app/nav',
+                                                 headers=[(b'cookie', cookie), (b'origin', b'http://testserver')])
+            (connected, _) = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+
+        self.assertTrue(async_to_sync(main)())
+
+    def test_benchmark_measures_each_request(self):
+        result = benchmark_player_sessions.Command()._run('cache', {'players': 2, 'pages': 1})
+        self.assertEqual([result[request]['count'] for request in benchmark_player_sessions.REQUESTS], [2, 2, 2])
+
+
+########################################################################################################################
+
+
+"""
+    Messaging TESTS
+"""
+
+
+class BulkMessageTests(SessionTestCase):
+
+    def send(self, **data):
+        self.client.force_login(AuthUser.objects.get_or_create(username='moderator', is_staff=True)[0])
+        data = {'text': "Hurry up", 'role': 'any', 'turn': 'any', 'idle': '', **data}
+        return self.client.post(reverse('moderator:messages-bulk', kwargs={'group_name': self.group.name}), data)
+
+    def recipients(self):
+        return sorted(models.Delivery.objects.filter(message__text="[MESSAGE] Hurry up").values_list(
+            'intermediary_id', flat=True
+        ))
+
+    def test_players_whose_turn_it_is(self):
+        self.assertEqual(self.reload().turn, models.Game.Turn.ADVOCATE)
+        response = self.send(turn='turn')
+        self.assertTrue(response['Location'].endswith('?sent=1'))
+        self.assertEqual(self.recipients(), [self.game.adv_info.id])
+        self.assertEqual(list(self.game.adv_info.messages.values_list('text', flat=True)), ["[MESSAGE] Hurry up"])
+
+    def test_players_by_role_and_idle_time(self):
+        self.send(role='critic', turn='waiting')
+        self.assertEqual(self.recipients(), [self.game.crt_info.id])
+        models.Delivery.objects.all().delete()
+        self.send(idle=5)  # the session has just started, so nobody has been idle that long
+        self.assertEqual(self.recipients(), [])
+
+    def test_connected_player_receives_the_message(self):
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            try:
+                await database_sync_to_async(self.send)(role='advocate')
+                return await communicator.receive_json_from()
+            finally:
+                await communicator.disconnect()
+
+        self.assertEqual(async_to_sync(main)()['message'], "[MESSAGE] Hurry up")
+
+
+class InboxTests(SessionTestCase):
+
+    def send(self, text, to):
+        form = moderator_forms.SendMessageForm({'text': text}, object=to)
+        self.assertTrue(form.is_valid())
+        return form.save()
+
+    def test_announcement_reaches_every_slot_including_later_ones(self):
+        self.send("Welcome", self.group)
+        (advocate, critic) = (self.game.adv_info.user, self.game.crt_info.user)
+        later = self.group.add_game(self.scenarios[1], critic, advocate)
+        for intermediary in [self.game.adv_info, self.game.crt_info, later.adv_info, later.crt_info]:
+            self.assertEqual(list(intermediary.deliveries.values_list('message__text', flat=True)),
+                             ["[ANNOUNCEMENT] Welcome"])
+
+    def test_reconnecting_player_is_sent_only_the_newer_messages(self):
+        seen = self.send("Seen", self.game.adv_info)
+        seen_at = seen.date - datetime.timedelta(minutes=1)
+        models.Delivery.objects.filter(message=seen).update(date=seen_at)
+        self.send("Missed", self.game.adv_info)
+
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            try:
+                await communicator.send_json_to({'messages_since': seen_at.isoformat()})
+                messages = []
+                while not await communicator.receive_nothing(timeout=0.2):
+                    messages.append((await communicator.receive_json_from())['message'])
+                return messages
+            finally:
+                await communicator.disconnect()
+
+        self.assertEqual(async_to_sync(main)(), ["[MESSAGE] Missed"])
+
+
+########################################################################################################################
+
+
+"""
+    Game Consumer TESTS
+"""
+
+
+class MoveIdTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.move = {'antecedent': 'IF x', 'consequent': 'then y', 'move_id': uuid.uuid4().hex}
+
+    def send(self, move):
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            await communicator.send_json_to(move)
+            try:
+                return await acks(communicator)
+            finally:
+                await communicator.disconnect()
+        return async_to_sync(main)()
+
+    def test_resent_move_is_committed_once(self):
+        self.assertEqual(self.send(self.move), [consumers.Ack.COMMITTED])
+        self.assertEqual(self.send(self.move), [consumers.Ack.DUPLICATE])
+        self.assertEqual(self.game.move_set.count(), 1)
+
+    def test_failed_move_can_be_resent(self):
+        with mock.patch.object(models.Game, 'commit_move', side_effect=DatabaseError("connection lost")):
+            with self.assertRaises(DatabaseError):
+                self.send(self.move)
+        self.assertEqual(self.game.move_set.count(), 0)
+        self.assertEqual(self.send(self.move), [consumers.Ack.COMMITTED])
+        self.assertEqual(self.game.move_set.count(), 1)
+
+
+class ConflictTests(SessionTestCase):
+
+    def send(self, move_id):
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            await communicator.send_json_to({'antecedent': 'IF x', 'consequent': 'then y', 'move_id': move_id})
+            try:
+                return await acks(communicator)
+            finally:
+                await communicator.disconnect()
+        return async_to_sync(main)()
+
+    def test_stale_game_cannot_claim_a_version(self):
+        (first, second) = (self.reload(), self.reload())
+        first.claim_version()
+        with self.assertRaises(models.Game.Conflict):
+            second.claim_version()
+        self.assertEqual(self.reload().version, self.game.version + 1)
+
+    def test_move_on_an_outdated_game_is_resynced(self):
+        move_id = uuid.uuid4().hex
+        claim_version = models.Game.claim_version
+
+        def claimed_meanwhile(game):
+            # Another move claims the game between this move being loaded and committed.
+            models.Game.objects.filter(id=game.id).update(version=game.version + 1)
+            return claim_version(game)
+
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            try:
+                await communicator.send_json_to({'antecedent': 'IF x', 'consequent': 'then y', 'move_id': move_id})
+                messages = []
+                while not await communicator.receive_nothing(timeout=0.2):
+                    messages.append(await communicator.receive_json_from())
+                return messages
+            finally:
+                await communicator.disconnect()
+
+        with mock.patch.object(models.Game, 'claim_version', autospec=True, side_effect=claimed_meanwhile):
+            messages = async_to_sync(main)()
+        self.assertIn({'conflict': consumers.CONFLICT_NOTICE}, messages)
+        self.assertIn({'ack': move_id, 'status': consumers.Ack.CONFLICT}, messages)
+        self.assertEqual(self.game.move_set.count(), 0)
+        self.assertEqual(self.send(move_id), [consumers.Ack.COMMITTED])
+
+
+########################################################################################################################
+
+
+"""
+    Move Journal TESTS
+"""
+
+
+class JournalTests(SessionTestCase):
+
+    def move(self):
+        return async_to_sync(self._move)()
+
+    async def _move(self):
+        communicator = await connect(self.game.adv_info)
+        await communicator.send_json_to({'antecedent': 'IF x', 'consequent': 'then y'})
+        try:
+            await communicator.receive_nothing(timeout=0.2)
+        finally:
+            await communicator.disconnect()
+
+    def test_committed_move_is_journaled(self):
+        with mock.patch.object(journal, 'record_move') as record_move:
+            self.move()
+        self.assertEqual(record_move.call_count, 1)
+        (move, before, after, _) = record_move.call_args[0]
+        self.assertEqual((move.game_id, before, after), (self.game.id, models.Game.Context.CREATE_RULE,
+                                                          self.reload().context))
+
+    def test_rolled_back_move_is_not_journaled(self):
+        with mock.patch.object(journal, 'record_move') as record_move:
+            with mock.patch.object(models.GameAnalytics, 'record', side_effect=DatabaseError("connection lost")):
+                with self.assertRaises(DatabaseError):
+                    self.move()
+        self.assertEqual(record_move.call_count, 0)
+        self.assertEqual(self.game.move_set.count(), 0)
+
+
+class JournalReaderTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'journal.jsonl')
+        handler = settings.LOGGING['handlers'][journal.JOURNAL_HANDLER]
+        patcher = mock.patch.dict(handler, {'filename': self.path})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, path, events, mtime, opener=open):
+        formatter = journal.JSONLinesFormatter()
+        with opener(path, 'wt') as file:
+            for event in events:
+                file.write(formatter.format(logging.makeLogRecord({'msg': event})) + '\n')
+        os.utime(path, (mtime, mtime))
+
+    def event(self, game, move, date):
+        return {'game': game, 'move': move, 'user': 1, 'code': "Pass", 'before': "Idle", 'after': "Idle", 'ms': 1.0,
+                'date': f"2020-06-01T17:00:0{date}+00:00"}
+
+    def test_timelines_span_the_rotated_files(self):
+        # Rotated files are read by age, not by name: logrotate may number, date or compress them.
+        self.write(self.path + '-20200601', [self.event(1, 1, 1), self.event(2, 2, 2)], mtime=100)
+        self.write(self.path + '.1.gz', [self.event(1, 3, 3)], mtime=200, opener=gzip.open)
+        self.write(self.path, [self.event(1, 4, 4)], mtime=300)
+        with open(self.path, 'a') as file:
+            file.write('{"game": 1, "move": 5, "us')  # cut short by a killed process
+        self.assertEqual(journal.paths(), [self.path + '-20200601', self.path + '.1.gz', self.path])
+        timelines = journal.timelines()
+        self.assertEqual([event['move'] for event in timelines[1]], [1, 3, 4])
+        self.assertEqual([event['move'] for event in timelines[2]], [2])
+
+    def test_reading_some_games_only(self):
+        self.write(self.path, [self.event(1, 1, 1), self.event(12, 2, 2), self.event(2, 3, 3)], mtime=100)
+        self.assertEqual([event['move'] for event in journal.read(games=[1, 2])], [1, 3])
+
+
+########################################################################################################################
+
+
+"""
+    Stalled Games TESTS
+"""
+
+
+class SweepStalledGamesTests(SessionTestCase):
+
+    IDLE = datetime.timedelta(minutes=5)
+
+    def setUp(self):
+        super().setUp()
+        past = timezone.now() - 2 * self.IDLE
+        models.Group.objects.filter(id=self.group.id).update(start=past)
+        models.Game.objects.filter(id=self.game.id).update(last_move_at=past)
+
+    def test_idle_game_is_flagged_once(self):
+        self.assertEqual([player.id for player in sweep_stalled_games.sweep(self.IDLE)], [self.game.adv_info.id])
+        self.assertIsNotNone(self.reload().stalled_at)
+        self.assertEqual(sweep_stalled_games.sweep(self.IDLE), [])
+
+    def test_game_moved_after_it_was_read_is_not_flagged(self):
+        now = timezone.now()
+        games = [self.reload()]
+        models.Game.objects.filter(id=self.game.id).update(last_move_at=now)
+        self.assertEqual(sweep_stalled_games.flag(games, now - self.IDLE, now), [])
+        self.assertIsNone(self.reload().stalled_at)
+
+    def test_concurrent_sweeps_alert_once(self):
+        games = [self.reload()]
+        now = timezone.now()
+        self.assertEqual(len(sweep_stalled_games.flag(games, now - self.IDLE, now)), 1)
+        later = now + datetime.timedelta(seconds=1)
+        self.assertEqual(sweep_stalled_games.flag(games, later - self.IDLE, later), [])
+
+
+########################################################################################################################
+
+
+"""
+    Game MODEL TESTS
+"""
+
+
+class GameStateTests(SessionTestCase):
+
+    def test_state_counts_the_moves_and_keeps_the_last(self):
+        self.assertEqual((self.game.get_state().moves, self.game.get_state().last_move), (0, None))
+        user = self.game.adv_info.user
+        for code in [models.Move.Code.CREATE_RULE, models.Move.Code.SENT_ATTACK, models.Move.Code.PASS]:
+            models.Move.objects.create(user=user, game=self.game, code=code, text=code)
+        state = self.reload().get_state()
+        self.assertEqual((state.moves, state.last_move), (3, models.Move.Code.PASS))
+
+    def test_facts_are_read_once_per_version(self):
+        game = self.reload()
+        with self.assertNumQueries(1):
+            facts = game.get_facts()
+            self.assertEqual([fact_id for (fact_id, _) in game.get_fact_choices()], [fact['id'] for fact in facts])
+            game.get_facts()
+        with self.assertNumQueries(2):  # the number of moves and the last one, but not the facts
+            game.get_state()
+        models.FactPair.objects.filter(id=facts[0]['id']).update(source_fact="changed")
+        game.claim_version()
+        with self.assertNumQueries(1):
+            self.assertEqual(game.get_facts()[0]['source_fact'], "changed")
+
+
+class HistoryTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        users = [self.game.adv_info.user, self.game.crt_info.user]
+        self.moves = [models.Move.objects.create(user=users[i % 2], game=self.game, code=models.Move.Code.PASS,
+                                                 text=f"move {i}") for i in range(5)]
+
+    def test_history_is_read_one_window_at_a_time(self):
+        (history, older) = self.game.get_history(limit=2)
+        self.assertEqual([(move['role'], move['text']) for move in history],
+                         [("Critic", "move 3"), ("Advocate", "move 4")])
+        self.assertTrue(older)
+        (history, older) = self.game.get_history(before=history[0]['id'], limit=2)
+        self.assertEqual([move['text'] for move in history], ["move 1", "move 2"])
+        (history, older) = self.game.get_history(before=history[0]['id'], limit=2)
+        self.assertEqual(([move['text'] for move in history], older), (["move 0"], False))
+        self.assertEqual(len(self.game.get_history(limit=None)[0]), 5)
+
+    def test_older_moves_are_sent_over_the_socket(self):
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            try:
+                await communicator.send_json_to({'history_before': self.moves[2].id})
+                return await communicator.receive_json_from()
+            finally:
+                await communicator.disconnect()
+
+        sent = async_to_sync(main)()
+        self.assertEqual(([move['text'] for move in sent['history']], sent['older']), (["move 0", "move 1"], False))
+
+
+class ReplayTests(SessionTestCase):
+
+    def test_replayed_game_matches_the_saved_game(self):
+        self.play(4)
+        state = replay.state_at(self.reload())
+        self.assertEqual(replay.audit(self.reload(), state), [])
+        self.assertEqual(replay.replay_session(self.group), {self.game.id: state})
+
+    def test_replay_command_verifies_the_session(self):
+        self.play(4)
+        out = StringIO()
+        call_command('replay', group=self.group.id, verify=True, json=True, stdout=out, stderr=StringIO())
+        self.assertEqual(json.loads(out.getvalue())[str(self.game.id)]['moves'], 4)
+        models.Game.objects.filter(id=self.game.id).update(rule_antecedent="tampered")
+        with self.assertRaises(CommandError):
+            call_command('replay', self.game.id, verify=True, stdout=StringIO(), stderr=StringIO())
+
+    def test_state_at_a_move(self):
+        self.play(2)
+        first = replay.state_at(self.game, 1)
+        self.assertEqual((first.context, first.turn, first.moves), (engine.Context.IDLE, engine.Turn.CRITIC, 1))
+        with self.assertRaises(replay.ReplayError):
+            replay.state_at(self.game, 3)
+
+    def test_move_saved_without_an_event_cannot_be_replayed(self):
+        self.play(2)
+        models.Move.objects.filter(id=self.game.move_set.latest('id').id).update(event='')
+        with self.assertRaises(replay.ReplayError):
+            replay.state_at(self.game)
+
+
+class AnalyticsTests(SessionTestCase):
+
+    def test_row_follows_the_committed_moves(self):
+        self.play(6)
+        analytics = models.GameAnalytics.objects.get(game=self.game)
+        moves = list(self.game.move_set.order_by('id').values_list('code', 'date'))
+        codes = [code for (code, _) in moves]
+        self.assertEqual(analytics.moves, len(moves))
+        for (code, field) in models.GameAnalytics.CODE_FIELDS.items():
+            self.assertEqual(getattr(analytics, field), codes.count(code), field)
+        attacks = sum(getattr(analytics, field) for field in models.GameAnalytics.LINK_FIELDS.values())
+        self.assertEqual(attacks, analytics.sent_attack)
+        self.assertEqual((analytics.first_move, analytics.last_move), (moves[0][1], moves[-1][1]))
+
+    def test_backfill_rebuilds_the_row(self):
+        self.play(6)
+        recorded = model_to_dict(models.GameAnalytics.objects.get(game=self.game))
+        models.GameAnalytics.objects.all().delete()
+        call_command('backfill_analytics', self.game.id, stdout=StringIO())
+        self.assertEqual(model_to_dict(models.GameAnalytics.objects.get(game=self.game)), recorded)
+
+
+class GroupSummaryTests(SessionTestCase):
+
+    def summary(self):
+        self.client.force_login(AuthUser.objects.get_or_create(username='moderator', is_staff=True)[0])
+        return self.client.get(reverse('moderator:group-summary', kwargs={'group_name': self.group.name})).json()
+
+    def test_counters_follow_games_users_and_reports(self):
+        self.play(3)
+        player = self.game.adv_info.user
+        (player.assigned, player.approved) = (True, True)
+        player.save()
+        report = models.Report.report_error(self.reload(), "broken")
+        expected = models.GroupSummary.recount(self.group.id).as_dict()
+        self.assertEqual((expected['moderated'], expected['users_approved'], expected['open_reports']), (1, 1, 1))
+        self.assertEqual(models.GroupSummary.objects.get(group=self.group).as_dict(), expected)
+        self.assertEqual(self.summary(), expected)
+        report.resolved = True
+        report.save()
+        self.assertEqual(models.GroupSummary.objects.get(group=self.group).open_reports, 0)
+
+    def test_session_without_a_row_is_counted_on_demand(self):
+        models.GroupSummary.objects.filter(group=self.group).delete()
+        self.assertEqual(self.summary(), models.GroupSummary.recount(self.group.id).as_dict())
+
+
+########################################################################################################################
+
+
+"""
+    Report TESTS
+"""
+
+
+class ReportTests(SessionTestCase):
+
+    def test_report_moderates_the_game_through_the_version_check(self):
+        game = self.reload()
+        report = models.Report.report_error(game, "broken")
+        game = self.reload()
+        self.assertEqual((game.turn, game.version), (models.Game.Turn.MODERATED, self.game.version + 1))
+        self.assertEqual((report.game_id, report.text), (self.game.id, "Error Reported: broken"))
+
+    def test_report_on_an_outdated_game_saves_nothing(self):
+        (stale, moving) = (self.reload(), self.reload())
+        moving.claim_version()
+        with self.assertRaises(models.Game.Conflict):
+            models.Report.report_user(stale, "cheating")
+        self.assertEqual(self.reload().turn, self.game.turn)
+        self.assertFalse(models.Report.objects.exists())
+
+    def test_resolving_an_error_report(self):
+        # Error reports have no user; resolving one must not fail once the resolution has been committed.
+        report = models.Report.report_error(self.reload(), "broken")
+        self.client.force_login(AuthUser.objects.create_user('moderator', is_staff=True))
+        response = self.client.post(reverse('moderator:report-resolve', kwargs={'report_id': report.id}), {
+            'note': "fixed", 'returned': models.Game.Turn.CRITIC
+        })
+        self.assertRedirects(response, reverse('moderator:list-of-reports'), fetch_redirect_response=False)
+        self.assertEqual(self.reload().turn, models.Game.Turn.CRITIC)
+        self.assertTrue(models.Report.objects.get(id=report.id).resolved)
+
+
+class ReportQueueTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = AuthUser.objects.create_user('moderator', is_staff=True)
+        self.client.force_login(self.moderator)
+
+    def queue(self, **params):
+        response = self.client.get(reverse('moderator:list-of-reports'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_queue_pages_the_unresolved_reports_by_id(self):
+        reports = [models.Report.objects.create(game=self.game, text=f"report {i}") for i in range(3)]
+        models.Report.objects.create(game=self.game, text="resolved", resolved=True)
+        with mock.patch.object(moderator_views.ReportListView, 'page_size', 2):
+            first = self.queue()
+            self.assertEqual([report.id for report in first.context['object_list']], [reports[2].id, reports[1].id])
+            second = self.queue(before=reports[1].id)
+        self.assertEqual([report.id for report in second.context['object_list']], [reports[0].id])
+        self.assertIn(f"before={reports[1].id}", first.context['older'])
+        self.assertNotIn('older', second.context)
+
+    def test_queue_filters_by_status_and_session(self):
+        resolved = models.Report.objects.create(game=self.game, text="resolved", resolved=True)
+        self.assertEqual(list(self.queue(status='resolved').context['object_list']), [resolved])
+        self.assertEqual(list(self.queue(status='all', group='elsewhere').context['object_list']), [])
+
+    def test_new_report_is_pushed_to_the_queue(self):
+        async def main():
+            communicator = WebsocketCommunicator(moderator_consumers.ReportConsumer,
+                                                 '/ws/wganalogy_app/moderator/reports')
+            communicator.scope['user'] = self.moderator
+            (connected, _) = await communicator.connect()
+            self.assertTrue(connected)
+            try:
+                report = await database_sync_to_async(models.Report.report_user)(self.reload(), "stuck")
+                return (report, await communicator.receive_json_from())
+            finally:
+                await communicator.disconnect()
+
+        (report, pushed) = async_to_sync(main)()
+        self.assertEqual((pushed['report'], pushed['group']), (report.id, self.group.name))
+        self.assertIn("stuck", pushed['html-report'])
+
+
+########################################################################################################################
+
+
+"""
+    Fact Pair TESTS
+"""
+
+
+class FactPairTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        (self.first, self.second) = list(self.game.factpair_set.order_by('id'))[:2]
+
+    def test_legacy_duplicate_keeps_its_null_hash(self):
+        # 0006_factpair_content_hash leaves the hash of facts duplicating an earlier one of the game null.
+        models.FactPair.objects.filter(id=self.second.id).update(
+            source_fact=self.first.source_fact.upper(), target_fact=self.first.target_fact, content_hash=None
+        )
+        legacy = models.FactPair.objects.get(id=self.second.id)
+        legacy.save()
+        self.assertIsNone(models.FactPair.objects.get(id=self.second.id).content_hash)
+
+    def test_new_fact_gets_its_hash(self):
+        fact = models.FactPair.objects.create(game=self.game, source_fact="New  source", target_fact="new target")
+        self.assertEqual(fact.content_hash, engine.fact_hash("new source", "NEW TARGET"))
+
+    def test_colliding_edit_is_a_form_error(self):
+        # An accepted edit whose facts collide with another stored fact of the game is turned down like any invalid
+        # move, and its move id can be sent again.
+        pending = [self.second.source_fact, self.second.target_fact, self.first.source_fact, self.first.target_fact,
+                   str(self.second.id), ""]
+        models.Game.objects.filter(id=self.game.id).update(
+            context=models.Game.Context.PROPOSED_EDIT, turn=models.Game.Turn.ADVOCATE,
+            context_data='%_#_%'.join(pending)
+        )
+        move = {'response': 'accept', 'move_id': uuid.uuid4().hex}
+
+        async def main():
+            communicator = await connect(self.game.adv_info)
+            try:
+                await communicator.send_json_to(move)
+                first = await acks(communicator)
+                await communicator.send_json_to(move)
+                return first + await acks(communicator)
+            finally:
+                await communicator.disconnect()
+
+        self.assertEqual(async_to_sync(main)(), [consumers.Ack.INVALID, consumers.Ack.INVALID])
+        self.assertEqual(self.game.move_set.count(), 0)
+        self.assertEqual(self.reload().version, self.game.version)
+
+
+########################################################################################################################
+
+
+"""
+    Game Engine TESTS
+"""
+
+
+class EngineTests(SimpleTestCase):
+
+    def idle(self, turn, **kwargs):
+        kwargs.setdefault('moves', 1)
+        return engine.State(context=engine.Context.IDLE, turn=turn, antecedent="x", consequent="y", **kwargs)
+
+    def assertIllegal(self, state, role, move, data, field):
+        with self.assertRaises(engine.IllegalMove) as raised:
+            engine.validate(state, role, move, data)
+        self.assertEqual(raised.exception.field, field)
+
+    def test_create_rule(self):
+        state = engine.State()
+        result = engine.apply(state, engine.Turn.ADVOCATE, engine.Move.CREATE_RULE,
+                              {'antecedent': "IF x", 'consequent': " then y "})
+        self.assertEqual((state.antecedent, state.consequent), ("x", "y"))
+        self.assertEqual((state.context, state.turn), (engine.Context.IDLE, engine.Turn.CRITIC))
+        self.assertEqual([step.code for step in result.steps], [engine.Code.CREATE_RULE])
+
+    def test_create_rule_needs_both_parts(self):
+        data = {'antecedent': "", 'consequent': "y"}
+        self.assertIllegal(engine.State(), engine.Turn.ADVOCATE, engine.Move.CREATE_RULE, data, 'antecedent')
+        data = {'antecedent': "x", 'consequent': "then"}
+        self.assertIllegal(engine.State(), engine.Turn.ADVOCATE, engine.Move.CREATE_RULE, data, 'consequent')
+
+    def test_update_rule_may_leave_a_part_empty(self):
+        # The Update Rule fields are optional, as they were before the engine existed.
+        cleaned = engine.validate(self.idle(engine.Turn.ADVOCATE), engine.Turn.ADVOCATE, engine.Move.UPDATE_RULE,
+                                  {'antecedent': "", 'consequent': "then z"})
+        self.assertEqual(cleaned, {'antecedent': "", 'consequent': "z"})
+
+    def test_update_rule_must_change_the_rule(self):
+        self.assertIllegal(self.idle(engine.Turn.ADVOCATE), engine.Turn.ADVOCATE, engine.Move.UPDATE_RULE,
+                           {'antecedent': "if x", 'consequent': "y"}, 'antecedent')
+        self.assertIllegal(self.idle(engine.Turn.ADVOCATE), engine.Turn.ADVOCATE, engine.Move.UPDATE_RULE,
+                           {'antecedent': "if", 'consequent': "z"}, 'antecedent')
+
+    def test_attack_may_omit_the_link(self):
+        state = self.idle(engine.Turn.CRITIC)
+        engine.apply(state, engine.Turn.CRITIC, engine.Move.ATTACK, {'link': "", 'explain_attack': "because"})
+        self.assertEqual((state.context, state.turn), (engine.Context.ATTACK_RESPONSE, engine.Turn.ADVOCATE))
+        self.assertEqual(state.context_data, ("", "because"))
+
+    def test_attack_on_an_unknown_link(self):
+        self.assertIllegal(self.idle(engine.Turn.CRITIC), engine.Turn.CRITIC, engine.Move.ATTACK,
+                           {'link': "L9", 'explain_attack': ""}, 'link')
+
+    def test_attack_responses(self):
+        for (response, turn) in [(engine.Move.ACCEPT, engine.Turn.ADVOCATE), (engine.Move.REJECT, engine.Turn.CRITIC)]:
+            state = self.idle(engine.Turn.CRITIC)
+            engine.apply(state, engine.Turn.CRITIC, engine.Move.ATTACK, {'link': "L2", 'explain_attack': "z"})
+            engine.apply(state, engine.Turn.ADVOCATE, response, {'explanation': "no"})
+            self.assertEqual((state.context, state.turn), (engine.Context.IDLE, turn))
+
+    def test_moves_out_of_turn(self):
+        with self.assertRaises(engine.IllegalMove):
+            engine.validate(self.idle(engine.Turn.CRITIC), engine.Turn.ADVOCATE, engine.Move.PASS, {})
+        self.assertEqual(engine.options(self.idle(engine.Turn.CRITIC), engine.Turn.ADVOCATE), [])
+
+    def test_critic_passes_late_and_two_passes_end_the_game(self):
+        self.assertIllegal(self.idle(engine.Turn.CRITIC), engine.Turn.CRITIC, engine.Move.PASS, {}, 'move_choice')
+        state = self.idle(engine.Turn.CRITIC, moves=engine.CRITIC_PASS_AFTER + 1)
+        engine.apply(state, engine.Turn.CRITIC, engine.Move.PASS, {})
+        self.assertEqual((state.context, state.turn), (engine.Context.IDLE, engine.Turn.ADVOCATE))
+        result = engine.apply(state, engine.Turn.ADVOCATE, engine.Move.PASS, {})
+        self.assertEqual([step.code for step in result.steps], [engine.Code.PASS, engine.Code.COMPLETED])
+        self.assertEqual(state.turn, engine.Turn.COMPLETED)
+
+    def test_duplicate_facts_ignore_case_and_spacing(self):
+        state = self.idle(engine.Turn.CRITIC, facts={1: ("Source fact", "Target fact")})
+        self.assertIllegal(state, engine.Turn.CRITIC, engine.Move.ADD_FACTS,
+                           {'source_add': " source  FACT", 'target_add': "target fact"}, 'source_add')
+
+
+########################################################################################################################
+
+
+"""
+    Background Job TESTS
+"""
+
+
+class JobTests(TransactionTestCase):
+
+    def setUp(self):
+        async_to_sync(get_channel_layer().flush)()
+        self.scenarios = _sessions.create_scenarios('jobs', 2)
+        self.group = _sessions.create_session('jobs', 4, 1, self.scenarios, generate=False)
+        self.job = models.Job.queue(self.group)
+
+    def tearDown(self):
+        _sessions.delete_session(self.group, self.scenarios)
+
+    def reload(self):
+        return models.Job.objects.get(id=self.job.id)
+
+    def test_worker_generates_the_session(self):
+        call_command('run_jobs', once=True, stdout=StringIO())
+        job = self.reload()
+        self.assertEqual((job.status, job.players, job.games), (models.Job.Status.COMPLETED, 4, 2))
+        self.assertEqual(self.group.game_set.count(), 2)
+        self.assertIsNone(models.Job.claim())
+
+    def test_cancelled_queued_job_is_never_run(self):
+        self.assertTrue(self.reload().cancel())
+        self.assertEqual(self.reload().status, models.Job.Status.CANCELLED)
+        self.assertFalse(models.Group.objects.filter(id=self.group.id).exists())
+        self.assertIsNone(models.Job.claim())
+
+    def test_cancelled_running_job_discards_its_session(self):
+        job = models.Job.claim()
+        self.assertEqual(job.id, self.job.id)
+        self.assertIsNone(models.Job.claim())  # a second worker does not get the same job
+        self.assertTrue(self.reload().cancel())
+        job.run()
+        self.assertEqual(self.reload().status, models.Job.Status.CANCELLED)
+        self.assertFalse(models.Group.objects.filter(id=self.group.id).exists())
+        self.assertFalse(self.reload().cancel())  # nothing left to cancel
+
+    def test_progress_is_streamed_to_the_moderator(self):
+        async def main():
+            communicator = WebsocketCommunicator(moderator_consumers.JobConsumer,
+                                                 f'/ws/wganalogy_app/moderator/jobs/{self.job.id}')
+            communicator.scope['user'] = await database_sync_to_async(AuthUser.objects.create_user)('moderator')
+            communicator.scope['url_route'] = {'args': (), 'kwargs': {'job_id': self.job.id}}
+            (connected, _) = await communicator.connect()
+            self.assertTrue(connected)
+            try:
+                updates = [await communicator.receive_json_from()]
+                await database_sync_to_async(models.Job.claim().run)()
+                while not await communicator.receive_nothing(timeout=0.2):
+                    updates.append(await communicator.receive_json_from())
+                return updates
+            finally:
+                await communicator.disconnect()
+
+        updates = async_to_sync(main)()
+        self.assertEqual(updates[0]['status'], models.Job.Status.QUEUED)
+        self.assertEqual(updates[-1]['status'], models.Job.Status.COMPLETED)
+        self.assertEqual(updates[-1]['url'], reverse('moderator:group', kwargs={'group_name': self.group.name}))
+
+
+########################################################################################################################
+
+
+"""
+    Game Slot Cache TESTS
+"""
+
+
+class SlotCacheTests(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        (self.advocate, self.critic) = (self.game.adv_info, self.game.crt_info)
+
+    def test_slot_is_resolved_once(self):
+        with self.assertNumQueries(1):
+            slot = slots.resolve(self.advocate.key)
+            self.assertEqual(slots.resolve(self.advocate.key), slot)
+        self.assertEqual((slot.intermediary_id, slot.user_key, slot.group_name, slot.game_id),
+                         (self.advocate.id, self.advocate.user.key, self.group.name, self.game.id))
+        self.assertIsNone(slots.resolve('no-such-key'))
+
+    @override_settings(WGA_SLOT_CACHE_SIZE=1)
+    def test_least_recently_used_slot_is_dropped(self):
+        slots.resolve(self.advocate.key)
+        slots.resolve(self.critic.key)
+        with self.assertNumQueries(0):
+            slots.resolve(self.critic.key)
+        with self.assertNumQueries(1):
+            slots.resolve(self.advocate.key)
+
+    @override_settings(WGA_SLOT_CACHE_SECONDS=0)
+    def test_expired_slot_is_resolved_again(self):
+        slots.resolve(self.advocate.key)
+        with self.assertNumQueries(1):
+            slots.resolve(self.advocate.key)
+
+    def test_forgetting_a_session(self):
+        slots.resolve(self.advocate.key)
+        slots.resolve(self.critic.key)
+        slots.forget(group_name=self.group.name)
+        with self.assertNumQueries(2):
+            slots.resolve(self.advocate.key)
+            slots.resolve(self.critic.key)
+
+
+class SlotInvalidationTests(SessionTestCase):
+
+    def test_navigation_socket_drops_a_reassigned_slot(self):
+        # The slot is reassigned by another process: only its invalidation event reaches this one.
+        (intermediary, other) = (self.game.adv_info, self.game.crt_info.user)
+        channel_layer = get_channel_layer()
+
+        async def main():
+            communicator = WebsocketCommunicator(consumers.NavBarConsumer, '/ws/wganalogy_app/nav')
+            communicator.scope['session'] = {'user_identifier': intermediary.user.key}
+            communicator.scope['url_route'] = {'args': (), 'kwargs': {'url_key': intermediary.key}}
+            (connected, _) = await communicator.connect()
+            self.assertTrue(connected)
+            try:
+                await channel_layer.group_send(intermediary.user.key, {'type': 'update.navigation'})
+                self.assertIn('html-navigation', await communicator.receive_json_from())
+                await database_sync_to_async(
+                    models.Intermediary.objects.filter(id=intermediary.id).update
+                )(user=other)
+                await channel_layer.group_send(self.group.name, {
+                    'type': 'slots.invalidate', 'group': self.group.name, 'keys': [intermediary.key]
+                })
+                self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+                await channel_layer.group_send(intermediary.user.key, {'type': 'update.navigation'})
+                return await communicator.receive_nothing(timeout=0.2)
+            finally:
+                await communicator.disconnect()
+
+        self.assertTrue(async_to_sync(main)(), "navigation was sent for a slot the worker no longer holds")
+        self.assertEqual(slots.resolve(intermediary.key).user_key, other.key)
+
+
+########################################################################################################################
+
+
+"""
+    Static Bundle TESTS
+"""
+
+
+class BundleTests(SimpleTestCase):
+
+    def test_scripts_are_joined_without_their_source_maps(self):
+        joined = bundles.join('js', {'a.js': "var a = 1\n//# sourceMappingURL=a.map", 'b.js': "b()"})
+        self.assertEqual(joined, "var a = 1;\nb();\n")
+
+    def test_stylesheet_urls_are_relocated_to_the_bundle(self):
+        source = "a{background:url('../fonts/x.woff?v=1')} b{background:url(data:image/png;base64,AA)} c{src:url(/x)}"
+        relocated = bundles.relocate_css(source, 'wga/vendor/bootstrap/css/bootstrap.min.css', 'wga/bundles/base.css')
+        self.assertEqual(relocated, "a{background:url(\"../vendor/bootstrap/fonts/x.woff?v=1\")} "
+                                    "b{background:url(data:image/png;base64,AA)} c{src:url(/x)}")
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_tag_includes_the_files_one_by_one_in_debug(self):
+        template = Template("{% load bundles %}{% bundle 'game' 'js' %}")
+        with override_settings(DEBUG=True):
+            self.assertEqual(template.render(Context()).count('<script'), len(bundles.BUNDLES['game']['js']))
+        self.assertEqual(template.render(Context()), '<script src="/static/wga/bundles/game.js"></script>')
+
+    def test_collectstatic_builds_fingerprinted_compressed_bundles(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(STATIC_ROOT=directory.name, STATICFILES_STORAGE='wga.bundles.BundledStaticFilesStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(directory.name, 'staticfiles.json')) as file:
+                manifest = json.load(file)['paths']
+        css = manifest['wga/bundles/base.css']
+        self.assertRegex(css, r'^wga/bundles/base\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(directory.name, css + '.gz')))
+        with open(os.path.join(directory.name, css)) as file:
+            fonts = re.findall(r'url\("?([^")]+)', file.read())
+        font = manifest['wga/vendor/bootstrap/fonts/glyphicons-halflings-regular.woff2']
+        self.assertIn(posixpath.relpath(font, 'wga/bundles'), [url.split('?')[0].split('#')[0] for url in fonts])
+
+
+@override_settings(**benchmark_templates.template_settings('fragments'))
+class TemplateCacheTests(SimpleTestCase):
+
+    def render(self, name, case):
+        user = SimpleNamespace(group=SimpleNamespace(case=case))
+        return loader.render_to_string('wga/user/game/modals.html', {'name': name, 'user': user})
+
+    def test_templates_are_loaded_once(self):
+        self.assertIsInstance(engines['django'].engine.template_loaders[0], CachedLoader)
+
+    def test_modals_are_cached_per_name_and_case(self):
+        key = make_template_fragment_key('wga-modal', ['rule', models.Group.Case.NON_CONTROL])
+        self.assertIn('rule-modal', self.render('rule', models.Group.Case.NON_CONTROL))
+        self.assertIn('rule-modal', caches['template_fragments'].get(key))
+        caches['template_fragments'].set(key, "cached")
+        self.assertEqual(self.render('rule', models.Group.Case.NON_CONTROL).strip(), "cached")
+        self.assertNotIn("cached", self.render('rule', models.Group.Case.CONTROL))
+        self.assertNotIn("cached", self.render('L1', models.Group.Case.NON_CONTROL))
+
+
+########################################################################################################################
+
+
+"""
+    Log Handler TESTS
+"""
+
+
+class QueuedFileHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'games.log')
+        self.handler = log_handlers.QueuedFileHandler(self.path)
+        self.handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger('wga.tests.queued')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def read(self):
+        log_handlers.LISTENER.stop()  # writes every queued record; the next record starts the listener again
+        with open(self.path) as file:
+            return file.read().splitlines()
+
+    def test_records_are_formatted_when_logged(self):
+        moves = ["attack"]
+        self.logger.warning("moves: %s", moves)
+        moves.append("pass")
+        self.logger.warning("second")
+        self.assertEqual(self.read(), ["WARNING moves: ['attack']", "WARNING second"])
+
+    def test_file_moved_away_by_logrotate_is_reopened(self):
+        self.logger.warning("before")
+        self.read()
+        os.rename(self.path, self.path + '.1')
+        self.logger.warning("after")
+        self.assertEqual(self.read(), ["WARNING after"])
+        with open(self.path + '.1') as file:
+            self.assertEqual(file.read().splitlines(), ["WARNING before"])
+
+
+########################################################################################################################
+
+
+"""
+    Database Router TESTS
+"""
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def route(self, lag):
+        router = routers.ReplicaRouter()
+        with mock.patch.object(routers, 'replica_alias', return_value='replica'):
+            with mock.patch.object(routers, 'replica_lag', return_value=lag):
+                outside = router.db_for_read(models.Report)
+                with routers.use_replica():
+                    return (outside, router.db_for_read(models.Report), router.db_for_write(models.Report))
+
+    @override_settings(WGA_REPLICA_MAX_LAG=30)
+    def test_reads_go_to_a_replica_that_keeps_up(self):
+        self.assertEqual(self.route(lag=2.0), ('default', 'replica', 'default'))
+
+    @override_settings(WGA_REPLICA_MAX_LAG=30)
+    def test_reads_fall_back_to_the_primary(self):
+        self.assertEqual(self.route(lag=45.0), ('default', 'default', 'default'))
+        self.assertEqual(self.route(lag=None), ('default', 'default', 'default'))  # the lag could not be measured
+
+    @override_settings(WGA_REPLICA_DATABASE='default')
+    def test_primary_is_not_a_replica(self):
+        self.assertIsNone(routers.replica_alias())
+
+
+class ReplicaLagTests(SimpleTestCase):
+
+    @override_settings(WGA_REPLICA_LAG_INTERVAL=0)
+    def test_slow_measurement_does_not_block_other_threads(self):
+        (measuring, release) = (threading.Event(), threading.Event())
+
+        def slow_lag(alias):
+            measuring.set()
+            release.wait(5)
+            return 1.5
+
+        with mock.patch.dict(routers._LAG, {'checked': None, 'seconds': 3.0}):
+            with mock.patch.object(routers, 'replication_lag', side_effect=slow_lag):
+                thread = threading.Thread(target=routers.replica_lag, args=('replica',))
+                thread.start()
+                self.assertTrue(measuring.wait(5))
+                with override_settings(WGA_REPLICA_LAG_INTERVAL=10):
+                    self.assertEqual(routers.replica_lag('replica'), 3.0)  # the previous measurement, at once
+                release.set()
+                thread.join(5)
+            self.assertEqual(routers._LAG['seconds'], 1.5)
+
+
+########################################################################################################################
+
+
+"""
+    Benchmark COMMAND TESTS
+
+    Small runs of the load test and benchmark commands, checking that they play through and report their numbers.
+"""
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BenchmarkCommandTests(TransactionTestCase):
+
+    def test_loadtest_plays_full_games(self):
+        out = StringIO()
+        # The command installs its own channel layer; the modules holding the current one keep it afterwards.
+        with mock.patch.object(channel_layers, 'backends', channel_layers.backends):
+            call_command('loadtest', players=2, moves=9, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report['players'], report['games']), (2, 1))
+        self.assertGreaterEqual(report['moves'], 9)
+        self.assertGreater(report['queries']['handlers']['GameConsumer.receive']['mean'], 0)
+        self.assertFalse(models.Group.objects.exists())
+
+    def test_benchmark_records_each_operation(self):
+        # handle() creates its own test database, so each operation is run directly.
+        options = {'add_games': 2, 'no_memory': True}
+        for operation in benchmark_sessions.OPERATIONS:
+            result = benchmark_sessions.Command()._run(operation, 4, 1, 2, options)
+            self.assertIsNone(result['error'], operation)
+            self.assertGreater(result['queries'], 0)
+        self.assertFalse(models.Group.objects.exists())